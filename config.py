@@ -23,7 +23,7 @@ SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 
 # Storage Configuration
-STORAGE_MODE = os.getenv("STORAGE_MODE", "json")  # json, csv, supabase, or both
+STORAGE_MODE = os.getenv("STORAGE_MODE", "json")  # json, csv, supabase, parquet, zstd, both, or a list like "json,parquet"
 
 # Weave Tracing Configuration  
 WEAVE_PROJECT_NAME = os.getenv("WEAVE_PROJECT_NAME", "g-tsvetkova-minerva-university/Testing-ar")
@@ -61,4 +61,6 @@ JUDGE_MODEL = "claude"  # Use Claude for evaluation
 # Output configuration
 RESULTS_DIR = "results"
 LOGS_DIR = "logs"
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")  # Local caches (compiled scenarios, etc.)
+SCENARIO_FILES_DIR = os.getenv("SCENARIO_FILES_DIR", "scenarios/data")  # Declarative scenario files
 
@@ -47,6 +47,15 @@ CREATE TABLE IF NOT EXISTS conversation_turns (
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_turns_conversation ON conversation_turns(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_turns_number ON conversation_turns(conversation_id, turn_number);
+-- Existing deployments may hold duplicate turns from retried appends; keep the
+-- newest row of each (conversation_id, turn_number) so the unique index can be built
+DELETE FROM conversation_turns older
+USING conversation_turns newer
+WHERE older.conversation_id = newer.conversation_id
+  AND older.turn_number = newer.turn_number
+  AND older.id < newer.id;
+-- Conflict target for turn upserts (retried writes replace, never duplicate)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_turns_conversation_turn ON conversation_turns(conversation_id, turn_number);
 
 -- ============================================================================
 -- TABLE 3: Evaluations
@@ -70,6 +79,14 @@ CREATE TABLE IF NOT EXISTS evaluations (
 
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_evaluations_conversation ON evaluations(conversation_id);
+-- Existing deployments may hold several verdicts per conversation; keep the
+-- newest one so the unique index can be built
+DELETE FROM evaluations older
+USING evaluations newer
+WHERE older.conversation_id = newer.conversation_id
+  AND older.id < newer.id;
+-- Conflict target for evaluation upserts (a re-judged conversation replaces its verdict)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_evaluations_conversation ON evaluations(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_evaluations_scenario ON evaluations(scenario_id);
 CREATE INDEX IF NOT EXISTS idx_evaluations_model ON evaluations(model_name);
 
@@ -3,6 +3,21 @@ Evaluator module for assessing conversation quality
 """
 
 from .llm_judge import LLMJudge, EvaluationResult
+from .judge_cache import JudgeCache
+from .evaluation_index import EvaluationIndex
+from .triage import ConversationTriage
+from .judge_ensemble import EnsemblePolicy
+from .online_judge import OnlineJudge
+from .transcript_compression import TranscriptCompressor
 
-__all__ = ["LLMJudge", "EvaluationResult"]
+__all__ = [
+    "LLMJudge",
+    "EvaluationResult",
+    "JudgeCache",
+    "EvaluationIndex",
+    "ConversationTriage",
+    "EnsemblePolicy",
+    "OnlineJudge",
+    "TranscriptCompressor",
+]
 
@@ -0,0 +1,280 @@
+"""
+On-disk index of judged conversations for incremental evaluation
+
+Tracks which conversation IDs already have a verdict and a watermark of the
+last run, so a judge job only loads and evaluates conversations added since.
+Result files that haven't changed since every conversation in them was
+judged are skipped without being parsed. conversations.json and
+conversations.zst are read through their offset index, so judged
+conversations in them are skipped by ID without being decoded.
+"""
+
+import glob
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+INDEX_FORMAT_VERSION = 1
+
+
+def conversation_files(results_dir: str) -> List[str]:
+    """List the files in a results directory that hold conversations"""
+    files = []
+    conversations_file = os.path.join(results_dir, "conversations.json")
+    if os.path.exists(conversations_file):
+        files.append(conversations_file)
+    compressed_file = os.path.join(results_dir, "conversations.zst")
+    if os.path.exists(compressed_file):
+        files.append(compressed_file)
+    
+    for json_file in sorted(glob.glob(os.path.join(results_dir, "*_20*.json"))):
+        if "benchmark" in json_file or "conversations.json" in json_file:
+            continue
+        # Judge output files also carry a timestamp in their name
+        if os.path.basename(json_file).startswith("evaluation_results_"):
+            continue
+        files.append(json_file)
+    return files
+
+
+def load_conversation_file(path: str) -> List[Dict]:
+    """
+    Load the conversation records in a results file
+    
+    Args:
+        path: conversations.json, conversations.zst or a single-conversation JSON file
+    
+    Returns:
+        List of conversation dictionaries (empty if unreadable)
+    """
+    if path.endswith(".zst"):
+        from storage.compressed_store import read_compressed_file
+        try:
+            return read_compressed_file(path)
+        except Exception as e:
+            print(f"⚠️  Failed to load {path}: {e}")
+            return []
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"⚠️  Failed to load {path}: {e}")
+        return []
+    
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and 'conversations' in data:
+        return data['conversations']
+    return [data]
+
+
+def iter_conversation_file(path: str) -> Iterator[Dict]:
+    """Stream the conversation records of a results file (see load_conversation_file)"""
+    if path.endswith(".zst"):
+        yield from load_conversation_file(path)
+        return
+    
+    from storage.results_storage import iter_json_records
+    try:
+        for record in iter_json_records(path):
+            if isinstance(record, dict) and isinstance(record.get('conversations'), list):
+                yield from record['conversations']
+            else:
+                yield record
+    except Exception as e:
+        print(f"⚠️  Failed to load {path}: {e}")
+
+
+def _file_stamp(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class EvaluationIndex:
+    """Persistent set of judged conversation IDs plus a run watermark"""
+    
+    def __init__(self, path: str):
+        """
+        Initialize index
+        
+        Args:
+            path: JSON file holding the index
+        """
+        self.path = path
+        self.evaluated: Dict[str, str] = {}  # conversation_id -> evaluated_at
+        self.file_stamps: Dict[str, List[int]] = {}  # path -> [size, mtime_ns]
+        self.watermark: Dict[str, any] = {}
+        self.exists = os.path.exists(path)
+        
+        # Files fully read during this run -> (stamp when opened, IDs they contain)
+        self._pending_files: Dict[str, Tuple[List[int], Set[str]]] = {}
+        self._newest_timestamp: Optional[str] = None
+        
+        if self.exists:
+            self._load()
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable evaluation index {self.path}: {e}")
+            self.exists = False
+            return
+        
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            print(f"⚠️  Ignoring evaluation index with unknown version: {self.path}")
+            self.exists = False
+            return
+        
+        self.evaluated = data.get("evaluated", {})
+        self.file_stamps = data.get("file_stamps", {})
+        self.watermark = data.get("watermark", {})
+    
+    def seed_from_evaluations(self, results_dir: str) -> int:
+        """
+        Mark conversations from earlier evaluation outputs as judged
+        
+        Used when the index is created for a results directory that was
+        already evaluated without it.
+        
+        Args:
+            results_dir: Results directory
+        
+        Returns:
+            Number of conversation IDs added
+        """
+        paths = [os.path.join(results_dir, "evaluations.json")]
+        paths += glob.glob(os.path.join(results_dir, "evaluation_results_*.json"))
+        
+        added = 0
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            for record in load_conversation_file(path):
+                conversation_id = record.get("conversation_id") if isinstance(record, dict) else None
+                if conversation_id and conversation_id not in self.evaluated:
+                    self.evaluated[conversation_id] = record.get("timestamp", "")
+                    added += 1
+        return added
+    
+    def is_evaluated(self, conversation_id: str) -> bool:
+        return conversation_id in self.evaluated
+    
+    def mark_evaluated(self, conversation_ids: Iterable[str]):
+        """Record conversations as judged"""
+        now = datetime.now().isoformat()
+        for conversation_id in conversation_ids:
+            self.evaluated[conversation_id] = now
+    
+    def _iter_file(self, path: str, ids: Set[str]) -> Iterator[Dict]:
+        """
+        Yield the unjudged conversations of one file, collecting all its IDs
+        
+        Args:
+            path: Results file
+            ids: Filled with every conversation ID in the file
+        """
+        if os.path.basename(path) in ("conversations.json", "conversations.zst"):
+            from storage.offset_index import IndexedResultsReader
+            try:
+                reader = IndexedResultsReader(path)
+            except Exception as e:
+                print(f"⚠️  Reading {path} without its offset index: {e}")
+                reader = None
+            # Records without an ID all share one index key, so they need a full scan
+            if reader is not None and "None" not in reader.index.offsets:
+                with reader:
+                    ids.update(reader.index.offsets)
+                    unjudged = sorted(
+                        (offset, conversation_id)
+                        for conversation_id, (offset, _) in reader.index.offsets.items()
+                        if not self.is_evaluated(conversation_id)
+                    )
+                    for _, conversation_id in unjudged:
+                        yield reader.get(conversation_id)
+                return
+            if reader is not None:
+                reader.close()
+        
+        yield from iter_conversation_file(path)
+    
+    def iter_new_conversations(self, results_dir: str) -> Iterator[Dict]:
+        """
+        Yield conversations that haven't been judged yet
+        
+        Files whose size and mtime match a stamp from an earlier run (taken
+        once all their conversations were judged) are not read at all. A
+        conversation kept in several files (e.g. conversations.json and the
+        conversations.zst converted from it) is yielded once.
+        
+        Args:
+            results_dir: Results directory
+        
+        Yields:
+            Conversation dictionaries
+        """
+        yielded = set()
+        for path in conversation_files(results_dir):
+            key = os.path.abspath(path)
+            # Taken before reading: records appended while the run is going
+            # change the file's stamp, so they are picked up next time
+            stamp = _file_stamp(path)
+            if self.file_stamps.get(key) == stamp:
+                continue
+            
+            ids = set()
+            for conversation in self._iter_file(path, ids):
+                if not isinstance(conversation, dict):
+                    continue
+                conversation_id = conversation.get("conversation_id")
+                if conversation_id:
+                    ids.add(conversation_id)
+                    if self.is_evaluated(conversation_id) or conversation_id in yielded:
+                        continue
+                    yielded.add(conversation_id)
+                
+                timestamp = conversation.get("timestamp")
+                if timestamp and (self._newest_timestamp is None or timestamp > self._newest_timestamp):
+                    self._newest_timestamp = timestamp
+                yield conversation
+            
+            # Only files read to the end (not cut short by --limit) can be stamped
+            self._pending_files[key] = (stamp, ids)
+    
+    def save(self):
+        """Write the index and the watermark of this run"""
+        # Files are only skipped next time if everything in them was judged
+        for key, (stamp, ids) in self._pending_files.items():
+            if os.path.exists(key) and all(self.is_evaluated(i) for i in ids):
+                self.file_stamps[key] = stamp
+            else:
+                self.file_stamps.pop(key, None)
+        self._pending_files = {}
+        
+        self.watermark = {
+            "last_run": datetime.now().isoformat(),
+            "last_conversation_timestamp": max(
+                filter(None, [self._newest_timestamp, self.watermark.get("last_conversation_timestamp")]),
+                default=None
+            ),
+            "evaluated_count": len(self.evaluated),
+        }
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": INDEX_FORMAT_VERSION,
+                "watermark": self.watermark,
+                "file_stamps": self.file_stamps,
+                "evaluated": self.evaluated,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.exists = True
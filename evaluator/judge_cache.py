@@ -0,0 +1,165 @@
+"""
+Persistent cache of LLM judge verdicts
+
+Verdicts are keyed by a canonical hash of everything that determines the
+judge's answer: the transcript, the scenario rubric, the judge prompt
+version, the evaluation language and the judge model. Re-running the judge
+over a growing results directory therefore only pays for new or changed
+conversations.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import fields
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from scenarios.scenario_loader import Scenario
+
+if TYPE_CHECKING:
+    from .llm_judge import EvaluationResult
+
+
+# Turn keys used by the different result formats, in lookup order
+_CUSTOMER_KEYS = ("customer_message", "user_message", "customer")
+_AGENT_KEYS = ("agent_message", "assistant_message", "agent")
+
+
+def _first(turn: Dict, keys) -> str:
+    for key in keys:
+        if key in turn:
+            return turn[key]
+    return ""
+
+
+def canonical_turns(turns: List[Dict]) -> List[List[str]]:
+    """
+    Reduce turns to (customer, agent) message pairs
+    
+    Token counts, latencies and key naming differ between result formats but
+    don't change what the judge sees, so they are left out of the hash.
+    """
+    return [[_first(turn, _CUSTOMER_KEYS), _first(turn, _AGENT_KEYS)] for turn in turns]
+
+
+def judge_cache_key(
+    scenario: Scenario,
+    turns: List[Dict],
+    language: str,
+    judge_model_name: str,
+    prompt_version: str
+) -> str:
+    """
+    Build the cache key for a judge verdict
+    
+    Args:
+        scenario: Scenario the conversation was run against
+        turns: Conversation turns
+        language: Evaluation prompt language
+        judge_model_name: Judge model identifier
+        prompt_version: Version of the judge prompt template
+    
+    Returns:
+        Hex digest
+    """
+    payload = {
+        "turns": canonical_turns(turns),
+        "scenario_id": scenario.scenario_id,
+        "customer_goal": scenario.customer_goal,
+        "success_criteria": scenario.success_criteria,
+        "must_not_do": scenario.must_not_do,
+        "evaluation_dimensions": scenario.evaluation_dimensions,
+        "language": language,
+        "judge_model": judge_model_name,
+        "prompt_version": prompt_version,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class JudgeCache:
+    """
+    Append-only JSONL store of judge verdicts
+    
+    The whole file is indexed in memory on open; new verdicts are appended,
+    so writes stay cheap as the corpus grows. Later lines win when a key
+    appears more than once (e.g. after a --force re-run).
+    """
+    
+    def __init__(self, path: str):
+        """
+        Initialize cache
+        
+        Args:
+            path: JSONL file holding cached verdicts
+        """
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Online judge workers share one cache
+        self._load()
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    self._entries[record["key"]] = record["result"]
+                except (ValueError, KeyError) as e:
+                    # A partially written last line shouldn't lose the rest
+                    print(f"⚠️  Skipping bad judge cache line {line_number} in {self.path}: {e}")
+    
+    def get(self, key: str) -> Optional["EvaluationResult"]:
+        """
+        Get a cached verdict
+        
+        Args:
+            key: Cache key from judge_cache_key
+        
+        Returns:
+            EvaluationResult or None
+        """
+        from .llm_judge import EvaluationResult
+        
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        
+        known = {f.name for f in fields(EvaluationResult)}
+        return EvaluationResult(**{k: v for k, v in data.items() if k in known})
+    
+    def put(self, key: str, result: "EvaluationResult"):
+        """
+        Store a verdict
+        
+        Args:
+            key: Cache key from judge_cache_key
+            result: Successful evaluation result
+        """
+        data = result.to_dict()
+        line = json.dumps({"key": key, "result": data}, ensure_ascii=False) + "\n"
+        
+        with self._lock:
+            self._entries[key] = data
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,197 @@
+"""
+Adaptive judge ensemble
+
+The primary judge scores every conversation; secondary judges are only asked
+when the primary score lies near a decision boundary (or for a small audit
+sample), and more judges are added only while the opinions disagree. The
+verdicts are aggregated with a median or trimmed mean.
+"""
+
+import hashlib
+import statistics
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+from .llm_judge import EvaluationResult
+from .response_parser import SCORE_FIELDS
+
+
+AGGREGATIONS = ("median", "trimmed_mean")
+
+
+def trimmed_mean(values: List[float], trim: float = 0.25) -> float:
+    """
+    Mean after dropping the lowest and highest int(len * trim) values
+    
+    Args:
+        values: Scores
+        trim: Fraction trimmed from each end
+    
+    Returns:
+        Trimmed mean
+    """
+    ordered = sorted(values)
+    k = int(len(ordered) * trim)
+    if len(ordered) - 2 * k < 1:
+        k = 0
+    kept = ordered[k:len(ordered) - k]
+    return sum(kept) / len(kept)
+
+
+def aggregate_scores(values: List[float], method: str = "median") -> float:
+    """Aggregate one score across judges"""
+    if method == "median":
+        return statistics.median(values)
+    if method == "trimmed_mean":
+        return trimmed_mean(values)
+    raise ValueError(f"Unknown aggregation: {method}. Use one of {AGGREGATIONS}")
+
+
+@dataclass
+class EnsemblePolicy:
+    """When to ask more judges and how to combine their verdicts"""
+    boundaries: Tuple[float, ...] = (5.0, 7.0)  # Overall scores where pass/fail style decisions flip
+    margin: float = 0.75  # Distance from a boundary that triggers a second opinion
+    disagreement: float = 1.5  # Overall score spread that triggers another judge
+    audit_rate: float = 0.05  # Fraction of conversations always given a second opinion
+    aggregation: str = "median"
+    
+    def __post_init__(self):
+        if self.aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {self.aggregation}. Use one of {AGGREGATIONS}")
+    
+    def escalation_reason(self, conversation_id: str, overall_score: float) -> Optional[str]:
+        """
+        Decide whether the primary verdict needs a second opinion
+        
+        Args:
+            conversation_id: Conversation identifier (seeds the audit sample)
+            overall_score: Primary judge's overall score
+        
+        Returns:
+            "boundary", "audit" or None
+        """
+        if any(abs(overall_score - boundary) <= self.margin for boundary in self.boundaries):
+            return "boundary"
+        # Hash-based so the same conversations are audited on every run
+        digest = hashlib.sha1(str(conversation_id).encode("utf-8")).hexdigest()
+        if int(digest[:8], 16) / 0xFFFFFFFF < self.audit_rate:
+            return "audit"
+        return None
+    
+    def agrees(self, overall_scores: List[float]) -> bool:
+        """Whether the opinions so far are close enough to stop asking"""
+        return max(overall_scores) - min(overall_scores) <= self.disagreement
+    
+    def signature(self) -> str:
+        """Identifies the policy in cache keys"""
+        boundaries = ",".join(f"{b:g}" for b in self.boundaries)
+        return f"{self.aggregation}[{boundaries}±{self.margin:g},d{self.disagreement:g},a{self.audit_rate:g}]"
+
+
+@dataclass
+class EnsembleStats:
+    """Cost and agreement counters for an ensemble run"""
+    conversations: int = 0
+    judge_calls: int = 0
+    escalations: Dict[str, int] = field(default_factory=dict)
+    disagreements: int = 0
+    second_opinion_diffs: List[float] = field(default_factory=list)
+    
+    def record(self, reason: Optional[str], overall_scores: List[float], disagreed: bool, judge_calls: Optional[int] = None):
+        """
+        Count one judged conversation
+        
+        Args:
+            reason: Escalation reason (None: not escalated)
+            overall_scores: Overall score of each verdict, primary first
+            disagreed: Whether the first two verdicts disagreed
+            judge_calls: Judge LLM calls made, leaving out verdicts served from
+                the judge cache (default: one per verdict)
+        """
+        self.conversations += 1
+        self.judge_calls += len(overall_scores) if judge_calls is None else judge_calls
+        if reason is None:
+            return
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        if len(overall_scores) > 1:
+            self.second_opinion_diffs.append(abs(overall_scores[1] - overall_scores[0]))
+        if disagreed:
+            self.disagreements += 1
+    
+    def to_dict(self) -> Dict[str, any]:
+        escalated = sum(self.escalations.values())
+        diffs = self.second_opinion_diffs
+        return {
+            "conversations": self.conversations,
+            "judge_calls": self.judge_calls,
+            "calls_per_conversation": self.judge_calls / self.conversations if self.conversations else 0.0,
+            "escalations": dict(self.escalations),
+            "escalation_rate": escalated / self.conversations if self.conversations else 0.0,
+            "agreement_rate": 1 - self.disagreements / len(diffs) if diffs else 0.0,
+            "mean_abs_diff": sum(diffs) / len(diffs) if diffs else 0.0,
+        }
+
+
+def aggregate_results(
+    verdicts: List[Tuple[str, EvaluationResult]],
+    method: str = "median",
+    reason: Optional[str] = None
+) -> EvaluationResult:
+    """
+    Combine several judges' verdicts on one conversation
+    
+    Scores are aggregated field by field. Qualitative feedback comes from the
+    judge closest to the aggregated overall score, success criteria are
+    decided by majority vote (ties go to the primary judge) and violations
+    reported by at least half of the judges are kept.
+    
+    Args:
+        verdicts: (judge name, result) pairs, primary judge first
+        method: "median" or "trimmed_mean"
+        reason: Why the ensemble was escalated
+    
+    Returns:
+        EvaluationResult with per-judge scores and agreement in `ensemble`
+    """
+    primary = verdicts[0][1]
+    score_fields = list(SCORE_FIELDS) + ["overall_score"]
+    scores = {
+        name: aggregate_scores([getattr(result, name) for _, result in verdicts], method)
+        for name in score_fields
+    }
+    
+    overall = [result.overall_score for _, result in verdicts]
+    closest = min(verdicts, key=lambda verdict: abs(verdict[1].overall_score - scores["overall_score"]))[1]
+    
+    criteria = {}
+    for criterion, met in primary.success_criteria_met.items():
+        votes = [result.success_criteria_met.get(criterion, met) for _, result in verdicts]
+        yes = sum(1 for vote in votes if vote)
+        criteria[criterion] = met if yes * 2 == len(votes) else yes * 2 > len(votes)
+    
+    violation_counts: Dict[str, int] = {}
+    for _, result in verdicts:
+        for violation in dict.fromkeys(result.must_not_do_violations):
+            violation_counts[violation] = violation_counts.get(violation, 0) + 1
+    violations = [v for v, count in violation_counts.items() if count * 2 >= len(verdicts)]
+    
+    return replace(
+        primary,
+        **scores,
+        strengths=closest.strengths,
+        weaknesses=closest.weaknesses,
+        recommendations=closest.recommendations,
+        success_criteria_met=criteria,
+        must_not_do_violations=violations,
+        ensemble={
+            "aggregation": method,
+            "reason": reason,
+            "judges": {
+                name: {score: getattr(result, score) for score in score_fields}
+                for name, result in verdicts
+            },
+            "spread": max(overall) - min(overall),
+            "stdev": statistics.pstdev(overall),
+        }
+    )
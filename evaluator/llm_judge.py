@@ -5,10 +5,22 @@ Uses an LLM to evaluate conversation quality across multiple dimensions.
 """
 
 import json
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+import threading
+import typing
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from dataclasses import dataclass, asdict, replace, fields, field
 from models.base_model import BaseModel
 from scenarios.scenario_loader import Scenario
+from .judge_cache import JudgeCache, judge_cache_key, canonical_turns
+from .response_parser import (
+    JudgeParseError, ParseStats, SCORE_FIELDS, extract_json, validate_verdict, build_fix_prompt
+)
+from utils.token_estimate import estimate_tokens
+
+if TYPE_CHECKING:
+    from .judge_ensemble import EnsemblePolicy
+    from .transcript_compression import TranscriptCompressor
+    from .triage import ConversationTriage
 
 try:
     import weave
@@ -16,6 +28,34 @@ try:
 except ImportError:
     WEAVE_AVAILABLE = False
 
+# Bump whenever the judge prompts or result parsing change, so cached
+# verdicts produced by the old rubric are not reused
+PROMPT_TEMPLATE_VERSION = "2"
+
+# Batched judging: expected output tokens per verdict, output cap per call
+# and default prompt + output budget
+BATCH_VERDICT_TOKENS = 600
+BATCH_MAX_OUTPUT_TOKENS = 8192
+DEFAULT_BATCH_TOKEN_BUDGET = 12000
+
+BATCH_SUFFIX_ENGLISH = """
+
+# BATCH MODE
+The CONVERSATION section above contains {count} separate conversations for this scenario, each starting with a "### Conversation ID:" header. Evaluate each conversation independently.
+
+Return a JSON array with exactly one object per conversation. Each object uses the output format above plus a "conversation_id" field copied exactly from the conversation's header.
+
+Provide only the JSON array, no additional text."""
+
+BATCH_SUFFIX_ARABIC = """
+
+# وضع الدفعة
+قسم المحادثة أعلاه يحتوي على {count} محادثات منفصلة لهذا السيناريو، كل منها يبدأ بعنوان "### معرف المحادثة:". قيّم كل محادثة بشكل مستقل.
+
+أرجع مصفوفة JSON تحتوي على كائن واحد لكل محادثة، بنفس صيغة الإخراج أعلاه مع حقل "conversation_id" منسوخ حرفياً من عنوان المحادثة.
+
+قدم مصفوفة JSON فقط، بدون نص إضافي."""
+
 
 @dataclass
 class EvaluationResult:
@@ -46,6 +86,9 @@ class EvaluationResult:
     # Raw LLM response
     raw_evaluation: str
     
+    # Per-judge scores and agreement when an ensemble judged the conversation
+    ensemble: Dict = field(default_factory=dict)
+    
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
         return asdict(self)
@@ -78,19 +121,218 @@ Recommendations:
 """
 
 
+# EvaluationResult fields filled in by the pipeline rather than the judge
+_NON_VERDICT_FIELDS = ("conversation_id", "scenario_id", "model_name", "raw_evaluation", "ensemble")
+
+# Structured-output calls that may fail before falling back to plain prompts for good
+MAX_STRUCTURED_FAILURES = 3
+
+
+def _field_schema(annotation) -> Dict:
+    """JSON schema for an EvaluationResult field type"""
+    if annotation is float:
+        return {"type": "number", "minimum": 0, "maximum": 10}
+    if typing.get_origin(annotation) is list:
+        return {"type": "array", "items": {"type": "string"}}
+    if typing.get_origin(annotation) is dict:
+        # Free-form maps can't be expressed in strict/Gemini schemas
+        return {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "criterion": {"type": "string"},
+                    "met": {"type": "boolean"}
+                },
+                "required": ["criterion", "met"],
+                "additionalProperties": False
+            }
+        }
+    return {"type": "string"}
+
+
+def verdict_schema(batch: bool = False) -> Dict:
+    """
+    JSON schema for judge output, derived from EvaluationResult
+    
+    Every property is required and closed so the same schema works for
+    Claude tool input, Gemini response_schema and OpenAI strict json_schema.
+    
+    Args:
+        batch: Schema for batched judging ({"verdicts": [...]} with conversation_id)
+    
+    Returns:
+        JSON schema dictionary
+    """
+    hints = typing.get_type_hints(EvaluationResult)
+    properties = {}
+    scores = {}
+    for f in fields(EvaluationResult):
+        if f.name in _NON_VERDICT_FIELDS:
+            continue
+        if f.name in SCORE_FIELDS:
+            scores[f.name] = _field_schema(hints[f.name])
+        else:
+            properties[f.name] = _field_schema(hints[f.name])
+    
+    properties["scores"] = {
+        "type": "object",
+        "properties": scores,
+        "required": list(scores),
+        "additionalProperties": False
+    }
+    properties["reasoning"] = {"type": "string"}
+    
+    verdict = {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+    if not batch:
+        return verdict
+    
+    verdict["properties"] = {"conversation_id": {"type": "string"}, **properties}
+    verdict["required"] = list(verdict["properties"])
+    return {
+        "type": "object",
+        "properties": {"verdicts": {"type": "array", "items": verdict}},
+        "required": ["verdicts"],
+        "additionalProperties": False
+    }
+
+
 class LLMJudge:
     """LLM-based evaluator for conversation quality"""
     
-    def __init__(self, judge_model: BaseModel, language: str = "arabic"):
+    def __init__(
+        self,
+        judge_model: BaseModel,
+        language: str = "arabic",
+        cache: Optional[JudgeCache] = None,
+        force: bool = False,
+        structured_output: bool = True,
+        triage: Optional["ConversationTriage"] = None,
+        secondary_judges: Optional[List[BaseModel]] = None,
+        ensemble_policy: Optional["EnsemblePolicy"] = None,
+        compressor: Optional["TranscriptCompressor"] = None
+    ):
         """
         Initialize LLM Judge
         
         Args:
             judge_model: LLM model to use for evaluation
             language: Language for evaluation prompts (arabic or english)
+            cache: Verdict cache; already-judged conversations are skipped
+            force: Re-judge even when a cached verdict exists (the cache
+                is still updated with the new verdict)
+            structured_output: Use provider-native JSON output when the
+                judge model supports it
+            triage: Scores clear-cut conversations locally in batch_evaluate
+                so they never reach the judge model
+            secondary_judges: Models asked for further opinions, in order,
+                when ensemble_policy escalates a verdict
+            ensemble_policy: When to escalate and how to aggregate
+                (defaults to EnsemblePolicy() when secondary_judges is set)
+            compressor: Compacts transcripts before they go into judge prompts
         """
         self.judge_model = judge_model
         self.language = language
+        self.cache = cache
+        self.force = force
+        self.cached_conversation_ids = set()
+        self.failed_conversation_ids = set()
+        self.batch_stats = {
+            "batched_calls": 0,
+            "batched_verdicts": 0,
+            "fallbacks": 0,
+            "estimated_tokens_saved": 0
+        }
+        self.parse_stats = ParseStats()
+        self.structured_output = structured_output and judge_model.supports_structured_output
+        self.triage = triage
+        self.compressor = compressor
+        self._structured_failures = 0
+        # Online judge workers share one judge; counters and ID sets are updated under it
+        self._lock = threading.Lock()
+        
+        self.secondary_judges = [
+            LLMJudge(
+                model,
+                language=language,
+                cache=cache,
+                force=force,
+                structured_output=structured_output,
+                compressor=compressor
+            )
+            for model in secondary_judges or []
+        ]
+        if self.secondary_judges and ensemble_policy is None:
+            from .judge_ensemble import EnsemblePolicy
+            ensemble_policy = EnsemblePolicy()
+        self.ensemble_policy = ensemble_policy if self.secondary_judges else None
+        self.ensemble_stats = None
+        if self.ensemble_policy is not None:
+            from .judge_ensemble import EnsembleStats
+            self.ensemble_stats = EnsembleStats()
+    
+    @property
+    def judge_name(self) -> str:
+        """Judge identity used in cache keys (includes the ensemble setup)"""
+        if self.ensemble_policy is None:
+            return self.judge_model.model_name
+        secondary = ",".join(judge.judge_model.model_name for judge in self.secondary_judges)
+        return f"{self.judge_model.model_name}+{secondary}:{self.ensemble_policy.signature()}"
+    
+    def _call_judge(self, prompt: str, max_tokens: int, batch: bool = False) -> Dict:
+        """
+        Send a judge prompt, using structured output when available
+        
+        Falls back to a plain call when the structured call errors, and
+        stops trying structured output after repeated failures.
+        """
+        system_prompt = "You are an expert evaluator. Provide structured JSON evaluations."
+        
+        if self.structured_output:
+            response = self.judge_model.generate_structured(
+                system_prompt=system_prompt,
+                user_message=prompt,
+                schema=verdict_schema(batch),
+                schema_name="record_evaluations" if batch else "record_evaluation",
+                temperature=0.3,
+                max_tokens=max_tokens
+            )
+            with self._lock:
+                if not response.get("error"):
+                    self._structured_failures = 0
+                    return response
+                self._structured_failures += 1
+                disable = self.structured_output and self._structured_failures >= MAX_STRUCTURED_FAILURES
+                if disable:
+                    self.structured_output = False
+            
+            print(f"  ⚠️  Structured output failed ({response['error']}); retrying with a plain prompt")
+            if disable:
+                print(f"  ⚠️  Disabling structured output for {self.judge_model.model_name}")
+        
+        return self.judge_model.generate_response(
+            system_prompt=system_prompt,
+            conversation_history=[],
+            user_message=prompt,
+            temperature=0.3,  # Lower temperature for more consistent evaluations
+            max_tokens=max_tokens
+        )
+    
+    def cache_key(self, scenario: Scenario, conversation_turns: List[Dict]) -> str:
+        """Cache key for judging these turns with this judge's configuration"""
+        return judge_cache_key(
+            scenario,
+            conversation_turns,
+            self.language,
+            self.judge_name,
+            PROMPT_TEMPLATE_VERSION if self.compressor is None
+            else f"{PROMPT_TEMPLATE_VERSION}+{self.compressor.signature}"
+        )
     
     def _build_evaluation_prompt(
         self,
@@ -100,25 +342,32 @@ class LLMJudge:
     ) -> str:
         """Build the evaluation prompt for the judge LLM"""
         
+        conversation_text = self._format_conversation(conversation_turns)
         if self.language == "arabic":
-            return self._build_arabic_prompt(scenario, conversation_turns, conversation_metadata)
+            return self._build_arabic_prompt(scenario, conversation_text)
         else:
-            return self._build_english_prompt(scenario, conversation_turns, conversation_metadata)
+            return self._build_english_prompt(scenario, conversation_text)
     
-    def _build_english_prompt(
-        self,
-        scenario: Scenario,
-        conversation_turns: List[Dict],
-        conversation_metadata: Dict
-    ) -> str:
-        """Build English evaluation prompt"""
+    def _format_conversation(self, conversation_turns: List[Dict]) -> str:
+        """Format conversation turns for the judge prompt"""
+        if self.language == "arabic":
+            turn_label, customer_label, agent_label, missing = "الدورة", "العميل", "الموظف", "غير متوفر"
+        else:
+            turn_label, customer_label, agent_label, missing = "Turn", "Customer", "Agent", "N/A"
+        
+        pairs = canonical_turns(conversation_turns)
+        if self.compressor is not None:
+            pairs = self.compressor.compact(pairs)
         
-        # Format conversation
         conversation_text = ""
-        for i, turn in enumerate(conversation_turns, 1):
-            conversation_text += f"\n[Turn {i}]\n"
-            conversation_text += f"Customer: {turn.get('customer_message', turn.get('user_message', 'N/A'))}\n"
-            conversation_text += f"Agent: {turn.get('agent_message', turn.get('assistant_message', 'N/A'))}\n"
+        for i, (customer, agent) in enumerate(pairs, 1):
+            conversation_text += f"\n[{turn_label} {i}]\n"
+            conversation_text += f"{customer_label}: {customer or missing}\n"
+            conversation_text += f"{agent_label}: {agent or missing}\n"
+        return conversation_text
+    
+    def _build_english_prompt(self, scenario: Scenario, conversation_text: str) -> str:
+        """Build English evaluation prompt"""
         
         # Format success criteria
         success_criteria_text = "\n".join(f"  - {criterion}" for criterion in scenario.success_criteria)
@@ -142,7 +391,7 @@ class LLMJudge:
 
 **Customer Persona:**
 - Name: {scenario.customer_persona.name}
-- Personality: {scenario.customer_persona.personality_traits}
+- Personality: {scenario.customer_persona.personality}
 - Communication Style: {scenario.customer_persona.communication_style}
 
 **Customer Goal:** {scenario.customer_goal}
@@ -212,21 +461,9 @@ Provide only the JSON, no additional text."""
         
         return prompt
     
-    def _build_arabic_prompt(
-        self,
-        scenario: Scenario,
-        conversation_turns: List[Dict],
-        conversation_metadata: Dict
-    ) -> str:
+    def _build_arabic_prompt(self, scenario: Scenario, conversation_text: str) -> str:
         """Build Arabic evaluation prompt"""
         
-        # Format conversation
-        conversation_text = ""
-        for i, turn in enumerate(conversation_turns, 1):
-            conversation_text += f"\n[الدورة {i}]\n"
-            conversation_text += f"العميل: {turn.get('customer_message', turn.get('user_message', 'غير متوفر'))}\n"
-            conversation_text += f"الموظف: {turn.get('agent_message', turn.get('assistant_message', 'غير متوفر'))}\n"
-        
         # Format success criteria
         success_criteria_text = "\n".join(f"  - {criterion}" for criterion in scenario.success_criteria)
         
@@ -249,7 +486,7 @@ Provide only the JSON, no additional text."""
 
 **شخصية العميل:**
 - الاسم: {scenario.customer_persona.name}
-- الشخصية: {scenario.customer_persona.personality_traits}
+- الشخصية: {scenario.customer_persona.personality}
 - أسلوب التواصل: {scenario.customer_persona.communication_style}
 
 **هدف العميل:** {scenario.customer_goal}
@@ -319,6 +556,121 @@ Provide only the JSON, no additional text."""
         
         return prompt
     
+    def _cached_result(
+        self,
+        conversation_id: str,
+        scenario: Scenario,
+        conversation_turns: List[Dict],
+        model_name: str
+    ) -> Optional[EvaluationResult]:
+        """Get a cached verdict for these turns, relabelled for this conversation"""
+        if self.cache is None or self.force:
+            return None
+        cached = self.cache.get(self.cache_key(scenario, conversation_turns))
+        if cached is None:
+            return None
+        with self._lock:
+            self.cached_conversation_ids.add(conversation_id)
+        return replace(cached, conversation_id=conversation_id, model_name=model_name)
+    
+    def _cache_result(self, scenario: Scenario, conversation_turns: List[Dict], result: EvaluationResult):
+        if self.cache is not None:
+            self.cache.put(self.cache_key(scenario, conversation_turns), result)
+    
+    @staticmethod
+    def _parse_and_validate(text: str, expect: type):
+        """Extract a verdict (or list of verdicts) and check it against the schema"""
+        data, repaired = extract_json(text, expect)
+        verdicts = data if expect is list else [data]
+        problems = [problem for verdict in verdicts for problem in validate_verdict(verdict)]
+        if problems:
+            raise JudgeParseError("; ".join(problems[:5]))
+        return data, repaired
+    
+    def _parse_response(self, raw_response: str, expect: type = dict):
+        """
+        Parse a judge response, repairing it locally or asking the judge to fix it
+        
+        Args:
+            raw_response: Judge output
+            expect: dict for a single verdict, list for batched verdicts
+        
+        Returns:
+            Parsed and validated verdict(s)
+        
+        Raises:
+            JudgeParseError: If the response can't be recovered
+        """
+        self._count_parse("responses")
+        try:
+            data, repaired = self._parse_and_validate(raw_response, expect)
+            self._count_parse("repaired" if repaired else "clean")
+            return data
+        except JudgeParseError as e:
+            if not raw_response:
+                self._count_parse("failed")
+                raise
+            error = str(e)
+        
+        # A format-only follow-up is far cheaper than re-judging the conversation
+        print(f"  🔧 Invalid judge JSON ({error}); asking the judge to fix it")
+        self._count_parse("fix_calls")
+        response = self.judge_model.generate_response(
+            system_prompt="You fix malformed JSON. Output only JSON.",
+            conversation_history=[],
+            user_message=build_fix_prompt(raw_response, error, expect),
+            temperature=0.0,
+            max_tokens=BATCH_MAX_OUTPUT_TOKENS if expect is list else 2048
+        )
+        
+        try:
+            if response.get("error"):
+                raise JudgeParseError(response["error"])
+            data, _ = self._parse_and_validate(response["response"], expect)
+        except JudgeParseError:
+            self._count_parse("failed")
+            raise
+        
+        self._count_parse("fixed")
+        return data
+    
+    def _count_parse(self, counter: str):
+        with self._lock:
+            setattr(self.parse_stats, counter, getattr(self.parse_stats, counter) + 1)
+    
+    def _mark_failed(self, conversation_id: str):
+        with self._lock:
+            self.failed_conversation_ids.add(conversation_id)
+    
+    @staticmethod
+    def _result_from_data(
+        conversation_id: str,
+        scenario: Scenario,
+        model_name: str,
+        evaluation_data: Dict,
+        raw_response: str
+    ) -> EvaluationResult:
+        """Build an EvaluationResult from a parsed judge verdict"""
+        scores = evaluation_data.get("scores", {})
+        
+        return EvaluationResult(
+            conversation_id=conversation_id,
+            scenario_id=scenario.scenario_id,
+            model_name=model_name,
+            task_completion=float(scores.get("task_completion", 0)),
+            empathy=float(scores.get("empathy", 0)),
+            clarity=float(scores.get("clarity", 0)),
+            cultural_fit=float(scores.get("cultural_fit", 0)),
+            problem_solving=float(scores.get("problem_solving", 0)),
+            overall_score=float(evaluation_data.get("overall_score", 0)),
+            strengths=evaluation_data.get("strengths", []),
+            weaknesses=evaluation_data.get("weaknesses", []),
+            recommendations=evaluation_data.get("recommendations", []),
+            success_criteria_met=evaluation_data.get("success_criteria_met", {}),
+            must_not_do_violations=evaluation_data.get("must_not_do_violations", []),
+            raw_evaluation=raw_response
+        )
+    
     @weave.op() if WEAVE_AVAILABLE else lambda f: f
     def evaluate_conversation(
         self,
@@ -342,6 +694,21 @@ Provide only the JSON, no additional text."""
             EvaluationResult with scores and feedback
         """
         
+        cached = self._cached_result(conversation_id, scenario, conversation_turns, model_name)
+        if cached is not None:
+            return cached
+        return self._judge_conversation(conversation_id, scenario, conversation_turns, conversation_metadata, model_name)
+    
+    def _judge_conversation(
+        self,
+        conversation_id: str,
+        scenario: Scenario,
+        conversation_turns: List[Dict],
+        conversation_metadata: Dict,
+        model_name: str
+    ) -> EvaluationResult:
+        """Evaluate a conversation with the judge LLM, bypassing the cache lookup"""
+        
         # Build evaluation prompt
         eval_prompt = self._build_evaluation_prompt(
             scenario, 
@@ -351,53 +718,32 @@ Provide only the JSON, no additional text."""
         
         # Get LLM evaluation
         try:
-            response = self.judge_model.generate_response(
-                system_prompt="You are an expert evaluator. Provide structured JSON evaluations.",
-                conversation_history=[],
-                user_message=eval_prompt,
-                temperature=0.3,  # Lower temperature for more consistent evaluations
-                max_tokens=2048
-            )
+            response = self._call_judge(eval_prompt, max_tokens=2048)
             
             raw_response = response["response"]
             
-            # Extract JSON from response (handle markdown code blocks)
-            json_text = raw_response
-            if "```json" in json_text:
-                json_text = json_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in json_text:
-                json_text = json_text.split("```")[1].split("```")[0].strip()
+            evaluation_data = self._parse_response(raw_response, dict)
             
-            # Parse JSON
-            evaluation_data = json.loads(json_text)
+            result = self._result_from_data(
+                conversation_id,
+                scenario,
+                model_name,
+                evaluation_data,
+                raw_response
+            )
             
-            # Extract scores
-            scores = evaluation_data.get("scores", {})
+            if self.ensemble_policy is not None:
+                result = self._escalate(result, scenario, conversation_turns, conversation_metadata, model_name)
             
-            # Create evaluation result
-            result = EvaluationResult(
-                conversation_id=conversation_id,
-                scenario_id=scenario.scenario_id,
-                model_name=model_name,
-                task_completion=float(scores.get("task_completion", 0)),
-                empathy=float(scores.get("empathy", 0)),
-                clarity=float(scores.get("clarity", 0)),
-                cultural_fit=float(scores.get("cultural_fit", 0)),
-                problem_solving=float(scores.get("problem_solving", 0)),
-                overall_score=float(evaluation_data.get("overall_score", 0)),
-                strengths=evaluation_data.get("strengths", []),
-                weaknesses=evaluation_data.get("weaknesses", []),
-                recommendations=evaluation_data.get("recommendations", []),
-                success_criteria_met=evaluation_data.get("success_criteria_met", {}),
-                must_not_do_violations=evaluation_data.get("must_not_do_violations", []),
-                raw_evaluation=raw_response
-            )
+            # Only successful verdicts are cached; failures are retried next run
+            self._cache_result(scenario, conversation_turns, result)
             
             return result
             
-        except json.JSONDecodeError as e:
+        except JudgeParseError as e:
             # Fallback: create a result with error information
             print(f"⚠️  Failed to parse LLM evaluation JSON: {e}")
+            self._mark_failed(conversation_id)
             return EvaluationResult(
                 conversation_id=conversation_id,
                 scenario_id=scenario.scenario_id,
@@ -418,6 +764,7 @@ Provide only the JSON, no additional text."""
         
         except Exception as e:
             print(f"⚠️  Error during evaluation: {e}")
+            self._mark_failed(conversation_id)
             return EvaluationResult(
                 conversation_id=conversation_id,
                 scenario_id=scenario.scenario_id,
@@ -436,24 +783,222 @@ Provide only the JSON, no additional text."""
                 raw_evaluation=str(e)
             )
     
+    def _escalate(
+        self,
+        result: EvaluationResult,
+        scenario: Scenario,
+        conversation_turns: List[Dict],
+        conversation_metadata: Dict,
+        model_name: str
+    ) -> EvaluationResult:
+        """
+        Ask secondary judges for opinions when the ensemble policy calls for it
+        
+        Judges are added one at a time until their overall scores agree, so
+        clear-cut verdicts cost a single judge call.
+        
+        Args:
+            result: Primary judge's verdict
+            scenario: The test scenario
+            conversation_turns: List of conversation turns
+            conversation_metadata: Metadata about the conversation
+            model_name: Name of the model being evaluated
+        
+        Returns:
+            Aggregated EvaluationResult with per-judge scores in `ensemble`
+        """
+        from .judge_ensemble import aggregate_results
+        
+        policy = self.ensemble_policy
+        reason = policy.escalation_reason(result.conversation_id, result.overall_score)
+        verdicts = [(self.judge_model.model_name, result)]
+        judge_calls = 1
+        
+        if reason is not None:
+            for judge in self.secondary_judges:
+                # Opinions served from the judge cache cost no call
+                opinion = judge._cached_result(result.conversation_id, scenario, conversation_turns, model_name)
+                if opinion is None:
+                    judge_calls += 1
+                    opinion = judge._judge_conversation(
+                        result.conversation_id,
+                        scenario,
+                        conversation_turns,
+                        conversation_metadata,
+                        model_name
+                    )
+                if result.conversation_id in judge.failed_conversation_ids:
+                    continue
+                verdicts.append((judge.judge_model.model_name, opinion))
+                if policy.agrees([verdict.overall_score for _, verdict in verdicts]):
+                    break
+        
+        overall = [verdict.overall_score for _, verdict in verdicts]
+        with self._lock:
+            self.ensemble_stats.record(reason, overall, disagreed=not policy.agrees(overall[:2]), judge_calls=judge_calls)
+        if len(verdicts) > 1:
+            opinions = ", ".join(f"{name}={verdict.overall_score:.1f}" for name, verdict in verdicts)
+            print(f"  👥 Ensemble ({reason}): {opinions}")
+        
+        return aggregate_results(verdicts, policy.aggregation, reason)
+    
+    def _build_batch_prompt(self, scenario: Scenario, conversations: List[Dict]) -> str:
+        """Build one prompt judging several conversations of the same scenario"""
+        if self.language == "arabic":
+            header = "### معرف المحادثة: {conversation_id}"
+            builder = self._build_arabic_prompt
+            suffix = BATCH_SUFFIX_ARABIC
+        else:
+            header = "### Conversation ID: {conversation_id}"
+            builder = self._build_english_prompt
+            suffix = BATCH_SUFFIX_ENGLISH
+        
+        conversation_text = ""
+        for conv in conversations:
+            conversation_text += "\n" + header.format(conversation_id=conv.get("conversation_id", "unknown")) + "\n"
+            conversation_text += self._format_conversation(conv.get("turns", []))
+        
+        return builder(scenario, conversation_text) + suffix.format(count=len(conversations))
+    
+    def _evaluate_conversation_dict(self, scenario: Scenario, conv: Dict) -> EvaluationResult:
+        return self.evaluate_conversation(
+            conversation_id=conv.get("conversation_id", "unknown"),
+            scenario=scenario,
+            conversation_turns=conv.get("turns", []),
+            conversation_metadata=conv,
+            model_name=conv.get("model_name", "unknown")
+        )
+    
+    @weave.op() if WEAVE_AVAILABLE else lambda f: f
+    def evaluate_batch(self, scenario: Scenario, conversations: List[Dict]) -> List[EvaluationResult]:
+        """
+        Judge several conversations of one scenario in a single LLM call
+        
+        The rubric is sent once for the whole batch. If the response doesn't
+        contain exactly one verdict per conversation ID, every conversation
+        in the batch is judged individually instead.
+        
+        Args:
+            scenario: Scenario shared by all conversations
+            conversations: Conversation dictionaries
+        
+        Returns:
+            EvaluationResults in the order of conversations
+        """
+        if len(conversations) == 1:
+            return [self._evaluate_conversation_dict(scenario, conversations[0])]
+        
+        ids = [str(conv.get("conversation_id", "unknown")) for conv in conversations]
+        if len(set(ids)) != len(ids):
+            # Verdicts can't be mapped back without unique IDs
+            return [self._evaluate_conversation_dict(scenario, conv) for conv in conversations]
+        
+        prompt = self._build_batch_prompt(scenario, conversations)
+        
+        try:
+            response = self._call_judge(
+                prompt,
+                max_tokens=min(BATCH_VERDICT_TOKENS * len(conversations) + 1024, BATCH_MAX_OUTPUT_TOKENS),
+                batch=True
+            )
+            if response.get("error"):
+                raise ValueError(response["error"])
+            
+            # Structured batches arrive as {"verdicts": [...]}; the first array
+            # in that object is the verdict list
+            verdicts = self._parse_response(response["response"], list)
+            
+            by_id = {
+                str(v.get("conversation_id")): v
+                for v in verdicts if isinstance(v, dict)
+            }
+            if len(verdicts) != len(ids) or set(by_id) != set(ids):
+                raise ValueError(f"expected verdicts for {sorted(ids)}, got {sorted(by_id)}")
+        
+        except Exception as e:
+            print(f"  ⚠️  Batched judging failed ({e}); judging {len(conversations)} conversations individually")
+            with self._lock:
+                self.batch_stats["fallbacks"] += 1
+            return [self._evaluate_conversation_dict(scenario, conv) for conv in conversations]
+        
+        results = []
+        for conv, conversation_id in zip(conversations, ids):
+            verdict = by_id[conversation_id]
+            result = self._result_from_data(
+                conversation_id,
+                scenario,
+                conv.get("model_name", "unknown"),
+                verdict,
+                json.dumps(verdict, ensure_ascii=False)
+            )
+            if self.ensemble_policy is not None:
+                result = self._escalate(result, scenario, conv.get("turns", []), conv, result.model_name)
+            self._cache_result(scenario, conv.get("turns", []), result)
+            results.append(result)
+        
+        # Estimated prompt tokens single-item judging would have sent
+        single_tokens = sum(
+            estimate_tokens(self._build_evaluation_prompt(scenario, conv.get("turns", []), conv))
+            for conv in conversations
+        )
+        with self._lock:
+            self.batch_stats["batched_calls"] += 1
+            self.batch_stats["batched_verdicts"] += len(conversations)
+            self.batch_stats["estimated_tokens_saved"] += max(single_tokens - estimate_tokens(prompt), 0)
+        
+        return results
+    
+    def tokens_saved_per_verdict(self) -> float:
+        """Estimated prompt tokens saved per batched verdict"""
+        verdicts = self.batch_stats["batched_verdicts"]
+        return self.batch_stats["estimated_tokens_saved"] / verdicts if verdicts else 0.0
+    
     def batch_evaluate(
         self,
-        conversations: List[Dict],
-        scenarios: Dict[str, Scenario]
+        conversations: Iterable[Dict],
+        scenarios: Dict[str, Scenario],
+        batch_size: int = 1,
+        batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET
     ) -> List[EvaluationResult]:
         """
         Evaluate multiple conversations
         
         Args:
-            conversations: List of conversation dictionaries
+            conversations: Conversation dictionaries (a list or a stream)
             scenarios: Dictionary mapping scenario_id to Scenario objects
+            batch_size: Conversations of the same scenario judged per LLM
+                call (1 judges each conversation separately)
+            batch_token_budget: Estimated prompt + output token budget for
+                one batched call
             
         Returns:
             List of EvaluationResults
         """
         
         results = []
-        total = len(conversations)
+        total = len(conversations) if hasattr(conversations, "__len__") else "?"
+        self.cached_conversation_ids = set()
+        self.failed_conversation_ids = set()
+        pending: Dict[str, List[Dict]] = {}
+        
+        def report(result: EvaluationResult):
+            results.append(result)
+            if result.conversation_id in self.cached_conversation_ids:
+                print(f"  ♻️  Cached Score: {result.overall_score:.1f}/10")
+            else:
+                print(f"  ✅ Overall Score: {result.overall_score:.1f}/10")
+        
+        def flush(scenario_id: str):
+            batch = pending.pop(scenario_id, [])
+            if not batch:
+                return
+            if len(batch) > 1:
+                print(f"  📦 Judging {len(batch)} conversations of {scenario_id} in one call")
+            try:
+                for result in self.evaluate_batch(scenarios[scenario_id], batch):
+                    report(result)
+            except Exception as e:
+                print(f"  ❌ Failed: {e}")
         
         for i, conv in enumerate(conversations, 1):
             print(f"Evaluating conversation {i}/{total}: {conv.get('conversation_id', 'unknown')}")
@@ -465,20 +1010,43 @@ Provide only the JSON, no additional text."""
                 print(f"  ⚠️  Scenario not found: {scenario_id}")
                 continue
             
-            try:
-                result = self.evaluate_conversation(
-                    conversation_id=conv.get("conversation_id", "unknown"),
-                    scenario=scenario,
-                    conversation_turns=conv.get("turns", []),
-                    conversation_metadata=conv,
-                    model_name=conv.get("model_name", "unknown")
-                )
-                
-                results.append(result)
-                print(f"  ✅ Overall Score: {result.overall_score:.1f}/10")
-                
-            except Exception as e:
-                print(f"  ❌ Failed: {e}")
+            if self.triage is not None:
+                decision = self.triage.assess(conv, scenario)
+                if not decision.needs_judge:
+                    print(f"  🩺 Triaged ({decision.reason}), no judge call")
+                    report(decision.verdict)
+                    continue
+            
+            if batch_size <= 1:
+                try:
+                    report(self._evaluate_conversation_dict(scenario, conv))
+                except Exception as e:
+                    print(f"  ❌ Failed: {e}")
+                continue
+            
+            cached = self._cached_result(
+                conv.get("conversation_id", "unknown"),
+                scenario,
+                conv.get("turns", []),
+                conv.get("model_name", "unknown")
+            )
+            if cached is not None:
+                report(cached)
+                continue
+            
+            batch = pending.setdefault(scenario_id, [])
+            if batch:
+                estimated = estimate_tokens(self._build_batch_prompt(scenario, batch + [conv]))
+                estimated += BATCH_VERDICT_TOKENS * (len(batch) + 1)
+                if estimated > batch_token_budget:
+                    flush(scenario_id)
+                    batch = pending.setdefault(scenario_id, [])
+            
+            batch.append(conv)
+            if len(batch) >= batch_size:
+                flush(scenario_id)
+        
+        for scenario_id in list(pending):
+            flush(scenario_id)
         
         return results
-
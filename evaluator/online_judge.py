@@ -0,0 +1,141 @@
+"""
+Online judging overlapped with conversation generation
+
+Completed conversations are put on a queue as soon as they finish and judge
+worker threads score them while the next conversations are generated, so a
+run takes roughly max(generation, judging) instead of their sum. Each verdict
+can be handed to a callback (e.g. saved to storage) as soon as it exists, so
+an interrupted run keeps the verdicts it already paid for.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from scenarios.scenario_loader import Scenario
+from .llm_judge import LLMJudge, EvaluationResult
+
+
+class OnlineJudge:
+    """Judges conversations on background workers while generation continues"""
+    
+    def __init__(
+        self,
+        judge: LLMJudge,
+        workers: int = 2,
+        max_pending: int = 0,
+        on_result: Optional[Callable[[EvaluationResult], None]] = None
+    ):
+        """
+        Initialize online judge and start its workers
+        
+        Args:
+            judge: Configured LLMJudge (cache, triage and ensemble apply)
+            workers: Number of judge worker threads
+            max_pending: Queue size at which submit blocks (0 = unbounded)
+            on_result: Called with each verdict as it is produced, one call
+                at a time (e.g. to save it)
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        
+        self.judge = judge
+        self.on_result = on_result
+        self.results: List[EvaluationResult] = []
+        self.latencies: List[float] = []  # Seconds from conversation end to verdict
+        self.errors = 0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._result_lock = threading.Lock()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"judge-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def submit(self, conversation: Dict, scenario: Scenario):
+        """
+        Queue a completed conversation for judging
+        
+        Args:
+            conversation: Conversation dictionary (with conversation_id)
+            scenario: Scenario the conversation ran (variants included)
+        """
+        if self._closed:
+            raise RuntimeError("OnlineJudge is closed")
+        self._queue.put((conversation, scenario, time.time()))
+    
+    @property
+    def pending(self) -> int:
+        """Conversations waiting for a judge worker"""
+        return self._queue.qsize()
+    
+    def _judge(self, conversation: Dict, scenario: Scenario) -> EvaluationResult:
+        if self.judge.triage is not None:
+            decision = self.judge.triage.assess(conversation, scenario)
+            if not decision.needs_judge:
+                return decision.verdict
+        
+        return self.judge.evaluate_conversation(
+            conversation_id=conversation.get("conversation_id", "unknown"),
+            scenario=scenario,
+            conversation_turns=conversation.get("turns", []),
+            conversation_metadata=conversation,
+            model_name=conversation.get("model_name", "unknown")
+        )
+    
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                
+                conversation, scenario, submitted = item
+                try:
+                    result = self._judge(conversation, scenario)
+                except Exception as e:
+                    print(f"   ❌ Online judging failed for {conversation.get('conversation_id', 'unknown')}: {e}")
+                    with self._lock:
+                        self.errors += 1
+                    continue
+                
+                latency = time.time() - submitted
+                with self._lock:
+                    self.results.append(result)
+                    self.latencies.append(latency)
+                print(f"   ⚖️  Judged {result.conversation_id}: {result.overall_score:.1f}/10 "
+                      f"({latency:.1f}s after it ended)")
+                
+                if self.on_result is not None:
+                    try:
+                        with self._result_lock:
+                            self.on_result(result)
+                    except Exception as e:
+                        print(f"   ⚠️  Failed to save verdict for {result.conversation_id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def close(self) -> List[EvaluationResult]:
+        """
+        Wait for queued conversations to be judged and stop the workers
+        
+        Returns:
+            All verdicts, in completion order
+        """
+        if not self._closed:
+            self._closed = True
+            for _ in self._workers:
+                self._queue.put(None)
+            for worker in self._workers:
+                worker.join()
+        return list(self.results)
+    
+    def __enter__(self) -> "OnlineJudge":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,282 @@
+"""
+Tolerant JSON extraction for judge responses
+
+Judge models wrap their JSON in prose, leave trailing commas, or run out of
+tokens mid-object. Instead of zeroing the verdict (and paying for a whole new
+judge call), responses are scanned for the first balanced JSON value, common
+defects are repaired, and the result is checked against the verdict schema.
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+
+SCORE_FIELDS = ("task_completion", "empathy", "clarity", "cultural_fit", "problem_solving")
+LIST_FIELDS = ("strengths", "weaknesses", "recommendations", "must_not_do_violations")
+
+# Number of trailing elements dropped while repairing a truncated response
+MAX_TRUNCATION_CUTS = 50
+
+
+class JudgeParseError(ValueError):
+    """Raised when a judge response can't be turned into a valid verdict"""
+
+
+def _scan(text: str, start: int) -> Tuple[int, List[str], bool, List[int]]:
+    """
+    Scan a JSON value starting at text[start]
+    
+    Returns:
+        (end index or -1 if truncated, open closers, inside a string,
+        positions of commas outside strings)
+    """
+    stack = []
+    commas = []
+    in_string = False
+    escaped = False
+    
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                raise JudgeParseError(f"unbalanced '{ch}' at position {i}")
+            stack.pop()
+            if not stack:
+                return i, stack, False, commas
+        elif ch == ",":
+            commas.append(i)
+    
+    return -1, stack, in_string, commas
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing brace/bracket (outside strings)"""
+    result = []
+    in_string = False
+    escaped = False
+    
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            result.append(ch)
+            continue
+        
+        if ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                continue
+        result.append(ch)
+    
+    return "".join(result)
+
+
+def _close_truncated(fragment: str) -> str:
+    """Close an open string and all open containers of a truncated value"""
+    _, stack, in_string, _ = _scan(fragment, 0)
+    text = fragment + ('"' if in_string else "")
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def _repair_truncated(fragment: str):
+    """Drop trailing elements until the closed fragment parses"""
+    candidate = fragment
+    for _ in range(MAX_TRUNCATION_CUTS):
+        try:
+            return json.loads(strip_trailing_commas(_close_truncated(candidate)))
+        except (ValueError, JudgeParseError):
+            pass
+        
+        _, _, _, commas = _scan(candidate, 0)
+        if not commas:
+            break
+        candidate = candidate[:commas[-1]]
+    
+    raise JudgeParseError("truncated JSON could not be repaired")
+
+
+def extract_json(text: str, expect: Optional[type] = None) -> Tuple[any, bool]:
+    """
+    Extract the first JSON value from a judge response
+    
+    Args:
+        text: Raw response text
+        expect: dict or list to only accept values of that type
+    
+    Returns:
+        (parsed value, whether a repair was needed)
+    
+    Raises:
+        JudgeParseError: If no valid JSON value can be recovered
+    """
+    if not text:
+        raise JudgeParseError("empty response")
+    
+    openers = "{" if expect is dict else "[" if expect is list else "{["
+    last_error = None
+    
+    for start, ch in enumerate(text):
+        if ch not in openers:
+            continue
+        
+        try:
+            end, _, _, _ = _scan(text, start)
+        except JudgeParseError as e:
+            last_error = e
+            continue
+        
+        if end == -1:
+            # Ran off the end of the response: truncated output
+            value = _repair_truncated(text[start:])
+            repaired = True
+        else:
+            candidate = text[start:end + 1]
+            try:
+                value, repaired = json.loads(candidate), False
+            except ValueError:
+                try:
+                    value, repaired = json.loads(strip_trailing_commas(candidate)), True
+                except ValueError as e:
+                    last_error = e
+                    continue
+        
+        if expect is None or isinstance(value, expect):
+            return value, repaired
+    
+    raise JudgeParseError(f"no valid JSON {expect.__name__ if expect else 'value'} found"
+                          + (f" ({last_error})" if last_error else ""))
+
+
+def _as_score(value, name: str, problems: List[str]) -> float:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        problems.append(f"{name} is not a number: {value!r}")
+        return 0.0
+    if not 0 <= score <= 10:
+        problems.append(f"{name} out of range 0-10: {score}")
+    return score
+
+
+def validate_verdict(data: Dict) -> List[str]:
+    """
+    Check a verdict against the judge schema, normalizing it in place
+    
+    Scores given as numeric strings are converted to floats and single
+    strings in list fields are wrapped in a list.
+    
+    Args:
+        data: Parsed verdict
+    
+    Returns:
+        List of problems (empty if valid)
+    """
+    if not isinstance(data, dict):
+        return [f"verdict is not an object: {type(data).__name__}"]
+    
+    problems = []
+    scores = data.get("scores")
+    if not isinstance(scores, dict):
+        problems.append("missing 'scores' object")
+    else:
+        for name in SCORE_FIELDS:
+            if name not in scores:
+                problems.append(f"missing score '{name}'")
+            else:
+                scores[name] = _as_score(scores[name], name, problems)
+    
+    if "overall_score" not in data:
+        problems.append("missing 'overall_score'")
+    else:
+        data["overall_score"] = _as_score(data["overall_score"], "overall_score", problems)
+    
+    for name in LIST_FIELDS:
+        value = data.get(name, [])
+        if isinstance(value, str):
+            data[name] = [value]
+        elif not isinstance(value, list):
+            problems.append(f"'{name}' must be a list")
+    
+    criteria = data.get("success_criteria_met", {})
+    if isinstance(criteria, list):
+        # Structured-output schemas send the map as [{"criterion", "met"}]
+        try:
+            data["success_criteria_met"] = {item["criterion"]: bool(item["met"]) for item in criteria}
+        except (TypeError, KeyError):
+            problems.append("'success_criteria_met' items need 'criterion' and 'met'")
+    elif not isinstance(criteria, dict):
+        problems.append("'success_criteria_met' must be an object")
+    
+    return problems
+
+
+def build_fix_prompt(raw_response: str, error: str, expect: type) -> str:
+    """
+    Build a short follow-up prompt asking the judge to fix its own output
+    
+    Args:
+        raw_response: The judge's invalid output
+        error: What was wrong with it
+        expect: dict (single verdict) or list (batched verdicts)
+    
+    Returns:
+        Prompt text
+    """
+    shape = "a JSON array of verdict objects" if expect is list else "a single JSON verdict object"
+    return f"""Your previous evaluation output was not valid: {error}
+
+Rewrite it as {shape} with this structure and nothing else:
+{{"scores": {{"task_completion": 0-10, "empathy": 0-10, "clarity": 0-10, "cultural_fit": 0-10, "problem_solving": 0-10}}, "success_criteria_met": {{}}, "must_not_do_violations": [], "strengths": [], "weaknesses": [], "recommendations": [], "overall_score": 0-10, "reasoning": ""}}
+{"Keep every object's conversation_id. " if expect is list else ""}Keep your original judgments; only fix the format. All scores must be numbers between 0 and 10.
+
+Previous output:
+{raw_response}"""
+
+
+class ParseStats:
+    """Counters for judge response parsing"""
+    
+    def __init__(self):
+        self.responses = 0
+        self.clean = 0
+        self.repaired = 0
+        self.fix_calls = 0
+        self.fixed = 0
+        self.failed = 0
+    
+    def to_dict(self) -> Dict[str, float]:
+        total = self.responses or 1
+        return {
+            "responses": self.responses,
+            "clean": self.clean,
+            "repaired": self.repaired,
+            "fix_calls": self.fix_calls,
+            "fixed": self.fixed,
+            "failed": self.failed,
+            "parse_failure_rate": (self.responses - self.clean) / total,
+            "repair_rate": (self.repaired + self.fixed) / total,
+        }
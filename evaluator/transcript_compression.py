@@ -0,0 +1,271 @@
+"""
+Transcript compression for judge prompts
+
+Shrinks conversation transcripts before they are inlined into judge prompts:
+normalizes whitespace and diacritics, drops greetings and sentences the agent
+already said in earlier turns, and truncates over-long messages with visible
+markers. compare_compression_levels() measures what each level costs in
+accuracy against uncompressed judging on a held-out set.
+"""
+
+import random
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from scenarios.scenario_loader import Scenario
+from utils.arabic_text import normalize_arabic, strip_diacritics
+from utils.token_estimate import estimate_tokens
+from .llm_judge import LLMJudge
+from .response_parser import SCORE_FIELDS
+
+
+@dataclass(frozen=True)
+class CompressionConfig:
+    """What a compression level does"""
+    normalize_text: bool = True  # Collapse whitespace, strip diacritics and tatweel
+    dedupe: bool = False  # Drop agent greetings and sentences repeated from earlier turns
+    max_agent_chars: Optional[int] = None
+    max_customer_chars: Optional[int] = None
+
+
+COMPRESSION_LEVELS: Dict[int, CompressionConfig] = {
+    1: CompressionConfig(),
+    2: CompressionConfig(dedupe=True, max_agent_chars=800),
+    3: CompressionConfig(dedupe=True, max_agent_chars=400, max_customer_chars=400),
+}
+
+# Greeting/boilerplate phrases (normalized); a sentence is only dropped when
+# it consists of nothing but these phrases and punctuation
+_BOILERPLATE = tuple(normalize_arabic(phrase) for phrase in (
+    "مرحبا", "أهلا", "اهلا وسهلا", "أهلا بيك", "السلام عليكم", "وعليكم السلام",
+    "صباح الخير", "مساء الخير", "شكرا لتواصلك", "شكرا لتواصلكم", "شكرا لتواصلك معنا",
+    "يسعدني مساعدتك", "أنا هنا لمساعدتك", "كيف يمكنني مساعدتك", "ازاي اقدر اساعدك",
+    "hello", "hi", "good morning", "good evening", "thank you for contacting us",
+    "thank you for contacting", "thanks for reaching out", "i'm happy to help",
+    "i am happy to help", "how can i help you", "how can i help you today",
+))
+_BOILERPLATE_RE = re.compile(
+    r"(?:(?:" + "|".join(re.escape(phrase) for phrase in sorted(_BOILERPLATE, key=len, reverse=True))
+    + r")(?!\w)[\s.!?,،؛;:]*)+"
+)
+# Repeated sentences shorter than this are too generic to drop
+_MIN_REPEAT_CHARS = 20
+
+# Splits after sentence-ending punctuation, keeping the whitespace as a separator
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?؟\n])(\s+)")
+_SPACES_RE = re.compile(r"[ \t ]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+_MARKERS = {
+    "english": {
+        "removed": "[{count} repeated/greeting sentence(s) removed]",
+        "truncated": " [… {count} characters truncated …] ",
+    },
+    "arabic": {
+        "removed": "[تم حذف {count} جملة مكررة/تحية]",
+        "truncated": " [… تم اختصار {count} حرف …] ",
+    },
+}
+
+
+def normalize_message(text: str) -> str:
+    """Strip diacritics and collapse whitespace, keeping spelling and line breaks"""
+    text = strip_diacritics(text)
+    text = _SPACES_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n", text)
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def truncate_message(text: str, max_chars: int, marker: str) -> str:
+    """
+    Keep the start and end of an over-long message
+    
+    Args:
+        text: Message
+        max_chars: Characters kept (70% head, 30% tail)
+        marker: Marker template with a {count} placeholder
+    
+    Returns:
+        Truncated message, or the message itself if it fits
+    """
+    if len(text) <= max_chars:
+        return text
+    head = int(max_chars * 0.7)
+    tail = max_chars - head
+    removed = len(text) - head - tail
+    return text[:head].rstrip() + marker.format(count=removed) + text[len(text) - tail:].lstrip()
+
+
+class TranscriptCompressor:
+    """Compacts transcripts before they are inlined into judge prompts"""
+    
+    def __init__(self, level: int = 2, language: str = "english"):
+        """
+        Initialize compressor
+        
+        Args:
+            level: Compression level (see COMPRESSION_LEVELS)
+            language: Language of the inserted markers (arabic or english)
+        """
+        if level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level: {level}. Use one of {sorted(COMPRESSION_LEVELS)}")
+        self.level = level
+        self.config = COMPRESSION_LEVELS[level]
+        self.markers = _MARKERS.get(language, _MARKERS["english"])
+        self.chars_in = 0
+        self.chars_out = 0
+    
+    @property
+    def signature(self) -> str:
+        """Identifies the compression setup in judge cache keys"""
+        return f"c{self.level}"
+    
+    @property
+    def ratio(self) -> float:
+        """Compressed size as a fraction of the original"""
+        return self.chars_out / self.chars_in if self.chars_in else 1.0
+    
+    def _dedupe(self, text: str, seen: set, first_turn: bool) -> str:
+        parts = _SENTENCE_END_RE.split(text)
+        sentences, separators = parts[0::2], parts[1::2] + [""]
+        
+        result = ""
+        gap = ""  # Whitespace between the last kept sentence and the next one
+        removed = 0
+        for sentence, separator in zip(sentences, separators):
+            key = normalize_arabic(sentence).strip(" .!?,")
+            is_boilerplate = not first_turn and _BOILERPLATE_RE.fullmatch(key) is not None
+            if not key or is_boilerplate or (len(key) >= _MIN_REPEAT_CHARS and key in seen):
+                removed += 1 if key else 0
+                gap += separator
+                continue
+            seen.add(key)
+            if result:
+                # Line breaks around dropped sentences survive
+                result += "\n" if "\n" in gap else " "
+            result += sentence
+            gap = separator
+        
+        if removed:
+            result = (result + " " + self.markers["removed"].format(count=removed)).strip()
+        return result
+    
+    def compact(self, pairs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        Compress (customer, agent) message pairs
+        
+        Args:
+            pairs: Output of canonical_turns()
+        
+        Returns:
+            Compressed pairs (missing messages stay missing)
+        """
+        config = self.config
+        seen: set = set()
+        compacted = []
+        for i, (customer, agent) in enumerate(pairs):
+            self.chars_in += len(customer or "") + len(agent or "")
+            
+            if customer and config.normalize_text:
+                customer = normalize_message(customer)
+            if customer and config.max_customer_chars:
+                customer = truncate_message(customer, config.max_customer_chars, self.markers["truncated"])
+            
+            if agent and config.normalize_text:
+                agent = normalize_message(agent)
+            if agent and config.dedupe:
+                agent = self._dedupe(agent, seen, first_turn=i == 0)
+            if agent and config.max_agent_chars:
+                agent = truncate_message(agent, config.max_agent_chars, self.markers["truncated"])
+            
+            self.chars_out += len(customer or "") + len(agent or "")
+            compacted.append((customer, agent))
+        return compacted
+
+
+def select_holdout(conversations: List[Dict], size: int, seed: int = 0) -> List[Dict]:
+    """Reproducible random sample of conversations for compression comparisons"""
+    if size >= len(conversations):
+        return list(conversations)
+    return random.Random(seed).sample(list(conversations), size)
+
+
+def compare_compression_levels(
+    judge: LLMJudge,
+    conversations: List[Dict],
+    scenarios: Dict[str, Scenario],
+    levels: Optional[List[int]] = None
+) -> Dict[str, any]:
+    """
+    Judge the same conversations uncompressed and at each compression level
+    
+    Each level's verdicts are compared with the uncompressed verdict of the
+    same conversation. Verdicts go through the judge's cache, so re-running
+    the report only pays for levels that haven't been judged yet.
+    
+    Args:
+        judge: Judge for the uncompressed baseline; its model, language and
+            cache are reused for every level
+        conversations: Held-out conversations (see select_holdout)
+        scenarios: Dictionary mapping scenario_id to Scenario objects
+        levels: Compression levels to compare (default: all)
+    
+    Returns:
+        Report with prompt tokens, token reduction and score error per level
+    """
+    conversations = [c for c in conversations if c.get("scenario_id") in scenarios]
+    levels = levels or sorted(COMPRESSION_LEVELS)
+    
+    def run(level_judge: LLMJudge) -> Tuple[Dict[str, any], int]:
+        verdicts = {}
+        tokens = 0
+        for conv in conversations:
+            scenario = scenarios[conv["scenario_id"]]
+            tokens += estimate_tokens(level_judge._build_evaluation_prompt(scenario, conv.get("turns", []), conv))
+            result = level_judge._evaluate_conversation_dict(scenario, conv)
+            if result.conversation_id not in level_judge.failed_conversation_ids:
+                verdicts[result.conversation_id] = result
+        return verdicts, tokens
+    
+    print(f"🗜️  Compression report: judging {len(conversations)} held-out conversations uncompressed")
+    baseline, baseline_tokens = run(judge)
+    report = {
+        "conversations": len(conversations),
+        "baseline": {"prompt_tokens": baseline_tokens, "judged": len(baseline)},
+        "levels": {},
+    }
+    
+    for level in levels:
+        print(f"🗜️  Compression report: level {level}")
+        compressor = TranscriptCompressor(level, judge.language)
+        level_judge = LLMJudge(
+            judge.judge_model,
+            language=judge.language,
+            cache=judge.cache,
+            force=judge.force,
+            structured_output=judge.structured_output,
+            compressor=compressor
+        )
+        verdicts, tokens = run(level_judge)
+        
+        pairs = [(baseline[cid], verdicts[cid]) for cid in verdicts if cid in baseline]
+        errors = {
+            name: (sum(abs(getattr(b, name) - getattr(c, name)) for b, c in pairs) / len(pairs) if pairs else None)
+            for name in list(SCORE_FIELDS) + ["overall_score"]
+        }
+        report["levels"][str(level)] = {
+            "config": vars(compressor.config),
+            "prompt_tokens": tokens,
+            "token_reduction": 1 - tokens / baseline_tokens if baseline_tokens else 0.0,
+            "transcript_ratio": compressor.ratio,
+            "compared": len(pairs),
+            "overall_mae": errors.pop("overall_score"),
+            "dimension_mae": errors,
+            "within_one_point": (
+                sum(1 for b, c in pairs if abs(b.overall_score - c.overall_score) <= 1.0) / len(pairs)
+                if pairs else None
+            ),
+        }
+    
+    return report
@@ -0,0 +1,169 @@
+"""
+Heuristic triage before LLM judging
+
+Computes cheap local features for a conversation and scores the clear-cut
+failures deterministically (no turns, agent errors before the scenario's
+minimum turns, empty agent replies). Everything else goes to the LLM judge.
+"""
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from scenarios.scenario_loader import Scenario
+from utils.arabic_text import normalize_arabic
+from .judge_cache import canonical_turns
+from .llm_judge import EvaluationResult
+
+
+# Agent replies shorter than this (after stripping) count as empty
+MIN_AGENT_CHARS = 5
+
+# Words that carry no meaning in must_not_do descriptions ("not", "give", ...)
+_STOPWORDS = {
+    normalize_arabic(word) for word in (
+        "عدم", "إعطاء", "بدون", "رغم", "غير", "من", "في", "على", "عن", "إلى", "مع",
+        "أو", "ثم", "قبل", "بعد", "the", "a", "an", "to", "of", "not", "without", "and", "or"
+    )
+}
+
+
+@dataclass
+class TriageDecision:
+    """Outcome of triaging one conversation"""
+    features: Dict[str, any]
+    verdict: Optional[EvaluationResult] = None  # Set when no LLM call is needed
+    reason: str = ""
+    
+    @property
+    def needs_judge(self) -> bool:
+        return self.verdict is None
+
+
+@dataclass
+class TriageStats:
+    """Counts of triaged conversations"""
+    triaged: int = 0
+    deterministic: int = 0
+    reasons: Dict[str, int] = field(default_factory=dict)
+    
+    @property
+    def avoided_fraction(self) -> float:
+        """Fraction of judge calls avoided"""
+        return self.deterministic / self.triaged if self.triaged else 0.0
+
+
+def _keywords(text: str) -> List[str]:
+    return [
+        word for word in normalize_arabic(text).replace("(", " ").replace(")", " ").split()
+        if len(word) > 2 and word not in _STOPWORDS
+    ]
+
+
+def must_not_do_hits(scenario: Scenario, agent_text: str, min_matches: int = 2) -> List[str]:
+    """
+    Find must_not_do items whose keywords appear in the agent's messages
+    
+    A weak signal only (the items describe behaviours, not phrases), so it
+    is reported as a feature and never used for a deterministic verdict.
+    
+    Args:
+        scenario: Scenario with must_not_do items
+        agent_text: Normalized concatenated agent messages
+        min_matches: Keywords of an item that must appear
+    
+    Returns:
+        Matching must_not_do items
+    """
+    words = set(agent_text.split())
+    hits = []
+    for item in scenario.must_not_do:
+        keywords = _keywords(item)
+        matches = sum(1 for keyword in keywords if keyword in words)
+        if keywords and matches >= min(min_matches, len(keywords)):
+            hits.append(item)
+    return hits
+
+
+class ConversationTriage:
+    """Scores clear-cut conversations locally and routes the rest to the judge"""
+    
+    def __init__(self, min_agent_chars: int = MIN_AGENT_CHARS):
+        """
+        Initialize triage
+        
+        Args:
+            min_agent_chars: Agent replies shorter than this count as empty
+        """
+        self.min_agent_chars = min_agent_chars
+        self.stats = TriageStats()
+        self._lock = threading.Lock()  # Online judge workers share one triage
+    
+    def features(self, conversation: Dict, scenario: Scenario) -> Dict[str, any]:
+        """Compute local features of a conversation"""
+        pairs = canonical_turns(conversation.get("turns", []))
+        agent_messages = [agent or "" for _, agent in pairs]
+        agent_lengths = [len(message.strip()) for message in agent_messages]
+        
+        return {
+            "turn_count": len(pairs),
+            "end_reason": conversation.get("end_reason", ""),
+            "empty_agent_turns": sum(1 for length in agent_lengths if length < self.min_agent_chars),
+            "avg_agent_chars": sum(agent_lengths) / len(agent_lengths) if agent_lengths else 0.0,
+            "max_agent_chars": max(agent_lengths, default=0),
+            "must_not_do_hits": must_not_do_hits(
+                scenario,
+                normalize_arabic(" ".join(agent_messages))
+            ),
+        }
+    
+    def _failure_reason(self, features: Dict[str, any], scenario: Scenario) -> Optional[str]:
+        if features["turn_count"] == 0:
+            return "no_turns"
+        if features["end_reason"].startswith("Agent error") and features["turn_count"] < scenario.min_turns:
+            return "agent_error"
+        if features["empty_agent_turns"] == features["turn_count"]:
+            return "empty_agent_messages"
+        return None
+    
+    def assess(self, conversation: Dict, scenario: Scenario) -> TriageDecision:
+        """
+        Triage a conversation
+        
+        Args:
+            conversation: Conversation dictionary
+            scenario: Its scenario
+        
+        Returns:
+            TriageDecision with a verdict if the conversation is clear-cut
+        """
+        features = self.features(conversation, scenario)
+        reason = self._failure_reason(features, scenario)
+        
+        with self._lock:
+            self.stats.triaged += 1
+            if reason is not None:
+                self.stats.deterministic += 1
+                self.stats.reasons[reason] = self.stats.reasons.get(reason, 0) + 1
+        if reason is None:
+            return TriageDecision(features=features)
+        
+        verdict = EvaluationResult(
+            conversation_id=conversation.get("conversation_id", "unknown"),
+            scenario_id=scenario.scenario_id,
+            model_name=conversation.get("model_name", "unknown"),
+            task_completion=0.0,
+            empathy=0.0,
+            clarity=0.0,
+            cultural_fit=0.0,
+            problem_solving=0.0,
+            overall_score=0.0,
+            strengths=[],
+            weaknesses=[f"Scored by triage: {reason} ({features['end_reason'] or 'no end reason'})"],
+            recommendations=[],
+            success_criteria_met={criterion: False for criterion in scenario.success_criteria},
+            must_not_do_violations=[],
+            raw_evaluation=json.dumps({"triage": reason, "features": features}, ensure_ascii=False)
+        )
+        return TriageDecision(features=features, verdict=verdict, reason=reason)
@@ -4,6 +4,8 @@ Model client wrappers for different AI providers
 
 from .base_model import BaseModel
 from .gemini_client import GeminiClient
+from .http_pool import HttpPoolConfig, configure_http_pool, get_http_client
+from .routed_model import RoutedModel, ROUTING_POLICIES
 
 # Optional imports - only load if packages are installed
 try:
@@ -21,5 +23,10 @@ __all__ = [
     'GeminiClient',
     'ClaudeClient',
     'WeaveClient',
+    'HttpPoolConfig',
+    'configure_http_pool',
+    'get_http_client',
+    'RoutedModel',
+    'ROUTING_POLICIES',
 ]
 
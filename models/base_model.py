@@ -58,6 +58,45 @@ class BaseModel(ABC):
         """Provider name (e.g., 'google', 'anthropic', 'weave')"""
         pass
     
+    @property
+    def supports_structured_output(self) -> bool:
+        """Whether generate_structured uses provider-native JSON output"""
+        return False
+    
+    def generate_structured(
+        self,
+        system_prompt: str,
+        user_message: str,
+        schema: Dict[str, any],
+        schema_name: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024
+    ) -> Dict[str, any]:
+        """
+        Generate a JSON response that conforms to a JSON schema
+        
+        Providers with native structured output override this; the default
+        is a plain generation that relies on the prompt asking for JSON.
+        
+        Args:
+            system_prompt: System prompt
+            user_message: User message
+            schema: JSON schema of the expected object
+            schema_name: Name for the schema (tool/format name)
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+        
+        Returns:
+            Same dictionary as generate_response, with the JSON text as response
+        """
+        return self.generate_response(
+            system_prompt=system_prompt,
+            conversation_history=[],
+            user_message=user_message,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    
     def get_stats(self) -> Dict[str, any]:
         """
         Get usage statistics
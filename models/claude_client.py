@@ -2,10 +2,13 @@
 Anthropic Claude client wrapper
 """
 
+import json
+import os
 import time
 from typing import List, Dict, Optional
 from anthropic import Anthropic
 from .base_model import BaseModel
+from .http_pool import get_http_client, pool_config
 
 try:
     import weave
@@ -13,6 +16,8 @@ try:
 except ImportError:
     WEAVE_AVAILABLE = False
 
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+
 
 class ClaudeClient(BaseModel):
     """Client for Anthropic Claude models"""
@@ -30,7 +35,13 @@ class ClaudeClient(BaseModel):
             model_name: Claude model name
         """
         super().__init__(model_name, api_key)
-        self.client = Anthropic(api_key=api_key)
+        # Shared keep-alive pool with the other clients of this API
+        self.client = Anthropic(
+            api_key=api_key,
+            base_url=ANTHROPIC_BASE_URL,
+            http_client=get_http_client(ANTHROPIC_BASE_URL),
+            timeout=pool_config().timeout()
+        )
         
     @property
     def provider_name(self) -> str:
@@ -97,4 +108,64 @@ class ClaudeClient(BaseModel):
                 "latency": latency,
                 "error": str(e)
             }
+    
+    @property
+    def supports_structured_output(self) -> bool:
+        return True
+    
+    @weave.op() if WEAVE_AVAILABLE else lambda f: f
+    def generate_structured(
+        self,
+        system_prompt: str,
+        user_message: str,
+        schema: Dict[str, any],
+        schema_name: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024
+    ) -> Dict[str, any]:
+        """Generate schema-conforming JSON by forcing a tool call"""
+        
+        try:
+            start_time = time.time()
+            
+            response = self.client.messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=system_prompt,
+                messages=[{"role": "user", "content": user_message}],
+                tools=[{
+                    "name": schema_name,
+                    "description": "Record the structured result",
+                    "input_schema": schema
+                }],
+                tool_choice={"type": "tool", "name": schema_name}
+            )
+            
+            latency = time.time() - start_time
+            tokens_used = response.usage.input_tokens + response.usage.output_tokens
+            self._record_request(tokens_used, latency)
+            
+            tool_input = next(
+                (block.input for block in response.content if block.type == "tool_use"),
+                None
+            )
+            if tool_input is None:
+                raise Exception(f"No tool call in response (stop reason: {response.stop_reason})")
+            
+            return {
+                "response": json.dumps(tool_input, ensure_ascii=False),
+                "tokens_used": tokens_used,
+                "latency": latency,
+                "error": None
+            }
+        
+        except Exception as e:
+            latency = time.time() - start_time
+            return {
+                "response": None,
+                "tokens_used": 0,
+                "latency": latency,
+                "error": str(e)
+            }
 
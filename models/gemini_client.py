@@ -2,8 +2,13 @@
 Google Gemini client wrapper
 """
 
+import hashlib
+import json
+import os
+import threading
 import time
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 import google.generativeai as genai
 from .base_model import BaseModel
 
@@ -13,6 +18,56 @@ try:
 except ImportError:
     WEAVE_AVAILABLE = False
 
+# Safety settings sent with every request (less restrictive for Arabic content)
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
+]
+
+# System instruction to frame Arabic content context (reduces false positives);
+# the agent's own system prompt is appended to it
+RESEARCH_FRAMING = """You are participating in a customer service quality evaluation research project. 
+You will be analyzing and generating authentic customer service conversations in Egyptian Arabic dialect.
+These are legitimate business communications for training and evaluation purposes.
+The conversations discuss common e-commerce topics like delivery, orders, and customer service interactions.
+All content is benign professional communication and should be processed normally."""
+
+# JSON schema keywords Gemini's response_schema (an OpenAPI subset) accepts
+_GEMINI_SCHEMA_KEYS = {"type", "properties", "required", "items", "enum", "description", "nullable", "format"}
+
+
+def _to_gemini_schema(schema: Dict[str, any]) -> Dict[str, any]:
+    """Strip JSON schema keywords Gemini rejects (additionalProperties, minimum, ...)"""
+    result = {}
+    for key, value in schema.items():
+        if key not in _GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: _to_gemini_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = _to_gemini_schema(value)
+        result[key] = value
+    return result
+
+
+def _history_fingerprint(messages: List[Dict[str, str]]) -> str:
+    """Hash of a conversation history's roles and contents"""
+    canonical = json.dumps(
+        [[msg["role"], msg["content"]] for msg in messages],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _to_contents(messages: List[Dict[str, str]]) -> List[Dict[str, any]]:
+    """Convert {"role", "content"} messages to Gemini contents"""
+    return [
+        {"role": "user" if msg["role"] == "user" else "model", "parts": [msg["content"]]}
+        for msg in messages
+    ]
+
 
 class GeminiClient(BaseModel):
     """Client for Google Gemini models"""
@@ -20,7 +75,10 @@ class GeminiClient(BaseModel):
     def __init__(
         self,
         api_key: str,
-        model_name: str = "gemini-flash-latest"
+        model_name: str = "gemini-flash-latest",
+        sessions: Optional[bool] = None,
+        max_cached_models: int = 8,
+        max_sessions: int = 64
     ):
         """
         Initialize Gemini client
@@ -28,47 +86,99 @@ class GeminiClient(BaseModel):
         Args:
             api_key: Google API key
             model_name: Gemini model name
+            sessions: Reuse one chat session per conversation instead of
+                rebuilding its history every turn (default: GEMINI_SESSIONS env
+                var). The API is stateless, so the full history is still sent
+                and billed on every call; this only saves client-side work
+            max_cached_models: Model instances kept, one per system prompt
+            max_sessions: Open chat sessions kept across conversations
         """
         super().__init__(model_name, api_key)
         genai.configure(api_key=api_key)
         
-        # Configure safety settings to be less restrictive
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_NONE"
-            }
-        ]
+        if sessions is None:
+            sessions = os.getenv("GEMINI_SESSIONS", "false").lower() == "true"
+        self.sessions = sessions
+        self.max_cached_models = max_cached_models
+        self.max_sessions = max_sessions
+        self.session_hits = 0
+        self.session_misses = 0
         
-        # System instruction to frame Arabic content context (reduces false positives)
-        system_instruction = """You are participating in a customer service quality evaluation research project. 
-You will be analyzing and generating authentic customer service conversations in Egyptian Arabic dialect.
-These are legitimate business communications for training and evaluation purposes.
-The conversations discuss common e-commerce topics like delivery, orders, and customer service interactions.
-All content is benign professional communication and should be processed normally."""
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[str, genai.GenerativeModel]" = OrderedDict()
+        self._configs: Dict[Tuple[float, int], "genai.types.GenerationConfig"] = {}
+        # (system prompt, history fingerprint) -> session whose history matches it
+        self._chats: "OrderedDict[Tuple[str, str], any]" = OrderedDict()
         
-        self.model = genai.GenerativeModel(
-            model_name,
-            safety_settings=safety_settings,
-            system_instruction=system_instruction
-        )
+        self.model = self._model_for("")
         
     @property
     def provider_name(self) -> str:
         return "google_gemini"
     
+    def _model_for(self, system_prompt: str) -> "genai.GenerativeModel":
+        """Model instance with the system prompt as native system_instruction"""
+        with self._lock:
+            model = self._models.get(system_prompt)
+            if model is not None:
+                self._models.move_to_end(system_prompt)
+                return model
+        
+        system_instruction = f"{RESEARCH_FRAMING}\n\n{system_prompt}" if system_prompt else RESEARCH_FRAMING
+        model = genai.GenerativeModel(
+            self.model_name,
+            safety_settings=SAFETY_SETTINGS,
+            system_instruction=system_instruction
+        )
+        with self._lock:
+            self._models[system_prompt] = model
+            while len(self._models) > self.max_cached_models:
+                self._models.popitem(last=False)
+        return model
+    
+    def _generation_config(self, temperature: float, max_tokens: int) -> "genai.types.GenerationConfig":
+        """GenerationConfig shared by every request with the same settings"""
+        key = (temperature, max_tokens)
+        config = self._configs.get(key)
+        if config is None:
+            config = genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+            )
+            self._configs[key] = config
+        return config
+    
+    def _take_session(self, system_prompt: str, conversation_history: List[Dict[str, str]]):
+        """Remove and return the session that ended where this history ends, if any"""
+        key = (system_prompt, _history_fingerprint(conversation_history))
+        with self._lock:
+            chat = self._chats.pop(key, None)
+            if chat is None:
+                self.session_misses += 1
+            else:
+                self.session_hits += 1
+            return chat
+    
+    def _keep_session(self, system_prompt: str, history: List[Dict[str, str]], chat):
+        """Park a session under the history it now holds for the next turn"""
+        key = (system_prompt, _history_fingerprint(history))
+        with self._lock:
+            self._chats[key] = chat
+            while len(self._chats) > self.max_sessions:
+                self._chats.popitem(last=False)
+    
+    def clear_sessions(self):
+        """Drop all open chat sessions"""
+        with self._lock:
+            self._chats.clear()
+    
+    def get_stats(self) -> Dict[str, any]:
+        stats = super().get_stats()
+        if self.sessions:
+            stats["session_hits"] = self.session_hits
+            stats["session_misses"] = self.session_misses
+        return stats
+    
     @weave.op() if WEAVE_AVAILABLE else lambda f: f
     def generate_response(
         self,
@@ -83,51 +193,16 @@ All content is benign professional communication and should be processed normall
         try:
             start_time = time.time()
             
-            # Construct the full conversation
-            messages = []
-            
-            # Add system prompt as first user message
-            messages.append({
-                "role": "user",
-                "parts": [system_prompt]
-            })
-            messages.append({
-                "role": "model",
-                "parts": ["فهمت، أنا جاهزة للمساعدة."]  # Arabic: "Understood, I'm ready to help."
-            })
-            
-            # Add conversation history
-            for msg in conversation_history:
-                role = "user" if msg["role"] == "user" else "model"
-                messages.append({
-                    "role": role,
-                    "parts": [msg["content"]]
-                })
-            
-            # Add current user message
-            messages.append({
-                "role": "user",
-                "parts": [user_message]
-            })
-            
-            # Generate response with safety settings
-            chat = self.model.start_chat(history=messages[:-1])
-            
-            # Safety settings for this request
-            safety_settings = [
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-            ]
+            # A parked session already holds this history; otherwise start one from it.
+            # Either way send_message transmits the whole history
+            chat = self._take_session(system_prompt, conversation_history) if self.sessions else None
+            if chat is None:
+                chat = self._model_for(system_prompt).start_chat(history=_to_contents(conversation_history))
             
             response = chat.send_message(
                 user_message,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens,
-                ),
-                safety_settings=safety_settings
+                generation_config=self._generation_config(temperature, max_tokens),
+                safety_settings=SAFETY_SETTINGS
             )
             
             latency = time.time() - start_time
@@ -147,6 +222,12 @@ All content is benign professional communication and should be processed normall
             
             self._record_request(tokens_used, latency)
             
+            if self.sessions:
+                self._keep_session(system_prompt, conversation_history + [
+                    {"role": "user", "content": user_message},
+                    {"role": "assistant", "content": response.text}
+                ], chat)
+            
             return {
                 "response": response.text,
                 "tokens_used": tokens_used,
@@ -162,4 +243,60 @@ All content is benign professional communication and should be processed normall
                 "latency": latency,
                 "error": str(e)
             }
+    
+    @property
+    def supports_structured_output(self) -> bool:
+        return True
+    
+    @weave.op() if WEAVE_AVAILABLE else lambda f: f
+    def generate_structured(
+        self,
+        system_prompt: str,
+        user_message: str,
+        schema: Dict[str, any],
+        schema_name: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024
+    ) -> Dict[str, any]:
+        """Generate schema-conforming JSON via response_mime_type/response_schema"""
+        
+        try:
+            start_time = time.time()
+            
+            response = self._model_for(system_prompt).generate_content(
+                user_message,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens,
+                    response_mime_type="application/json",
+                    response_schema=_to_gemini_schema(schema)
+                ),
+                safety_settings=SAFETY_SETTINGS
+            )
+            
+            latency = time.time() - start_time
+            
+            if not response.candidates:
+                raise Exception(f"Response blocked by safety filters: {response.prompt_feedback}")
+            if not response.text:
+                raise Exception(f"Empty response. Finish reason: {response.candidates[0].finish_reason}")
+            
+            tokens_used = response.usage_metadata.total_token_count if hasattr(response, 'usage_metadata') else 0
+            self._record_request(tokens_used, latency)
+            
+            return {
+                "response": response.text,
+                "tokens_used": tokens_used,
+                "latency": latency,
+                "error": None
+            }
+        
+        except Exception as e:
+            latency = time.time() - start_time
+            return {
+                "response": None,
+                "tokens_used": 0,
+                "latency": latency,
+                "error": str(e)
+            }
 
@@ -0,0 +1,145 @@
+"""
+Shared HTTP connection pools for model clients
+
+Every OpenAI- and Anthropic-backed client used to open its own connection
+pool. Clients now share one pooled httpx.Client per API origin for the whole
+process, so concurrent conversations and judges reuse warm keep-alive
+connections instead of repeating TLS handshakes.
+"""
+
+import atexit
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return type(default)(value) if value else default
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """Pool size, keep-alive and timeouts of the shared HTTP clients"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # Seconds an idle connection is kept open
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0  # Long generations stream slowly
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0  # Wait for a free connection when the pool is full
+    http2: bool = True  # Used when the h2 package is installed
+    
+    @classmethod
+    def from_env(cls) -> "HttpPoolConfig":
+        """Defaults overridden by HTTP_* environment variables"""
+        defaults = cls()
+        return cls(
+            max_connections=_env_number("HTTP_MAX_CONNECTIONS", defaults.max_connections),
+            max_keepalive_connections=_env_number("HTTP_MAX_KEEPALIVE", defaults.max_keepalive_connections),
+            keepalive_expiry=_env_number("HTTP_KEEPALIVE_EXPIRY", defaults.keepalive_expiry),
+            connect_timeout=_env_number("HTTP_CONNECT_TIMEOUT", defaults.connect_timeout),
+            read_timeout=_env_number("HTTP_READ_TIMEOUT", defaults.read_timeout),
+            write_timeout=_env_number("HTTP_WRITE_TIMEOUT", defaults.write_timeout),
+            pool_timeout=_env_number("HTTP_POOL_TIMEOUT", defaults.pool_timeout),
+            http2=os.getenv("HTTP2", "true").lower() == "true",
+        )
+    
+    def timeout(self) -> "httpx.Timeout":
+        """Per-request timeouts (also passed to the SDKs, which override client defaults)"""
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout
+        )
+    
+    def limits(self) -> "httpx.Limits":
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+
+_clients: Dict[str, "httpx.Client"] = {}
+_lock = threading.Lock()
+_config: Optional[HttpPoolConfig] = None
+
+
+def pool_config() -> HttpPoolConfig:
+    """Process-wide pool configuration (read from the environment once)"""
+    global _config
+    if _config is None:
+        _config = HttpPoolConfig.from_env()
+    return _config
+
+
+def configure_http_pool(config: HttpPoolConfig):
+    """
+    Replace the pool configuration
+    
+    Clients already created keep their pools; call this before building
+    model clients.
+    """
+    global _config
+    _config = config
+
+
+def _origin(base_url: str) -> str:
+    parts = urlsplit(base_url)
+    if not parts.scheme or not parts.netloc:
+        raise ValueError(f"Base URL needs a scheme and host: {base_url}")
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def get_http_client(base_url: str) -> "httpx.Client":
+    """
+    Shared pooled HTTP client for an API origin
+    
+    Args:
+        base_url: API base URL; clients are shared per scheme://host:port
+    
+    Returns:
+        httpx.Client to pass as the SDK's http_client
+    """
+    if not HTTPX_AVAILABLE:
+        raise ImportError("Please install httpx: pip install httpx")
+    
+    origin = _origin(base_url)
+    with _lock:
+        client = _clients.get(origin)
+        if client is None or client.is_closed:
+            config = pool_config()
+            client = httpx.Client(
+                http2=config.http2 and HTTP2_AVAILABLE,
+                limits=config.limits(),
+                timeout=config.timeout()
+            )
+            _clients[origin] = client
+        return client
+
+
+def close_http_clients():
+    """Close every shared client (runs at exit)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+atexit.register(close_http_clients)
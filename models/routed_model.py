@@ -0,0 +1,507 @@
+"""
+Provider failover router
+
+RoutedModel wraps a prioritized list of model clients behind the BaseModel
+interface. It keeps rolling latency and error statistics per provider,
+picks the order in which providers are tried according to a routing policy
+and fails over to the next provider when a call errors, so one degraded
+provider doesn't fail every conversation routed through it. Each result
+records which provider actually served it.
+
+Hedging is opt-in: when a call hasn't returned within its provider's rolling
+p95 latency, a duplicate goes to the next provider in routing order (or the
+same one when there is only one) and the first successful response wins.
+An attempt timeout (also opt-in) instead gives up on a provider that hasn't
+answered in time and fails over to the next one.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .base_model import BaseModel
+
+try:
+    import weave
+    WEAVE_AVAILABLE = True
+except ImportError:
+    WEAVE_AVAILABLE = False
+
+# Try providers in list order, skipping degraded ones
+POLICY_PRIMARY = "primary"
+# Try the provider with the lowest rolling median latency first
+POLICY_LEAST_LATENCY = "least_latency"
+# Pick the first provider at random in proportion to its weight
+POLICY_WEIGHTED = "weighted"
+ROUTING_POLICIES = (POLICY_PRIMARY, POLICY_LEAST_LATENCY, POLICY_WEIGHTED)
+
+Outcome = Tuple[int, Dict[str, any]]  # (client index, result)
+
+
+def _percentile(values, percentile: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+
+def provider_label(client: BaseModel) -> str:
+    """Label identifying the provider and model of a client"""
+    return f"{client.provider_name}/{client.model_name}"
+
+
+class ProviderStats:
+    """Rolling latency and error statistics of one provider"""
+    
+    def __init__(self, label: str, window: int = 50):
+        """
+        Initialize statistics
+        
+        Args:
+            label: Provider label
+            window: Number of recent calls the rolling figures cover
+        """
+        self.label = label
+        self.calls = 0
+        self.failures = 0
+        self.served = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # Provider is skipped until this time after repeated failures
+        self.last_call = 0.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+    
+    def record(self, latency: float, ok: bool):
+        """Record one call"""
+        self.calls += 1
+        self.last_call = time.time()
+        self._outcomes.append(ok)
+        if ok:
+            self.served += 1
+            self.consecutive_failures = 0
+            self._latencies.append(latency)
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+    
+    @property
+    def error_rate(self) -> float:
+        """Share of failed calls in the window"""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of successful calls in the window (None before any)"""
+        return _percentile(self._latencies, percentile)
+    
+    @property
+    def samples(self) -> int:
+        """Successful calls in the window"""
+        return len(self._latencies)
+    
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            "calls": self.calls,
+            "served": self.served,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 3),
+            "p50_latency": self.latency_percentile(50),
+            "p95_latency": self.latency_percentile(95),
+        }
+
+
+class RoutedModel(BaseModel):
+    """Routes calls across several model clients with failover"""
+    
+    def __init__(
+        self,
+        clients: List[BaseModel],
+        policy: str = POLICY_PRIMARY,
+        weights: Optional[List[float]] = None,
+        window: int = 50,
+        max_error_rate: float = 0.5,
+        max_latency: Optional[float] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        attempt_timeout: Optional[float] = None,
+        hedge_budget: float = 0.0,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20,
+        hedge_workers: int = 16
+    ):
+        """
+        Initialize router
+        
+        Args:
+            clients: Model clients in priority order (the first is the primary)
+            policy: One of ROUTING_POLICIES
+            weights: Relative weights per client for the weighted policy
+            window: Calls per provider the rolling statistics cover
+            max_error_rate: Rolling error rate above which a provider is degraded
+            max_latency: Rolling median latency (seconds) above which a provider
+                is degraded, e.g. to move a slow customer simulator aside
+            failure_threshold: Consecutive failures that take a provider out of
+                rotation for the cooldown
+            cooldown: Seconds a provider is skipped after repeated failures;
+                degraded providers are also probed again once unused this long
+            attempt_timeout: Seconds to wait for one provider before failing
+                over to the next (None: wait for it). The timed-out call is
+                recorded as a failure; hedged first attempts aren't timed out.
+            hedge_budget: Largest share of calls that may fire a hedged
+                duplicate (0 disables hedging)
+            hedge_percentile: Rolling latency percentile of the provider after
+                which a still-running call is hedged
+            hedge_min_samples: Successful calls a provider needs before its
+                percentile is trusted; calls aren't hedged before that
+            hedge_workers: Threads running hedged calls
+        """
+        if not clients:
+            raise ValueError("RoutedModel needs at least one client")
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}. Use {ROUTING_POLICIES}")
+        if weights is not None and len(weights) != len(clients):
+            raise ValueError("weights must have one entry per client")
+        if not 0.0 <= hedge_budget <= 1.0:
+            raise ValueError("hedge_budget must be between 0 and 1")
+        if attempt_timeout is not None and attempt_timeout <= 0:
+            raise ValueError("attempt_timeout must be positive")
+        
+        super().__init__(clients[0].model_name)
+        self.clients = clients
+        self.policy = policy
+        self.weights = weights or [1.0] * len(clients)
+        self.max_error_rate = max_error_rate
+        self.max_latency = max_latency
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.attempt_timeout = attempt_timeout
+        self.failovers = 0
+        self.timeouts = 0
+        self.provider_stats = [ProviderStats(provider_label(client), window) for client in clients]
+        self._lock = threading.Lock()
+        
+        self.hedge_budget = hedge_budget
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedged_calls = 0  # Calls made with hedging enabled
+        self.hedges = 0  # Duplicates fired
+        self.hedge_wins = 0  # Calls served by the duplicate
+        self.hedge_tokens = 0  # Tokens of attempts that lost the race
+        # Latency of the first attempt (what an unhedged call would have taken)
+        # vs. latency actually served, for the tail-latency report
+        self._unhedged_latencies: Deque[float] = deque(maxlen=window * 10)
+        self._served_latencies: Deque[float] = deque(maxlen=window * 10)
+        # Runs hedged calls and timed attempts (the caller waits on both)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="hedge")
+            if hedge_budget > 0 or attempt_timeout is not None else None
+        )
+        self._closed = False
+    
+    @property
+    def provider_name(self) -> str:
+        return "routed"
+    
+    @property
+    def supports_structured_output(self) -> bool:
+        return self.clients[0].supports_structured_output
+    
+    def _is_degraded(self, stats: ProviderStats, now: float) -> bool:
+        if now < stats.open_until:
+            return True
+        if now - stats.last_call > self.cooldown:
+            # Not tried for a while: probe it again instead of trusting old figures
+            return False
+        if stats.error_rate > self.max_error_rate:
+            return True
+        median = stats.latency_percentile(50)
+        return self.max_latency is not None and median is not None and median > self.max_latency
+    
+    def route(self) -> List[int]:
+        """
+        Order in which clients are tried for the next call
+        
+        Returns:
+            Client indexes; degraded providers come last, still as a last resort
+        """
+        with self._lock:
+            now = time.time()
+            order = list(range(len(self.clients)))
+            if self.policy == POLICY_LEAST_LATENCY:
+                # Providers without successful calls yet sort first so they get probed
+                order.sort(key=lambda i: self.provider_stats[i].latency_percentile(50) or 0.0)
+            elif self.policy == POLICY_WEIGHTED:
+                first = random.choices(order, weights=self.weights)[0]
+                order.remove(first)
+                order.insert(0, first)
+            healthy = [i for i in order if not self._is_degraded(self.provider_stats[i], now)]
+            return healthy + [i for i in order if i not in healthy]
+    
+    def _record(self, index: int, latency: float, ok: bool):
+        with self._lock:
+            stats = self.provider_stats[index]
+            stats.record(latency, ok)
+            if not ok and stats.consecutive_failures >= self.failure_threshold:
+                stats.open_until = time.time() + self.cooldown
+    
+    def _invoke(self, method: Callable[[BaseModel], Dict[str, any]], index: int) -> Tuple[Dict[str, any], float]:
+        """Call one client, returning its result and wall time"""
+        start_time = time.time()
+        try:
+            result = method(self.clients[index])
+        except Exception as e:
+            result = {"response": None, "tokens_used": 0, "latency": 0.0, "error": str(e)}
+        # Wall time, so hedged duplicates running in threads are timed alike
+        return result, time.time() - start_time
+    
+    def _attempt(self, method: Callable[[BaseModel], Dict[str, any]], index: int) -> Dict[str, any]:
+        """Call one client and record the outcome in its provider stats"""
+        result, latency = self._invoke(method, index)
+        self._record(index, latency, not result["error"])
+        return result
+    
+    def _timed_attempt(self, method: Callable[[BaseModel], Dict[str, any]], index: int) -> Dict[str, any]:
+        """Call one client, giving up on it after attempt_timeout"""
+        future = self._executor.submit(self._invoke, method, index)
+        done, _ = wait([future], timeout=self.attempt_timeout)
+        if not done:
+            with self._lock:
+                self.timeouts += 1
+            # The call can't be interrupted; its late response is dropped but
+            # the provider still bills its tokens
+            future.add_done_callback(self._count_timed_out)
+            self._record(index, self.attempt_timeout, False)
+            return {
+                "response": None,
+                "tokens_used": 0,
+                "latency": self.attempt_timeout,
+                "error": f"No response within {self.attempt_timeout:g}s"
+            }
+        result, latency = future.result()
+        self._record(index, latency, not result["error"])
+        return result
+    
+    def _hedge_delay(self, index: int) -> Optional[float]:
+        """Seconds to wait before hedging a call to this provider (None: don't hedge)"""
+        stats = self.provider_stats[index]
+        with self._lock:
+            if stats.samples < self.hedge_min_samples:
+                return None
+            return stats.latency_percentile(self.hedge_percentile)
+    
+    def _take_hedge(self) -> bool:
+        """Spend hedge budget if the hedge rate stays within it"""
+        with self._lock:
+            if self.hedges + 1 > self.hedge_budget * self.hedged_calls:
+                return False
+            self.hedges += 1
+            return True
+    
+    def _count_discarded(self, future: Future):
+        """Bill the tokens of an attempt whose response was dropped"""
+        if future.cancelled():
+            return
+        tokens = future.result().get("tokens_used", 0) or 0
+        with self._lock:
+            self.hedge_tokens += tokens
+            self.total_tokens += tokens
+    
+    def _count_timed_out(self, future: Future):
+        """Bill the tokens of a timed-out attempt that finished late"""
+        if future.cancelled():
+            return
+        result, _ = future.result()
+        with self._lock:
+            self.total_tokens += result.get("tokens_used", 0) or 0
+    
+    def _hedged_attempt(self, method: Callable[[BaseModel], Dict[str, any]], order: List[int]) -> Tuple[List[Outcome], int]:
+        """
+        First attempt of a call, hedged if it runs past the provider's percentile
+        
+        Returns:
+            (outcomes in completion order, routing positions used); the last
+            outcome is the successful one if any succeeded
+        """
+        primary = order[0]
+        backup = order[1] if len(order) > 1 else primary
+        with self._lock:
+            self.hedged_calls += 1
+        
+        start_time = time.time()
+        first = self._executor.submit(self._attempt, method, primary)
+        
+        def record_unhedged(future: Future):
+            with self._lock:
+                self._unhedged_latencies.append(time.time() - start_time)
+        first.add_done_callback(record_unhedged)
+        
+        delay = self._hedge_delay(primary)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_hedge():
+            return [(primary, first.result())], 1
+        
+        duplicate = self._executor.submit(self._attempt, method, backup)
+        pending = {first: primary, duplicate: backup}
+        outcomes = []
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                result = future.result()
+                outcomes.append((index, result))
+                if not result["error"]:
+                    if future is duplicate:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    # A call already in flight can't be interrupted; its result is
+                    # dropped but the provider still bills its tokens
+                    for other in pending:
+                        if not other.cancel():
+                            other.add_done_callback(self._count_discarded)
+                    return outcomes, 1 if backup == primary else 2
+        return outcomes, 1 if backup == primary else 2
+    
+    def _call(self, method: Callable[[BaseModel], Dict[str, any]]) -> Dict[str, any]:
+        """Try clients in routing order until one succeeds"""
+        start_time = time.time()
+        errors = []
+        order = self.route()
+        position = 0
+        while position < len(order):
+            if self.hedge_budget > 0 and not self._closed and position == 0:
+                outcomes, used = self._hedged_attempt(method, order)
+            elif self.attempt_timeout is not None and not self._closed:
+                outcomes, used = [(order[position], self._timed_attempt(method, order[position]))], 1
+            else:
+                outcomes, used = [(order[position], self._attempt(method, order[position]))], 1
+            position += used
+            
+            for index, result in outcomes:
+                if result["error"]:
+                    errors.append(f"{self.provider_stats[index].label}: {result['error']}")
+                    continue
+                if errors:
+                    with self._lock:
+                        self.failovers += 1
+                latency = time.time() - start_time
+                with self._lock:
+                    self._record_request(result.get("tokens_used", 0), latency)
+                    if self.hedge_budget > 0:
+                        self._served_latencies.append(latency)
+                return {**result, "latency": latency, "served_by": self.provider_stats[index].label}
+        
+        return {
+            "response": None,
+            "tokens_used": 0,
+            "latency": time.time() - start_time,
+            "error": "All providers failed: " + "; ".join(errors),
+            "served_by": None
+        }
+    
+    @weave.op() if WEAVE_AVAILABLE else lambda f: f
+    def generate_response(
+        self,
+        system_prompt: str,
+        conversation_history: List[Dict[str, str]],
+        user_message: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1024
+    ) -> Dict[str, any]:
+        """Generate a response from the first provider that succeeds"""
+        return self._call(lambda client: client.generate_response(
+            system_prompt=system_prompt,
+            conversation_history=conversation_history,
+            user_message=user_message,
+            temperature=temperature,
+            max_tokens=max_tokens
+        ))
+    
+    def generate_structured(
+        self,
+        system_prompt: str,
+        user_message: str,
+        schema: Dict[str, any],
+        schema_name: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024
+    ) -> Dict[str, any]:
+        """Generate schema-conforming JSON from the first provider that succeeds"""
+        return self._call(lambda client: client.generate_structured(
+            system_prompt=system_prompt,
+            user_message=user_message,
+            schema=schema,
+            schema_name=schema_name,
+            temperature=temperature,
+            max_tokens=max_tokens
+        ))
+    
+    def get_stats(self) -> Dict[str, any]:
+        stats = super().get_stats()
+        stats["policy"] = self.policy
+        stats["failovers"] = self.failovers
+        stats["timeouts"] = self.timeouts
+        stats["providers"] = {s.label: s.to_dict() for s in self.provider_stats}
+        if self.hedge_budget > 0:
+            stats["hedging"] = self.hedge_stats()
+        return stats
+    
+    def hedge_stats(self) -> Dict[str, any]:
+        """
+        Hedge rate and tail latency with vs. without hedging
+        
+        Returns:
+            Dictionary with hedge counts, hedge_rate, and p50/p95/p99 of the
+            first attempts (unhedged) and of the responses actually served
+        """
+        with self._lock:
+            stats = {
+                "hedge_budget": self.hedge_budget,
+                "calls": self.hedged_calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_tokens": self.hedge_tokens,
+                "hedge_rate": self.hedges / self.hedged_calls if self.hedged_calls else 0.0,
+            }
+            for percentile in (50, 95, 99):
+                unhedged = _percentile(self._unhedged_latencies, percentile)
+                served = _percentile(self._served_latencies, percentile)
+                stats[f"unhedged_p{percentile}"] = unhedged
+                stats[f"served_p{percentile}"] = served
+                if percentile > 50:
+                    stats[f"p{percentile}_improvement"] = (
+                        unhedged - served if unhedged is not None and served is not None else None
+                    )
+            return stats
+    
+    def print_stats(self):
+        """Print per-provider routing statistics"""
+        timeouts = f", {self.timeouts} timeouts" if self.attempt_timeout is not None else ""
+        print(f"\n🔀 Routing ({self.policy}), {self.failovers} failovers{timeouts}:")
+        for s in self.provider_stats:
+            p50 = s.latency_percentile(50)
+            p50_text = f"{p50:.2f}s" if p50 is not None else "-"
+            print(f"   {s.label}: served {s.served}/{s.calls}, "
+                  f"errors {s.error_rate:.0%}, p50 {p50_text}")
+        if self.hedge_budget > 0:
+            hedging = self.hedge_stats()
+            print(f"   Hedging: {hedging['hedges']}/{hedging['calls']} calls hedged "
+                  f"({hedging['hedge_rate']:.1%}, budget {self.hedge_budget:.0%}), "
+                  f"{hedging['hedge_wins']} won by the duplicate, "
+                  f"{hedging['hedge_tokens']:,} tokens spent on dropped attempts")
+            for percentile in (95, 99):
+                improvement = hedging[f"p{percentile}_improvement"]
+                if improvement is not None:
+                    print(f"   p{percentile} latency: {hedging[f'unhedged_p{percentile}']:.2f}s unhedged -> "
+                          f"{hedging[f'served_p{percentile}']:.2f}s served ({improvement:.2f}s saved)")
+    
+    def close(self):
+        """Stop the hedge threads; later calls are made without hedging or timeouts"""
+        self._closed = True
+        if self._executor is not None:
+            # Losing duplicates still running finish on their own
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -8,6 +8,7 @@ from typing import List, Dict, Optional
 import requests
 from openai import OpenAI
 from .base_model import BaseModel
+from .http_pool import get_http_client, pool_config
 
 try:
     import weave
@@ -48,7 +49,9 @@ class WeaveClient(BaseModel):
         self.client = OpenAI(
             api_key=api_key,
             base_url=base_url,
-            default_headers={"X-WANDB-PROJECT": project_name}
+            default_headers={"X-WANDB-PROJECT": project_name},
+            http_client=get_http_client(base_url),  # Shared keep-alive pool per API origin
+            timeout=pool_config().timeout()
         )
         
     @property
@@ -122,4 +125,66 @@ class WeaveClient(BaseModel):
                 "latency": latency,
                 "error": str(e)
             }
+    
+    @property
+    def supports_structured_output(self) -> bool:
+        return True
+    
+    @weave.op() if WEAVE_AVAILABLE else lambda f: f
+    def generate_structured(
+        self,
+        system_prompt: str,
+        user_message: str,
+        schema: Dict[str, any],
+        schema_name: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024
+    ) -> Dict[str, any]:
+        """Generate schema-conforming JSON via response_format json_schema"""
+        
+        try:
+            start_time = time.time()
+            
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": schema_name,
+                        "schema": schema,
+                        "strict": True
+                    }
+                }
+            )
+            
+            latency = time.time() - start_time
+            tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else 0
+            
+            content = response.choices[0].message.content
+            if content is None or content.strip() == "":
+                raise Exception("Model returned empty/None structured response")
+            
+            self._record_request(tokens_used, latency)
+            
+            return {
+                "response": content,
+                "tokens_used": tokens_used,
+                "latency": latency,
+                "error": None
+            }
+        
+        except Exception as e:
+            latency = time.time() - start_time
+            return {
+                "response": None,
+                "tokens_used": 0,
+                "latency": latency,
+                "error": str(e)
+            }
 
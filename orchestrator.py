@@ -2,7 +2,7 @@
 Conversation orchestrator for LLM-to-LLM dialogue
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from agents.base_agent import BaseAgent
 from simulator.customer_simulator import CustomerSimulator
@@ -26,6 +26,8 @@ class ConversationTurn:
     customer_tokens: int = 0
     agent_tokens: int = 0
     turn_latency: float = 0.0
+    agent_served_by: Optional[str] = None  # Provider that served the turn when routed
+    customer_served_by: Optional[str] = None
 
 
 @dataclass
@@ -41,6 +43,8 @@ class ConversationResult:
     total_tokens: int
     total_latency: float
     customer_satisfied: bool = False  # Will be evaluated later
+    final_customer_message: str = ""  # Customer reply after the last agent turn
+    customer_ended: bool = False  # Detector verdict on final_customer_message
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for export"""
@@ -53,13 +57,17 @@ class ConversationResult:
             "end_reason": self.end_reason,
             "total_tokens": self.total_tokens,
             "total_latency": self.total_latency,
+            "final_customer_message": self.final_customer_message,
+            "customer_ended": self.customer_ended,
             "turns": [
                 {
                     "turn": t.turn_number,
                     "customer": t.customer_message,
                     "agent": t.agent_message,
                     "tokens": t.customer_tokens + t.agent_tokens,
-                    "latency": t.turn_latency
+                    "latency": t.turn_latency,
+                    **({"agent_served_by": t.agent_served_by} if t.agent_served_by else {}),
+                    **({"customer_served_by": t.customer_served_by} if t.customer_served_by else {})
                 }
                 for t in self.turns
             ]
@@ -226,14 +234,17 @@ class ConversationOrchestrator:
                 agent_message=agent_message,
                 customer_tokens=customer_tokens,
                 agent_tokens=agent_tokens,
-                turn_latency=turn_latency
+                turn_latency=turn_latency,
+                agent_served_by=agent_result.get("served_by"),
+                customer_served_by=customer_result.get("served_by")
             ))
             
             total_tokens += agent_tokens + customer_tokens
             total_latency += turn_latency
             
-            # Check if conversation should end
-            if customer_result["should_end"]:
+            # Check if the customer closed the conversation (the detector
+            # fired, as opposed to the simulator stopping at the turn limit)
+            if customer_result.get("customer_closed", customer_result["should_end"]):
                 if self.verbose:
                     print(f"\n✅ انتهت المحادثة: العميل راضي/أنهى المحادثة")
                 return ConversationResult(
@@ -245,7 +256,9 @@ class ConversationOrchestrator:
                     success=True,
                     end_reason="Customer ended conversation naturally",
                     total_tokens=total_tokens,
-                    total_latency=total_latency
+                    total_latency=total_latency,
+                    final_customer_message=customer_result["response"],
+                    customer_ended=True
                 )
             
             # Update customer message for next turn
@@ -265,6 +278,10 @@ class ConversationOrchestrator:
                     total_tokens=total_tokens,
                     total_latency=total_latency
                 )
+            
+            if customer_result["should_end"]:
+                # Turn limit reached without a closing
+                break
         
         # Max turns reached
         if self.verbose:
@@ -279,7 +296,8 @@ class ConversationOrchestrator:
             success=True,
             end_reason="Max turns reached",
             total_tokens=total_tokens,
-            total_latency=total_latency
+            total_latency=total_latency,
+            final_customer_message=customer_message
         )
     
     def print_summary(self, result: ConversationResult):
@@ -7,7 +7,7 @@ This script loads conversation results and evaluates them using an LLM judge.
 
 import os
 import json
-import glob
+import itertools
 from datetime import datetime
 from typing import List, Dict
 from dotenv import load_dotenv
@@ -15,44 +15,37 @@ from dotenv import load_dotenv
 import config
 from models.claude_client import ClaudeClient
 from models.gemini_client import GeminiClient
-from evaluator.llm_judge import LLMJudge
-from scenarios.scenario_loader import load_scenarios_for_agent
+from models.weave_client import WeaveClient
+from evaluator.llm_judge import LLMJudge, DEFAULT_BATCH_TOKEN_BUDGET
+from evaluator.judge_cache import JudgeCache
+from evaluator.triage import ConversationTriage
+from evaluator.judge_ensemble import EnsemblePolicy, AGGREGATIONS
+from evaluator.transcript_compression import (
+    COMPRESSION_LEVELS, TranscriptCompressor, compare_compression_levels, select_holdout
+)
+from evaluator.evaluation_index import EvaluationIndex, conversation_files, load_conversation_file
+from scenarios.scenario_loader import AGENT_TYPES
+from scenarios.scenario_registry import ScenarioRegistry
 from storage.results_storage import get_storage
+from storage.offset_index import load_indexed_conversations
 from utils.weave_init import initialize_weave
 
 load_dotenv()
 
 
 def load_conversations_from_json(results_dir: str) -> List[Dict]:
-    """Load conversations from JSON files"""
+    """Load conversations from JSON files (each conversation_id once)"""
     
     conversations = []
-    
-    # Load from conversations.json
-    conversations_file = os.path.join(results_dir, "conversations.json")
-    if os.path.exists(conversations_file):
-        try:
-            with open(conversations_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    conversations.extend(data)
-                elif isinstance(data, dict) and 'conversations' in data:
-                    conversations.extend(data['conversations'])
-        except Exception as e:
-            print(f"⚠️  Failed to load {conversations_file}: {e}")
-    
-    # Load from individual JSON files
-    json_files = glob.glob(os.path.join(results_dir, "*_20*.json"))
-    for json_file in json_files:
-        if "benchmark" in json_file or "conversations.json" in json_file:
-            continue
-        
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                conversations.append(data)
-        except Exception as e:
-            print(f"⚠️  Failed to load {json_file}: {e}")
+    seen = set()
+    for path in conversation_files(results_dir):
+        for conversation in load_conversation_file(path):
+            conversation_id = conversation.get("conversation_id") if isinstance(conversation, dict) else None
+            if conversation_id in seen:
+                continue
+            if conversation_id:
+                seen.add(conversation_id)
+            conversations.append(conversation)
     
     return conversations
 
@@ -60,17 +53,49 @@ def load_conversations_from_json(results_dir: str) -> List[Dict]:
 def load_scenarios() -> Dict[str, any]:
     """Load all scenarios and index by ID"""
     
-    scenarios_map = {}
+    with ScenarioRegistry(
+        cache_dir=os.path.join(config.CACHE_DIR, "scenarios"),
+        scenario_dirs=[config.SCENARIO_FILES_DIR]
+    ) as registry:
+        for agent_type in AGENT_TYPES:
+            try:
+                registry.get_scenarios(agent_type)
+            except Exception as e:
+                print(f"⚠️  Failed to load scenarios for {agent_type}: {e}")
+        
+        return registry.as_dict()
+
+
+def create_judge_model(name: str):
+    """Create a judge model client by name, or None if its API key is missing"""
     
-    for agent_type in ["agent_a", "agent_b", "agent_c"]:
-        try:
-            scenarios = load_scenarios_for_agent(agent_type)
-            for scenario in scenarios:
-                scenarios_map[scenario.scenario_id] = scenario
-        except Exception as e:
-            print(f"⚠️  Failed to load scenarios for {agent_type}: {e}")
+    if name == "claude":
+        if not config.ANTHROPIC_API_KEY:
+            print("❌ Error: ANTHROPIC_API_KEY not found in environment")
+            return None
+        return ClaudeClient(
+            api_key=config.ANTHROPIC_API_KEY,
+            model_name=config.MODELS_CONFIG["claude"]["name"]
+        )
+    elif name == "gemini":
+        if not config.GOOGLE_API_KEY:
+            print("❌ Error: GOOGLE_API_KEY not found in environment")
+            return None
+        return GeminiClient(
+            api_key=config.GOOGLE_API_KEY,
+            model_name=config.MODELS_CONFIG["gemini"]["name"]
+        )
+    elif name == "qwen":
+        if not config.WANDB_API_KEY:
+            print("❌ Error: WANDB_API_KEY not found in environment")
+            return None
+        return WeaveClient(
+            api_key=config.WANDB_API_KEY,
+            model_name=config.MODELS_CONFIG["qwen"]["name"]
+        )
     
-    return scenarios_map
+    print(f"❌ Error: Unknown judge model: {name}")
+    return None
 
 
 def save_evaluation_results(results: List, output_dir: str):
@@ -91,6 +116,30 @@ def save_evaluation_results(results: List, output_dir: str):
     return filepath
 
 
+def save_compression_report(report: Dict, output_dir: str) -> str:
+    """Save and print a transcript compression report"""
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(output_dir, f"compression_report_{timestamp}.json")
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print("\n" + "="*80)
+    print(f"TRANSCRIPT COMPRESSION vs UNCOMPRESSED ({report['conversations']} held-out conversations)")
+    print("="*80)
+    print(f"{'Level':<8} {'Prompt tokens':<15} {'Saved':<8} {'Overall MAE':<13} {'Within 1pt':<12} {'Compared':<8}")
+    print("-"*80)
+    print(f"{'none':<8} {report['baseline']['prompt_tokens']:<15} {'-':<8} {'-':<13} {'-':<12} {report['baseline']['judged']:<8}")
+    for level, stats in report["levels"].items():
+        mae = f"{stats['overall_mae']:.2f}" if stats["overall_mae"] is not None else "n/a"
+        within = f"{stats['within_one_point']:.1%}" if stats["within_one_point"] is not None else "n/a"
+        print(f"{level:<8} {stats['prompt_tokens']:<15} {stats['token_reduction']:<8.1%} {mae:<13} {within:<12} {stats['compared']:<8}")
+    print("="*80)
+    print(f"\n🗜️  Compression report saved: {filepath}")
+    
+    return filepath
+
+
 def print_evaluation_summary(results: List):
     """Print summary of evaluation results"""
     
@@ -186,10 +235,30 @@ def main():
     parser.add_argument(
         "--judge-model",
         type=str,
-        choices=["claude", "gemini"],
+        choices=["claude", "gemini", "qwen"],
         default="claude",
         help="LLM to use as judge (default: claude)"
     )
+    parser.add_argument(
+        "--ensemble-judges",
+        nargs="+",
+        choices=["claude", "gemini", "qwen"],
+        default=[],
+        help="Secondary judges asked, in order, only for borderline or disputed verdicts"
+    )
+    parser.add_argument(
+        "--aggregation",
+        type=str,
+        choices=AGGREGATIONS,
+        default="median",
+        help="How ensemble verdicts are combined (default: median)"
+    )
+    parser.add_argument(
+        "--disagreement-threshold",
+        type=float,
+        default=EnsemblePolicy.disagreement,
+        help=f"Overall score spread that brings in another judge (default: {EnsemblePolicy.disagreement})"
+    )
     parser.add_argument(
         "--language",
         type=str,
@@ -203,6 +272,69 @@ def main():
         default=None,
         help="Limit number of conversations to evaluate"
     )
+    parser.add_argument(
+        "--conversation-id",
+        nargs="+",
+        default=None,
+        help="Only evaluate these conversations (looked up through the offset index)"
+    )
+    parser.add_argument(
+        "--scenario-id",
+        type=str,
+        default=None,
+        help="Only evaluate conversations of this scenario (via the offset index)"
+    )
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        default=None,
+        help="Only evaluate conversations of this model (via the offset index)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-judge conversations that already have a cached verdict"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only judge conversations without a verdict (tracked in <results-dir>/evaluation_index.json)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Judge up to N conversations of the same scenario per LLM call (default: 1)"
+    )
+    parser.add_argument(
+        "--batch-token-budget",
+        type=int,
+        default=DEFAULT_BATCH_TOKEN_BUDGET,
+        help=f"Estimated token budget per batched judge call (default: {DEFAULT_BATCH_TOKEN_BUDGET})"
+    )
+    parser.add_argument(
+        "--no-structured-output",
+        action="store_true",
+        help="Ask for JSON in the prompt instead of provider-native structured output"
+    )
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        help="Score clear-cut failures (no turns, early agent errors, empty replies) without the judge"
+    )
+    parser.add_argument(
+        "--compression",
+        type=int,
+        choices=[0] + sorted(COMPRESSION_LEVELS),
+        default=0,
+        help="Compact transcripts in judge prompts: 1 normalize, 2 +dedupe/truncate, 3 aggressive (default: 0 off)"
+    )
+    parser.add_argument(
+        "--compression-report",
+        type=int,
+        metavar="N",
+        help="Judge N held-out conversations uncompressed and at every compression level, report the trade-off and exit"
+    )
     
     args = parser.parse_args()
     
@@ -211,6 +343,8 @@ def main():
     print("="*80)
     print(f"Results directory: {args.results_dir}")
     print(f"Judge model: {args.judge_model}")
+    if args.ensemble_judges:
+        print(f"Ensemble judges: {', '.join(args.ensemble_judges)} ({args.aggregation})")
     print(f"Evaluation language: {args.language}")
     print("="*80)
     
@@ -222,40 +356,60 @@ def main():
     # Initialize judge model
     print(f"\n🤖 Initializing {args.judge_model} as judge...")
     
-    if args.judge_model == "claude":
-        if not config.ANTHROPIC_API_KEY:
-            print("❌ Error: ANTHROPIC_API_KEY not found in environment")
-            return
-        judge_model = ClaudeClient(
-            api_key=config.ANTHROPIC_API_KEY,
-            model_name=config.MODELS_CONFIG["claude"]["name"]
-        )
-    elif args.judge_model == "gemini":
-        if not config.GOOGLE_API_KEY:
-            print("❌ Error: GOOGLE_API_KEY not found in environment")
-            return
-        judge_model = GeminiClient(
-            api_key=config.GOOGLE_API_KEY,
-            model_name=config.MODELS_CONFIG["gemini"]["name"]
-        )
-    else:
-        print(f"❌ Error: Unknown judge model: {args.judge_model}")
+    judge_model = create_judge_model(args.judge_model)
+    if judge_model is None:
         return
     
+    secondary_judges = []
+    for name in args.ensemble_judges:
+        if name == args.judge_model:
+            continue
+        model = create_judge_model(name)
+        if model is None:
+            return
+        secondary_judges.append(model)
+    
     print(f"✅ Judge model initialized")
     
     # Load conversations
     print(f"\n📚 Loading conversations from {args.results_dir}...")
-    conversations = load_conversations_from_json(args.results_dir)
-    
-    if not conversations:
-        print("❌ No conversations found to evaluate")
-        return
-    
-    if args.limit:
-        conversations = conversations[:args.limit]
-    
-    print(f"✅ Loaded {len(conversations)} conversations")
+    evaluation_index = None
+    
+    if args.incremental:
+        evaluation_index = EvaluationIndex(os.path.join(args.results_dir, "evaluation_index.json"))
+        if evaluation_index.exists:
+            print(f"📇 Evaluation index: {len(evaluation_index.evaluated)} evaluated, "
+                  f"last run {evaluation_index.watermark.get('last_run', 'never')}")
+        else:
+            seeded = evaluation_index.seed_from_evaluations(args.results_dir)
+            print(f"📇 New evaluation index (seeded with {seeded} evaluated conversations)")
+        
+        # Stream only the delta into the judge
+        new_conversations = evaluation_index.iter_new_conversations(args.results_dir)
+        first = next(new_conversations, None)
+        if first is None:
+            evaluation_index.save()
+            print("✅ No new conversations to evaluate")
+            return
+        conversations = itertools.chain([first], new_conversations)
+        if args.limit:
+            conversations = itertools.islice(conversations, args.limit)
+    else:
+        if args.conversation_id or args.scenario_id or args.model_name:
+            conversations = load_indexed_conversations(
+                args.results_dir, args.conversation_id, args.scenario_id, args.model_name
+            )
+        else:
+            conversations = load_conversations_from_json(args.results_dir)
+        
+        if not conversations:
+            print("❌ No conversations found to evaluate")
+            return
+        
+        if args.limit:
+            conversations = conversations[:args.limit]
+        
+        print(f"✅ Loaded {len(conversations)} conversations")
     
     # Load scenarios
     print(f"\n📋 Loading scenarios...")
@@ -263,16 +417,82 @@ def main():
     print(f"✅ Loaded {len(scenarios)} scenarios")
     
     # Initialize judge
-    judge = LLMJudge(judge_model, language=args.language)
+    judge_cache = JudgeCache(os.path.join(config.CACHE_DIR, "judge", "verdicts.jsonl"))
+    
+    if args.compression_report:
+        baseline_judge = LLMJudge(
+            judge_model,
+            language=args.language,
+            cache=judge_cache,
+            force=args.force,
+            structured_output=not args.no_structured_output
+        )
+        holdout = select_holdout(list(conversations), args.compression_report)
+        report = compare_compression_levels(baseline_judge, holdout, scenarios)
+        save_compression_report(report, args.results_dir)
+        return
+    
+    judge = LLMJudge(
+        judge_model,
+        language=args.language,
+        cache=judge_cache,
+        force=args.force,
+        structured_output=not args.no_structured_output,
+        triage=ConversationTriage() if args.triage else None,
+        secondary_judges=secondary_judges,
+        ensemble_policy=EnsemblePolicy(
+            disagreement=args.disagreement_threshold,
+            aggregation=args.aggregation
+        ) if secondary_judges else None,
+        compressor=TranscriptCompressor(args.compression, args.language) if args.compression else None
+    )
+    print(f"🧱 Structured output: {'on' if judge.structured_output else 'off'}")
+    if judge.compressor is not None:
+        print(f"🗜️  Transcript compression: level {args.compression}")
+    print(f"♻️  Judge cache: {len(judge_cache)} verdicts{' (ignored: --force)' if args.force else ''}")
     
     # Run evaluation
     print(f"\n⚖️  Running evaluations...")
     print("="*80)
     
-    results = judge.batch_evaluate(conversations, scenarios)
+    results = judge.batch_evaluate(
+        conversations,
+        scenarios,
+        batch_size=args.batch_size,
+        batch_token_budget=args.batch_token_budget
+    )
     
     print("="*80)
-    print(f"✅ Evaluation complete! Evaluated {len(results)} conversations")
+    if not results:
+        if evaluation_index is not None:
+            evaluation_index.save()
+            print(f"📇 Watermark updated: {len(evaluation_index.evaluated)} conversations evaluated")
+        return
+    
+    cached_count = sum(1 for r in results if r.conversation_id in judge.cached_conversation_ids)
+    print(f"✅ Evaluation complete! Evaluated {len(results)} conversations "
+          f"({len(results) - cached_count} judged, {cached_count} from cache)")
+    if judge.triage is not None:
+        triage_stats = judge.triage.stats
+        print(f"🩺 Triage: {triage_stats.deterministic}/{triage_stats.triaged} scored locally "
+              f"({triage_stats.avoided_fraction:.1%} of judge calls avoided) {triage_stats.reasons}")
+    if judge.compressor is not None:
+        print(f"🗜️  Transcripts compressed to {judge.compressor.ratio:.1%} of their original size")
+    if judge.ensemble_stats is not None:
+        ensemble_stats = judge.ensemble_stats.to_dict()
+        print(f"👥 Ensemble: {ensemble_stats['calls_per_conversation']:.2f} judge calls per conversation, "
+              f"{ensemble_stats['escalation_rate']:.1%} escalated {ensemble_stats['escalations']}, "
+              f"{ensemble_stats['agreement_rate']:.1%} second-opinion agreement "
+              f"(mean |Δ| {ensemble_stats['mean_abs_diff']:.2f})")
+    parse_stats = judge.parse_stats.to_dict()
+    if parse_stats["responses"]:
+        print(f"🧩 Judge JSON: {parse_stats['parse_failure_rate']:.1%} needed repair, "
+              f"{parse_stats['repaired']} repaired locally, {parse_stats['fixed']}/{parse_stats['fix_calls']} fixed by follow-up, "
+              f"{parse_stats['failed']} failed")
+    if args.batch_size > 1:
+        stats = judge.batch_stats
+        print(f"📦 Batched judging: {stats['batched_verdicts']} verdicts in {stats['batched_calls']} calls, "
+              f"{stats['fallbacks']} fallbacks, ~{judge.tokens_saved_per_verdict():.0f} prompt tokens saved per verdict")
     
     # Save results
     output_file = save_evaluation_results(results, args.results_dir)
@@ -281,14 +501,28 @@ def main():
     print_evaluation_summary(results)
     
     # Save to storage
+    saved_ids = set()
     try:
         storage = get_storage(config.STORAGE_MODE)
+        # Evaluation writes upsert by conversation_id, so cached verdicts
+        # relabelled for a new conversation are saved like fresh ones
         for result in results:
-            storage.save_evaluation(result.to_dict())
-        print(f"\n✅ Saved evaluations to {config.STORAGE_MODE} storage")
+            if storage.save_evaluation(result.to_dict()):
+                saved_ids.add(result.conversation_id)
+        print(f"\n✅ Saved {len(saved_ids)}/{len(results)} evaluations to {config.STORAGE_MODE} storage")
     except Exception as e:
         print(f"\n⚠️  Failed to save to storage: {e}")
     
+    # The index goes last: only verdicts that made it to storage count as
+    # judged, so a failed save is retried on the next run
+    if evaluation_index is not None:
+        evaluation_index.mark_evaluated(
+            conversation_id for conversation_id in saved_ids
+            if conversation_id not in judge.failed_conversation_ids
+        )
+        evaluation_index.save()
+        print(f"📇 Watermark updated: {len(evaluation_index.evaluated)} conversations evaluated")
+    
     print(f"\n📊 Full results saved to: {output_file}")
     print(f"🔍 View traces at: https://wandb.ai/{config.WEAVE_PROJECT_NAME}/weave")
 
@@ -9,7 +9,7 @@ import os
 import time
 import json
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
 # Import core modules
@@ -17,11 +17,20 @@ import config
 from models.gemini_client import GeminiClient
 from models.claude_client import ClaudeClient
 from models.weave_client import WeaveClient
+from models.routed_model import RoutedModel, ROUTING_POLICIES
 from agents.agent_a_ecommerce import AgentA_Ecommerce
-from scenarios.scenario_loader import load_scenarios_for_agent
+from scenarios.scenario_registry import ScenarioRegistry
+from scenarios.scenario_expansion import expand_scenarios, count_variants, load_expansion_spec
 from simulator.customer_simulator import CustomerSimulator
+from simulator.termination import load_termination_detector
 from orchestrator import ConversationOrchestrator
+from evaluator.llm_judge import LLMJudge
+from evaluator.judge_cache import JudgeCache
+from evaluator.online_judge import OnlineJudge
+from run_evaluation import create_judge_model, save_evaluation_results, print_evaluation_summary
 from storage.results_storage import get_storage
+from storage.multi_sink import MultiSinkStorage
+from utils.conversation_ids import make_conversation_id, new_run_id
 from utils.weave_init import initialize_weave, get_weave_status
 
 load_dotenv()
@@ -30,11 +39,54 @@ load_dotenv()
 class EvaluationPipeline:
     """Main evaluation pipeline to test all scenarios across all models"""
     
-    def __init__(self):
-        """Initialize the evaluation pipeline"""
+    def __init__(
+        self,
+        online_judge: Optional[OnlineJudge] = None,
+        customer_routing: Optional[str] = None,
+        customer_max_latency: Optional[float] = None,
+        customer_timeout: Optional[float] = None,
+        hedge_budget: float = 0.0,
+        termination_model: Optional[str] = None
+    ):
+        """
+        Initialize the evaluation pipeline
+        
+        Args:
+            online_judge: Judges each conversation as soon as it completes,
+                overlapping judging with generation
+            customer_routing: Routing policy (see ROUTING_POLICIES) for the
+                customer simulator; it then fails over to the other available
+                models instead of ending the conversation. The agent always
+                runs on the model under test.
+            customer_max_latency: Rolling median latency (seconds) above which
+                a customer model is routed around (with customer_routing)
+            customer_timeout: Seconds to wait for one customer model call
+                before failing over to the next model (with customer_routing)
+            hedge_budget: Share of model calls that may be hedged with a
+                duplicate request once they run past the rolling p95 (0: off).
+                Agent calls are only hedged against the same model.
+            termination_model: Classifier trained with
+                `python -m simulator.termination train` deciding when the
+                customer has closed the conversation (default:
+                TERMINATION_MODEL env var, else the phrase rules)
+        """
         self.results_dir = config.RESULTS_DIR
+        self.online_judge = online_judge
+        if online_judge is not None and online_judge.on_result is None:
+            online_judge.on_result = self._store_verdict
+        self.customer_routing = customer_routing
+        self.customer_max_latency = customer_max_latency
+        self.customer_timeout = customer_timeout
+        self.hedge_budget = hedge_budget
+        self.termination_detector = load_termination_detector(termination_model)
+        self._customer_routers: Dict[str, RoutedModel] = {}
+        self._agent_routers: Dict[str, RoutedModel] = {}
         self.models = self._initialize_models()
         self.agent_types = ["agent_a"]  # Can expand to agent_b, agent_c later
+        self.scenario_registry = ScenarioRegistry(
+            cache_dir=os.path.join(config.CACHE_DIR, "scenarios"),
+            scenario_dirs=[config.SCENARIO_FILES_DIR]
+        )
         
         # Initialize storage (fallback to JSON if Supabase not configured)
         try:
@@ -45,6 +97,8 @@ class EvaluationPipeline:
             self.storage = get_storage("json")
         
         self.all_results = []
+        self.run_id = new_run_id()
+        self._trials: Dict[tuple, int] = {}  # (scenario_id, model_key) -> conversations run so far
         
         # Initialize Weave tracing
         if config.ENABLE_WEAVE_TRACING:
@@ -109,7 +163,8 @@ class EvaluationPipeline:
         agent_types: List[str] = None,
         model_names: List[str] = None,
         max_turns: int = 10,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        expansion: Optional[Dict] = None
     ) -> Dict:
         """
         Run full evaluation pipeline
@@ -119,6 +174,8 @@ class EvaluationPipeline:
             model_names: List of models to test (default: all)
             max_turns: Maximum conversation turns
             temperature: LLM temperature
+            expansion: Optional expansion spec (see load_expansion_spec);
+                variants are generated lazily instead of running base scenarios
             
         Returns:
             Aggregated results dictionary
@@ -137,6 +194,9 @@ class EvaluationPipeline:
         print("="*80)
         
         start_time = time.time()
+        self.run_id = new_run_id()
+        self._trials = {}
+        print(f"🆔 Run ID: {self.run_id}")
         total_tests = 0
         successful_tests = 0
         failed_tests = 0
@@ -147,8 +207,13 @@ class EvaluationPipeline:
             print(f"{'='*80}")
             
             # Load scenarios
-            scenarios = load_scenarios_for_agent(agent_type)
-            print(f"📚 Loaded {len(scenarios)} scenarios")
+            scenarios = self.scenario_registry.get_scenarios(agent_type)
+            scenario_count = len(scenarios)
+            if expansion:
+                scenario_count = count_variants(len(scenarios), expansion["axes"], expansion["sample"])
+                print(f"📚 Loaded {len(scenarios)} base scenarios -> {scenario_count} variants")
+            else:
+                print(f"📚 Loaded {len(scenarios)} scenarios")
             
             for model_key in model_names:
                 if model_key not in self.models:
@@ -161,9 +226,21 @@ class EvaluationPipeline:
                 print(f"   Language mode: {model_info['language_mode']}")
                 print(f"{'-'*80}")
                 
-                for idx, scenario in enumerate(scenarios):
+                # Variants are streamed per model, never held in memory
+                if expansion:
+                    scenario_iter = expand_scenarios(
+                        scenarios,
+                        expansion["axes"],
+                        sample=expansion["sample"],
+                        method=expansion["method"],
+                        seed=expansion["seed"]
+                    )
+                else:
+                    scenario_iter = scenarios
+                
+                for idx, scenario in enumerate(scenario_iter):
                     total_tests += 1
-                    print(f"\n[{idx+1}/{len(scenarios)}] Scenario: {scenario.title}")
+                    print(f"\n[{idx+1}/{scenario_count}] Scenario: {scenario.title}")
                     
                     try:
                         result = self._run_single_test(
@@ -199,6 +276,33 @@ class EvaluationPipeline:
                             "timestamp": datetime.now().isoformat()
                         })
         
+        generation_time = time.time() - start_time
+        evaluations = []
+        if self.online_judge is not None:
+            if self.online_judge.pending:
+                print(f"\n⏳ Waiting for {self.online_judge.pending} queued conversations to be judged...")
+            evaluations = self.online_judge.close()
+            judge_wait = time.time() - start_time - generation_time
+            latencies = self.online_judge.latencies
+            mean_latency = sum(latencies) / len(latencies) if latencies else 0.0
+            print(f"⚖️  Online judging: {len(evaluations)} verdicts, {self.online_judge.errors} errors, "
+                  f"{mean_latency:.1f}s mean from conversation end to verdict, "
+                  f"{judge_wait:.2f}s waited after generation finished")
+        
+        if isinstance(self.storage, MultiSinkStorage):
+            if any(self.storage.pending.values()):
+                print(f"\n⏳ Waiting for storage writes: {self.storage.pending}")
+            self.storage.flush()
+            self.storage.print_stats()
+        
+        for router in list(self._agent_routers.values()) + list(self._customer_routers.values()):
+            router.print_stats()
+            router.close()
+        # Built again on the next run
+        self._agent_routers.clear()
+        self._customer_routers.clear()
+        self.scenario_registry.close()
+        
         elapsed_time = time.time() - start_time
         
         print(f"\n{'='*80}")
@@ -215,15 +319,49 @@ class EvaluationPipeline:
         benchmark = self._generate_benchmark()
         self._save_benchmark(benchmark)
         
+        if evaluations:
+            self._save_evaluations(evaluations)
+        
         return {
             "total_tests": total_tests,
             "successful_tests": successful_tests,
             "failed_tests": failed_tests,
             "elapsed_time": elapsed_time,
             "results": self.all_results,
+            "evaluations": evaluations,
             "benchmark": benchmark
         }
     
+    def _customer_model(self, model_key: str):
+        """Customer simulator model: the model under test, routed if enabled"""
+        if not self.customer_routing and not self.hedge_budget:
+            return self.models[model_key]["client"]
+        router = self._customer_routers.get(model_key)
+        if router is None:
+            clients = [self.models[model_key]["client"]]
+            if self.customer_routing:
+                # Model under test first, the other available models as fallbacks
+                clients += [info["client"] for key, info in self.models.items() if key != model_key]
+            router = RoutedModel(
+                clients,
+                policy=self.customer_routing or "primary",
+                max_latency=self.customer_max_latency,
+                attempt_timeout=self.customer_timeout,
+                hedge_budget=self.hedge_budget
+            )
+            self._customer_routers[model_key] = router
+        return router
+    
+    def _agent_model(self, model_key: str):
+        """Agent model: the model under test, hedged against itself if enabled"""
+        if not self.hedge_budget:
+            return self.models[model_key]["client"]
+        router = self._agent_routers.get(model_key)
+        if router is None:
+            router = RoutedModel([self.models[model_key]["client"]], hedge_budget=self.hedge_budget)
+            self._agent_routers[model_key] = router
+        return router
+    
     def _run_single_test(
         self,
         agent_type: str,
@@ -240,11 +378,14 @@ class EvaluationPipeline:
         agent = AgentA_Ecommerce(language=language_mode)
         
         # Initialize customer simulator
-        customer_model = model_info["client"]
-        customer_simulator = CustomerSimulator(customer_model)
+        customer_model = self._customer_model(model_key)
+        customer_simulator = CustomerSimulator(
+            customer_model,
+            termination_detector=self.termination_detector
+        )
         
         # Initialize agent model (same as customer for now)
-        agent_model = model_info["client"]
+        agent_model = self._agent_model(model_key)
         
         # Run conversation
         orchestrator = ConversationOrchestrator(
@@ -258,17 +399,27 @@ class EvaluationPipeline:
             max_turns=max_turns
         )
         
-        # Add metadata to result
-        conversation_id = f"{scenario.scenario_id}_{model_info['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
         # Convert result to dict and add metadata
         result_dict = result.to_dict() if hasattr(result, 'to_dict') else result
+        
+        # Deterministic ID: retried saves of this conversation map to the same record
+        trial_key = (scenario.scenario_id, model_key)
+        trial = self._trials.get(trial_key, 0)
+        self._trials[trial_key] = trial + 1
+        conversation_id = make_conversation_id(
+            self.run_id, scenario.scenario_id, model_info["name"], trial, result_dict.get("turns", [])
+        )
+        result_dict["run_id"] = self.run_id
+        result_dict["trial"] = trial
         result_dict["agent_type"] = agent_type
         result_dict["model_key"] = model_key
         result_dict["model_name"] = model_info["name"]
         result_dict["language_mode"] = language_mode
         result_dict["timestamp"] = datetime.now().isoformat()
         result_dict["conversation_id"] = conversation_id
+        if scenario.base_scenario_id:
+            result_dict["base_scenario_id"] = scenario.base_scenario_id
+            result_dict["variant_params"] = scenario.variant_params
         
         # Save conversation results
         try:
@@ -276,8 +427,23 @@ class EvaluationPipeline:
         except Exception as e:
             print(f"   ⚠️  Failed to save conversation: {e}")
         
+        if self.online_judge is not None:
+            self.online_judge.submit(result_dict, scenario)
+        
         return result_dict
     
+    def _store_verdict(self, result):
+        """Save one online judge verdict to storage as soon as it is produced"""
+        # Evaluation writes upsert by conversation_id, so cached verdicts
+        # relabelled for a new conversation are saved like fresh ones
+        self.storage.save_evaluation(result.to_dict())
+    
+    def _save_evaluations(self, evaluations: List):
+        """Save online judge verdicts to the results directory (storage has them already)"""
+        
+        save_evaluation_results(evaluations, self.results_dir)
+        print_evaluation_summary(evaluations)
+    
     def _generate_benchmark(self) -> Dict:
         """Generate benchmark metrics from all results"""
         
@@ -407,15 +573,86 @@ def main():
         default=0.7,
         help="LLM temperature (default: 0.7)"
     )
+    parser.add_argument(
+        "--expansion-spec",
+        help="JSON file with parameter axes for scenario expansion"
+    )
+    parser.add_argument(
+        "--online-judge",
+        choices=["claude", "gemini", "qwen"],
+        help="Judge each conversation with this LLM as soon as it completes"
+    )
+    parser.add_argument(
+        "--judge-workers",
+        type=int,
+        default=2,
+        help="Concurrent judge workers for --online-judge (default: 2)"
+    )
+    parser.add_argument(
+        "--judge-language",
+        choices=["arabic", "english"],
+        default="english",
+        help="Language for online judge prompts (default: english)"
+    )
+    
+    parser.add_argument(
+        "--customer-routing",
+        choices=ROUTING_POLICIES,
+        help="Fail the customer simulator over to other models with this routing policy"
+    )
+    parser.add_argument(
+        "--customer-max-latency",
+        type=float,
+        help="Route around customer models whose rolling median latency exceeds this many seconds"
+    )
+    parser.add_argument(
+        "--customer-timeout",
+        type=float,
+        help="Fail over to the next customer model when a call takes longer than this many seconds"
+    )
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=0.0,
+        help="Hedge model calls slower than their rolling p95, up to this share of calls (e.g. 0.05)"
+    )
+    parser.add_argument(
+        "--termination-model",
+        help="End-of-conversation classifier from `python -m simulator.termination train`"
+    )
     
     args = parser.parse_args()
+    if (args.customer_max_latency or args.customer_timeout) and not args.customer_routing:
+        parser.error("--customer-max-latency and --customer-timeout need --customer-routing")
+    expansion = load_expansion_spec(args.expansion_spec) if args.expansion_spec else None
     
-    pipeline = EvaluationPipeline()
+    online_judge = None
+    if args.online_judge:
+        judge_model = create_judge_model(args.online_judge)
+        if judge_model is None:
+            return
+        judge = LLMJudge(
+            judge_model,
+            language=args.judge_language,
+            cache=JudgeCache(os.path.join(config.CACHE_DIR, "judge", "verdicts.jsonl"))
+        )
+        online_judge = OnlineJudge(judge, workers=args.judge_workers)
+        print(f"⚖️  Online judge: {judge_model.model_name} ({args.judge_workers} workers)")
+    
+    pipeline = EvaluationPipeline(
+        online_judge=online_judge,
+        customer_routing=args.customer_routing,
+        customer_max_latency=args.customer_max_latency,
+        customer_timeout=args.customer_timeout,
+        hedge_budget=args.hedge_budget,
+        termination_model=args.termination_model
+    )
     results = pipeline.run_evaluation(
         agent_types=args.agents,
         model_names=args.models,
         max_turns=args.max_turns,
-        temperature=args.temperature
+        temperature=args.temperature,
+        expansion=expansion
     )
     
     print("\n✅ Evaluation complete!")
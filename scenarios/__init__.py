@@ -3,6 +3,9 @@ Test scenarios for agent evaluation
 """
 
 from .scenario_loader import ScenarioLoader, Scenario
+from .scenario_registry import ScenarioRegistry
+from .scenario_files import iter_scenario_files, load_scenario_file, export_scenarios
+from .scenario_expansion import ScenarioExpander, expand_scenarios
 from .agent_a_scenarios import get_agent_a_scenarios
 from .agent_b_scenarios import get_agent_b_scenarios
 from .agent_c_scenarios import get_agent_c_scenarios
@@ -10,6 +13,12 @@ from .agent_c_scenarios import get_agent_c_scenarios
 __all__ = [
     'ScenarioLoader',
     'Scenario',
+    'ScenarioRegistry',
+    'iter_scenario_files',
+    'load_scenario_file',
+    'export_scenarios',
+    'ScenarioExpander',
+    'expand_scenarios',
     'get_agent_a_scenarios',
     'get_agent_b_scenarios',
     'get_agent_c_scenarios',
@@ -0,0 +1,300 @@
+"""
+Parametric scenario expansion for large synthetic test suites
+
+Takes a base Scenario and parameter axes (persona fields, complexity,
+max_turns or initial_context values) and lazily yields variants, either the
+full cartesian product or a capped sample (random, stratified or Latin
+hypercube). Variants are generated one at a time from product indices, so
+nothing proportional to the size of the product is ever materialized.
+
+Variant IDs are derived from the base ID and the parameter values, so the
+same variant always gets the same ID regardless of sampling order.
+"""
+
+import hashlib
+import itertools
+import json
+import random
+from dataclasses import fields, replace
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .scenario_loader import Scenario
+from simulator.customer_simulator import CustomerPersona
+
+
+CONTEXT_PREFIX = "context."
+SAMPLING_METHODS = ("random", "stratified", "lhs")
+
+_PERSONA_FIELDS = {f.name for f in fields(CustomerPersona)}
+_SCENARIO_FIELDS = {"complexity", "max_turns", "min_turns"}
+
+
+def variant_id(base_scenario_id: str, params: Dict[str, any]) -> str:
+    """
+    Build a stable scenario ID for a parameter assignment
+    
+    Args:
+        base_scenario_id: ID of the base scenario
+        params: Axis name -> value
+    
+    Returns:
+        Variant scenario ID
+    """
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:10]
+    return f"{base_scenario_id}__v{digest}"
+
+
+def apply_parameters(base: Scenario, params: Dict[str, any]) -> Scenario:
+    """
+    Create a scenario variant from a base scenario and parameter values
+    
+    Args:
+        base: Base scenario
+        params: Axis name -> value (persona field, complexity, max_turns,
+            min_turns, or "context.<key>")
+    
+    Returns:
+        New Scenario with a stable variant ID
+    """
+    persona_changes = {}
+    scenario_changes = {}
+    context = None
+    
+    for name, value in params.items():
+        if name.startswith(CONTEXT_PREFIX):
+            if context is None:
+                context = dict(base.initial_context)
+            context[name[len(CONTEXT_PREFIX):]] = value
+        elif name in _PERSONA_FIELDS:
+            persona_changes[name] = value
+        elif name in _SCENARIO_FIELDS:
+            scenario_changes[name] = value
+        else:
+            raise ValueError(f"Unknown expansion axis: {name}")
+    
+    if persona_changes:
+        scenario_changes["customer_persona"] = replace(base.customer_persona, **persona_changes)
+    if context is not None:
+        scenario_changes["initial_context"] = context
+    
+    return replace(
+        base,
+        scenario_id=variant_id(base.scenario_id, params),
+        base_scenario_id=base.scenario_id,
+        variant_params=dict(params),
+        **scenario_changes
+    )
+
+
+class ScenarioExpander:
+    """Lazily expands a base scenario over parameter axes"""
+    
+    def __init__(self, base: Scenario, axes: Dict[str, Sequence]):
+        """
+        Initialize expander
+        
+        Args:
+            base: Base scenario
+            axes: Axis name -> list of values, e.g.
+                {"patience_level": [2, 5, 9], "context.المدينة": ["القاهرة", "أسوان"]}
+        """
+        for name, values in axes.items():
+            if not name.startswith(CONTEXT_PREFIX) and name not in _PERSONA_FIELDS | _SCENARIO_FIELDS:
+                raise ValueError(f"Unknown expansion axis: {name}")
+            if not values:
+                raise ValueError(f"Expansion axis '{name}' has no values")
+        
+        self.base = base
+        self.axis_names: List[str] = list(axes)
+        self.axis_values: List[List] = [list(values) for values in axes.values()]
+    
+    def __len__(self) -> int:
+        total = 1
+        for values in self.axis_values:
+            total *= len(values)
+        return total
+    
+    def params_at(self, index: int) -> Dict[str, any]:
+        """Decode a product index (mixed radix) into a parameter assignment"""
+        params = {}
+        for name, values in zip(reversed(self.axis_names), reversed(self.axis_values)):
+            index, position = divmod(index, len(values))
+            params[name] = values[position]
+        return {name: params[name] for name in self.axis_names}
+    
+    def _index_of(self, positions: Sequence[int]) -> int:
+        index = 0
+        for position, values in zip(positions, self.axis_values):
+            index = index * len(values) + position
+        return index
+    
+    def variant(self, index: int) -> Scenario:
+        """Build the variant at a product index"""
+        return apply_parameters(self.base, self.params_at(index))
+    
+    def iter_product(self) -> Iterator[Scenario]:
+        """Yield every variant of the cartesian product in order"""
+        for positions in itertools.product(*(range(len(v)) for v in self.axis_values)):
+            yield self.variant(self._index_of(positions))
+    
+    def sample(
+        self,
+        n: int,
+        method: str = "lhs",
+        seed: int = 0,
+        stratify_by: Optional[str] = None
+    ) -> Iterator[Scenario]:
+        """
+        Yield min(n, number of variants) distinct variants
+        
+        Args:
+            n: Maximum number of variants
+            method: "random" (uniform over the product), "stratified"
+                (round-robin over the values of one axis) or "lhs" (Latin
+                hypercube: every axis's values are covered evenly)
+            seed: Random seed; the same seed yields the same variants
+            stratify_by: Axis for stratified sampling (default: first axis)
+        
+        Yields:
+            Scenario variants
+        """
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"Unknown sampling method: {method} (use one of {SAMPLING_METHODS})")
+        
+        total = len(self)
+        if n >= total:
+            yield from self.iter_product()
+            return
+        
+        rng = random.Random(seed)
+        
+        if method == "random":
+            # random.sample over a range doesn't materialize the range
+            for index in rng.sample(range(total), n):
+                yield self.variant(index)
+            return
+        
+        seen = set()
+        attempts = 0
+        max_attempts = n * 20
+        
+        while len(seen) < n and attempts < max_attempts:
+            batch = n - len(seen)
+            for positions in self._draw_positions(batch, method, rng, stratify_by):
+                attempts += 1
+                index = self._index_of(positions)
+                if index in seen:
+                    continue
+                seen.add(index)
+                yield self.variant(index)
+        
+        # Repeated draws can leave the sample short of n (e.g. small axes);
+        # top it up uniformly so count_variants stays exact
+        while len(seen) < n:
+            index = rng.randrange(total)
+            if index not in seen:
+                seen.add(index)
+                yield self.variant(index)
+    
+    def _draw_positions(
+        self,
+        count: int,
+        method: str,
+        rng: random.Random,
+        stratify_by: Optional[str]
+    ) -> Iterator[List[int]]:
+        """Draw axis positions for stratified or Latin hypercube sampling"""
+        if method == "lhs":
+            # One permutation of the strata per axis; stratum i maps onto
+            # the axis values evenly so each value gets ~count/len(values) draws
+            columns = []
+            for values in self.axis_values:
+                strata = list(range(count))
+                rng.shuffle(strata)
+                columns.append([
+                    int((stratum + rng.random()) / count * len(values))
+                    for stratum in strata
+                ])
+            for row in range(count):
+                yield [column[row] for column in columns]
+            return
+        
+        axis = self.axis_names.index(stratify_by) if stratify_by else 0
+        strata = len(self.axis_values[axis])
+        for row in range(count):
+            positions = [rng.randrange(len(values)) for values in self.axis_values]
+            positions[axis] = row % strata
+            yield positions
+
+
+def expand_scenarios(
+    scenarios: Iterable[Scenario],
+    axes: Dict[str, Sequence],
+    sample: Optional[int] = None,
+    method: str = "lhs",
+    seed: int = 0
+) -> Iterator[Scenario]:
+    """
+    Lazily expand several base scenarios over the same axes
+    
+    Args:
+        scenarios: Base scenarios
+        axes: Axis name -> list of values
+        sample: Cap on variants per base scenario (None = full product)
+        method: Sampling method when sample is set
+        seed: Random seed
+    
+    Yields:
+        Scenario variants
+    """
+    for scenario in scenarios:
+        expander = ScenarioExpander(scenario, axes)
+        if sample is None:
+            yield from expander.iter_product()
+        else:
+            yield from expander.sample(sample, method=method, seed=seed)
+
+
+def count_variants(
+    base_count: int,
+    axes: Dict[str, Sequence],
+    sample: Optional[int] = None
+) -> int:
+    """Number of variants expand_scenarios yields for base_count scenarios"""
+    total = 1
+    for values in axes.values():
+        total *= len(values)
+    return base_count * (total if sample is None else min(sample, total))
+
+
+def load_expansion_spec(path: str) -> Dict:
+    """
+    Load an expansion spec from JSON
+    
+    Expected format:
+        {
+            "axes": {"patience_level": [2, 5, 9], "tech_literacy": ["low", "high"]},
+            "sample": 20,        # optional cap per base scenario
+            "method": "lhs",     # random, stratified or lhs
+            "seed": 0
+        }
+    
+    Args:
+        path: JSON file path
+    
+    Returns:
+        Spec dictionary with defaults filled in
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    
+    if not isinstance(spec.get("axes"), dict) or not spec["axes"]:
+        raise ValueError(f"{path}: expansion spec needs a non-empty 'axes' object")
+    
+    spec.setdefault("sample", None)
+    spec.setdefault("method", "lhs")
+    spec.setdefault("seed", 0)
+    if spec["method"] not in SAMPLING_METHODS:
+        raise ValueError(f"{path}: unknown sampling method {spec['method']}")
+    return spec
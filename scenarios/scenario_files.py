@@ -0,0 +1,470 @@
+"""
+Declarative scenario files (JSON / JSONL / YAML) with a compiled cache
+
+Scenarios can be described as data instead of Python constructors. Files
+are validated against the Scenario/CustomerPersona fields, streamed one
+record at a time, and compiled to a binary cache keyed by each file's
+content hash. Opening a compiled cache only reads its index, so reloading
+thousands of scenarios doesn't re-parse, validate or execute anything and
+scenarios are materialized on demand.
+
+Supported formats:
+- .json: a single scenario object or a list of them
+- .jsonl: one scenario object per line
+- .yaml / .yml: one or more YAML documents (requires PyYAML)
+"""
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import pickle
+import shutil
+import struct
+from dataclasses import asdict, fields, MISSING
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .scenario_loader import Scenario
+from simulator.customer_simulator import CustomerPersona
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+
+SCENARIO_FILE_EXTENSIONS = (".json", ".jsonl", ".yaml", ".yml")
+
+# Bump when the compiled cache layout changes
+COMPILED_FORMAT_VERSION = 2
+
+# Field name -> expected JSON type(s)
+_PERSONA_TYPES = {
+    "name": str,
+    "age": int,
+    "personality": str,
+    "communication_style": str,
+    "patience_level": int,
+    "tech_literacy": str,
+    "cultural_context": str,
+    "language_style": str,
+}
+
+_SCENARIO_TYPES = {
+    "scenario_id": str,
+    "agent_type": str,
+    "title": str,
+    "description": str,
+    "complexity": str,
+    "customer_persona": dict,
+    "customer_goal": str,
+    "initial_context": dict,
+    "success_criteria": list,
+    "evaluation_dimensions": dict,
+    "expected_actions": list,
+    "must_not_do": list,
+    "max_turns": int,
+    "min_turns": int,
+    "base_scenario_id": (str, type(None)),
+    "variant_params": dict,
+}
+
+VALID_COMPLEXITIES = ("simple", "medium", "high", "critical")
+
+
+def _required_fields(cls) -> List[str]:
+    return [
+        f.name for f in fields(cls)
+        if f.default is MISSING and f.default_factory is MISSING
+    ]
+
+
+def _check_fields(data: Dict, types: Dict[str, type], required: List[str], where: str):
+    """Validate keys and value types of a record"""
+    if not isinstance(data, dict):
+        raise ValueError(f"{where}: expected an object, got {type(data).__name__}")
+    
+    unknown = set(data) - set(types)
+    if unknown:
+        raise ValueError(f"{where}: unknown fields {sorted(unknown)}")
+    
+    missing = [name for name in required if name not in data]
+    if missing:
+        raise ValueError(f"{where}: missing required fields {missing}")
+    
+    for name, value in data.items():
+        expected = types[name]
+        # bool is a subclass of int; don't accept it where a number is expected
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            expected_name = expected.__name__ if isinstance(expected, type) else expected[0].__name__
+            raise ValueError(
+                f"{where}: field '{name}' must be {expected_name}, got {type(value).__name__}"
+            )
+
+
+def validate_scenario_dict(data: Dict, source: str = "") -> None:
+    """
+    Validate a scenario record against the Scenario/CustomerPersona schema
+    
+    Args:
+        data: Scenario dictionary
+        source: File name used in error messages
+    
+    Raises:
+        ValueError: If the record is invalid
+    """
+    where = f"{source}: scenario {data.get('scenario_id', '?') if isinstance(data, dict) else '?'}"
+    _check_fields(data, _SCENARIO_TYPES, _required_fields(Scenario), where)
+    _check_fields(
+        data["customer_persona"],
+        _PERSONA_TYPES,
+        _required_fields(CustomerPersona),
+        f"{where} customer_persona"
+    )
+    
+    if data["complexity"] not in VALID_COMPLEXITIES:
+        raise ValueError(f"{where}: complexity must be one of {VALID_COMPLEXITIES}")
+    
+    for name in ("success_criteria", "expected_actions", "must_not_do"):
+        if not all(isinstance(item, str) for item in data.get(name, [])):
+            raise ValueError(f"{where}: all items in '{name}' must be strings")
+    
+    patience = data["customer_persona"]["patience_level"]
+    if not 1 <= patience <= 10:
+        raise ValueError(f"{where}: patience_level must be between 1 and 10")
+
+
+def scenario_from_dict(data: Dict, source: str = "") -> Scenario:
+    """
+    Build a Scenario from a validated dictionary
+    
+    Args:
+        data: Scenario dictionary
+        source: File name used in error messages
+    
+    Returns:
+        Scenario
+    """
+    validate_scenario_dict(data, source)
+    record = dict(data)
+    record["customer_persona"] = CustomerPersona(**data["customer_persona"])
+    return Scenario(**record)
+
+
+def scenario_to_dict(scenario: Scenario) -> Dict:
+    """Convert a Scenario to a plain dictionary (inverse of scenario_from_dict)"""
+    return asdict(scenario)
+
+
+def _iter_records(path: str) -> Iterator[Dict]:
+    """Stream raw scenario records from a file"""
+    ext = os.path.splitext(path)[1].lower()
+    
+    if ext == ".jsonl":
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_number}: invalid JSON: {e}")
+    
+    elif ext == ".json":
+        # Streamed one array element at a time, like results files
+        from storage.results_storage import iter_json_records
+        try:
+            yield from iter_json_records(path)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: invalid JSON: {e}")
+    
+    elif ext in (".yaml", ".yml"):
+        if not YAML_AVAILABLE:
+            raise ImportError("يرجى تثبيت PyYAML لقراءة ملفات YAML: pip install pyyaml")
+        with open(path, 'r', encoding='utf-8') as f:
+            for document in yaml.safe_load_all(f):
+                if isinstance(document, list):
+                    yield from document
+                elif document is not None:
+                    yield document
+    
+    else:
+        raise ValueError(f"Unsupported scenario file type: {path}")
+
+
+def iter_scenario_file(path: str) -> Iterator[Scenario]:
+    """
+    Stream validated scenarios from a single file
+    
+    Args:
+        path: Scenario file path
+    
+    Yields:
+        Scenario objects
+    """
+    source = os.path.basename(path)
+    for record in _iter_records(path):
+        yield scenario_from_dict(record, source)
+
+
+def find_scenario_files(directory: str) -> List[str]:
+    """List scenario files under a directory, in a stable order"""
+    paths = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.lower().endswith(SCENARIO_FILE_EXTENSIONS):
+                paths.append(os.path.join(root, filename))
+    return sorted(paths)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:24]
+
+
+def _source_key(path: str) -> str:
+    """Short hash of a scenario file's location, shared by all its compiled caches"""
+    return hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+
+
+# Caches named before they carried the source key; their source is unknown
+_UNKEYED_CACHE_RE = re.compile(r"compiled_[0-9a-f]{24}\.bin$")
+
+
+def _remove_stale_caches(cache_dir: str, path: str, keep: str):
+    """Delete caches compiled from earlier contents of a scenario file"""
+    candidates = glob.glob(os.path.join(cache_dir, f"compiled_{_source_key(path)}_*.bin"))
+    candidates += [p for p in glob.glob(os.path.join(cache_dir, "compiled_*.bin")) if _UNKEYED_CACHE_RE.search(p)]
+    for stale in candidates:
+        if stale == keep:
+            continue
+        try:
+            os.remove(stale)
+        except OSError as e:
+            print(f"⚠️  Failed to remove stale scenario cache {stale}: {e}")
+
+
+class CompiledScenarioFile:
+    """
+    Random-access view over a compiled scenario cache
+    
+    The cache holds a small header (scenario_id, agent_type, complexity and
+    byte range per scenario) followed by one pickle per scenario. Opening it
+    only reads the header; scenarios are unpickled from a memory map on
+    first access.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open a compiled cache
+        
+        Args:
+            path: Path written by CompiledScenarioFile.compile()
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header_length = struct.unpack("<Q", self._file.read(8))[0]
+            header = pickle.loads(self._file.read(header_length))
+            if header.get("version") != COMPILED_FORMAT_VERSION:
+                raise ValueError(f"unsupported compiled format {header.get('version')}")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._body_offset = 8 + header_length
+        self.entries: List[tuple] = header["entries"]
+        self._loaded: Dict[int, Scenario] = {}
+    
+    @staticmethod
+    def compile(scenarios: Iterable[Scenario], path: str):
+        """
+        Write scenarios to a compiled cache, streaming one at a time
+        
+        Args:
+            scenarios: Scenarios to compile
+            path: Output path (written atomically)
+        """
+        entries = []
+        body_path = f"{path}.body"
+        offset = 0
+        with open(body_path, 'wb') as body:
+            for scenario in scenarios:
+                data = pickle.dumps(scenario, protocol=pickle.HIGHEST_PROTOCOL)
+                body.write(data)
+                entries.append((
+                    scenario.scenario_id,
+                    scenario.agent_type,
+                    scenario.complexity,
+                    offset,
+                    len(data)
+                ))
+                offset += len(data)
+        
+        header = pickle.dumps(
+            {"version": COMPILED_FORMAT_VERSION, "entries": entries},
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as out, open(body_path, 'rb') as body:
+            out.write(struct.pack("<Q", len(header)))
+            out.write(header)
+            shutil.copyfileobj(body, out)
+        os.remove(body_path)
+        os.replace(tmp_path, path)
+    
+    def load(self, index: int) -> Scenario:
+        """Unpickle (once) and return the scenario at an index"""
+        scenario = self._loaded.get(index)
+        if scenario is None:
+            _, _, _, offset, length = self.entries[index]
+            start = self._body_offset + offset
+            scenario = pickle.loads(self._mmap[start:start + length])
+            self._loaded[index] = scenario
+        return scenario
+    
+    def close(self):
+        """Release the memory map and file handle"""
+        self._mmap.close()
+        self._file.close()
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __iter__(self) -> Iterator[Scenario]:
+        for index in range(len(self.entries)):
+            yield self.load(index)
+
+
+def compile_scenario_file(path: str, cache_dir: str) -> CompiledScenarioFile:
+    """
+    Get the compiled cache for a scenario file, compiling it if needed
+    
+    The cache is keyed by the file's location and content hash, so edited
+    files are recompiled (and their old caches deleted) and unchanged ones
+    are never parsed again.
+    
+    Args:
+        path: Scenario file path
+        cache_dir: Directory for compiled caches
+    
+    Returns:
+        CompiledScenarioFile
+    """
+    cache_path = os.path.join(cache_dir, f"compiled_{_source_key(path)}_{_file_hash(path)}.bin")
+    if os.path.exists(cache_path):
+        try:
+            return CompiledScenarioFile(cache_path)
+        except Exception as e:
+            print(f"⚠️  Recompiling unreadable scenario cache {cache_path}: {e}")
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    CompiledScenarioFile.compile(iter_scenario_file(path), cache_path)
+    _remove_stale_caches(cache_dir, path, cache_path)
+    return CompiledScenarioFile(cache_path)
+
+
+def load_scenario_file(path: str, cache_dir: Optional[str] = None) -> List[Scenario]:
+    """
+    Load every scenario in a file, using the compiled cache when possible
+    
+    Args:
+        path: Scenario file path
+        cache_dir: Directory for compiled caches (None disables caching)
+    
+    Returns:
+        List of scenarios in the file
+    """
+    if not cache_dir:
+        return list(iter_scenario_file(path))
+    compiled = compile_scenario_file(path, cache_dir)
+    return list(compiled)
+
+
+def iter_scenario_files(directory: str, cache_dir: Optional[str] = None) -> Iterator[Scenario]:
+    """
+    Stream scenarios from every scenario file under a directory
+    
+    Args:
+        directory: Directory containing scenario files
+        cache_dir: Directory for compiled caches (None disables caching)
+    
+    Yields:
+        Scenario objects
+    """
+    for path in find_scenario_files(directory):
+        if cache_dir:
+            yield from compile_scenario_file(path, cache_dir)
+        else:
+            yield from iter_scenario_file(path)
+
+
+def export_scenarios(scenarios: List[Scenario], path: str):
+    """
+    Write scenarios to a declarative file (format from the extension)
+    
+    Args:
+        scenarios: Scenarios to export
+        path: Output .json, .jsonl, or .yaml file
+    """
+    records = [scenario_to_dict(s) for s in scenarios]
+    ext = os.path.splitext(path)[1].lower()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        if ext == ".jsonl":
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        elif ext == ".json":
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        elif ext in (".yaml", ".yml"):
+            if not YAML_AVAILABLE:
+                raise ImportError("يرجى تثبيت PyYAML لكتابة ملفات YAML: pip install pyyaml")
+            yaml.safe_dump_all(records, f, allow_unicode=True, sort_keys=False)
+        else:
+            raise ValueError(f"Unsupported scenario file type: {path}")
+
+
+def main():
+    """Export built-in scenarios to files, or validate scenario files"""
+    import argparse
+    from .scenario_loader import load_scenarios_for_agent
+    
+    parser = argparse.ArgumentParser(description="Declarative scenario file tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Export Python scenarios to a file")
+    export_parser.add_argument("agent_type", help="agent_a, agent_b, or agent_c")
+    export_parser.add_argument("output", help="Output .json/.jsonl/.yaml file")
+    
+    validate_parser = subparsers.add_parser("validate", help="Validate scenario files")
+    validate_parser.add_argument("path", help="Scenario file or directory")
+    
+    args = parser.parse_args()
+    
+    if args.command == "export":
+        scenarios = load_scenarios_for_agent(args.agent_type)
+        export_scenarios(scenarios, args.output)
+        print(f"✅ Exported {len(scenarios)} scenarios to {args.output}")
+    else:
+        paths = find_scenario_files(args.path) if os.path.isdir(args.path) else [args.path]
+        total = 0
+        for path in paths:
+            try:
+                count = sum(1 for _ in iter_scenario_file(path))
+                total += count
+                print(f"✅ {path}: {count} scenarios")
+            except (ValueError, ImportError) as e:
+                print(f"❌ {e}")
+        print(f"Validated {total} scenarios in {len(paths)} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,30 @@ from typing import List, Dict, Optional
 from simulator.customer_simulator import CustomerPersona
 
 
+AGENT_TYPES = ("agent_a", "agent_b", "agent_c")
+
+# Long agent type names used by agent classes -> canonical scenario keys
+AGENT_TYPE_ALIASES = {
+    "agent_a_ecommerce": "agent_a",
+    "agent_b_telecom": "agent_b",
+    "agent_c_banking": "agent_c",
+}
+
+
+def normalize_agent_type(agent_type: str) -> str:
+    """
+    Map an agent type (e.g. 'Agent_A_Ecommerce') to its scenario key
+    
+    Args:
+        agent_type: Agent type identifier
+    
+    Returns:
+        Canonical agent type (agent_a, agent_b, or agent_c)
+    """
+    agent_type = agent_type.lower()
+    return AGENT_TYPE_ALIASES.get(agent_type, agent_type)
+
+
 @dataclass
 class Scenario:
     """
@@ -35,6 +59,10 @@ class Scenario:
     max_turns: int = 10  # Maximum conversation turns
     min_turns: int = 3   # Minimum expected turns for resolution
     
+    # Set on variants generated by scenario_expansion
+    base_scenario_id: Optional[str] = None
+    variant_params: Dict[str, any] = field(default_factory=dict)
+    
     def __post_init__(self):
         """Validate scenario data"""
         if self.max_turns < self.min_turns:
@@ -46,30 +74,25 @@ class ScenarioLoader:
     
     def __init__(self):
         self.scenarios: Dict[str, List[Scenario]] = {
-            "agent_a": [],
-            "agent_b": [],
-            "agent_c": []
+            agent_type: [] for agent_type in AGENT_TYPES
         }
+        self._by_id: Dict[str, Scenario] = {}
     
     def add_scenario(self, scenario: Scenario):
         """Add a scenario to the loader"""
-        agent_type = scenario.agent_type.lower().replace("_ecommerce", "").replace("_telecom", "").replace("_banking", "")
+        agent_type = normalize_agent_type(scenario.agent_type)
         if agent_type not in self.scenarios:
             raise ValueError(f"Invalid agent type: {agent_type}")
         self.scenarios[agent_type].append(scenario)
+        self._by_id[scenario.scenario_id] = scenario
     
     def get_scenarios(self, agent_type: str) -> List[Scenario]:
         """Get all scenarios for an agent type"""
-        agent_type = agent_type.lower().replace("_ecommerce", "").replace("_telecom", "").replace("_banking", "")
-        return self.scenarios.get(agent_type, [])
+        return self.scenarios.get(normalize_agent_type(agent_type), [])
     
     def get_scenario_by_id(self, scenario_id: str) -> Optional[Scenario]:
         """Get a specific scenario by ID"""
-        for scenarios in self.scenarios.values():
-            for scenario in scenarios:
-                if scenario.scenario_id == scenario_id:
-                    return scenario
-        return None
+        return self._by_id.get(scenario_id)
     
     def get_all_scenarios(self) -> List[Scenario]:
         """Get all scenarios across all agents"""
@@ -97,6 +120,8 @@ def load_scenarios_for_agent(agent_type: str) -> List[Scenario]:
     Returns:
         List of scenarios for that agent
     """
+    agent_type = normalize_agent_type(agent_type)
+    
     # Import scenario modules dynamically
     if agent_type == "agent_a":
         from scenarios.agent_a_scenarios import get_agent_a_scenarios
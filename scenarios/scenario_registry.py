@@ -0,0 +1,331 @@
+"""
+Indexed scenario registry with lazy, cached per-agent loading
+
+Scenarios are indexed by id, agent type and complexity so lookups and
+filters don't scan every scenario. Each agent's scenarios are only built
+when first needed and are pickled to a cache that is invalidated whenever
+the scenario sources change. Declarative scenario files (see
+scenario_files.py) are loaded alongside the built-in Python scenarios; a
+file scenario overrides a built-in one with the same ID.
+"""
+
+import hashlib
+import importlib.util
+import os
+import pickle
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .scenario_loader import Scenario, AGENT_TYPES, normalize_agent_type, load_scenarios_for_agent
+from .scenario_files import CompiledScenarioFile, compile_scenario_file, iter_scenario_file, find_scenario_files
+
+# Bump when the cache layout changes
+CACHE_FORMAT_VERSION = 1
+
+# Source recorded for scenarios from the Python scenario modules
+BUILTIN_SOURCE = "built-in"
+
+# Modules whose source defines what a cached scenario looks like
+_SCHEMA_MODULES = ("scenarios.scenario_loader", "simulator.customer_simulator")
+
+_AGENT_MODULES = {
+    "agent_a": "scenarios.agent_a_scenarios",
+    "agent_b": "scenarios.agent_b_scenarios",
+    "agent_c": "scenarios.agent_c_scenarios",
+}
+
+
+class _LazyScenario:
+    """Index entry for a compiled scenario that hasn't been unpickled yet"""
+    __slots__ = ("scenario_id", "agent_type", "complexity", "compiled", "index")
+    
+    def __init__(self, compiled: CompiledScenarioFile, index: int):
+        self.scenario_id, self.agent_type, self.complexity = compiled.entries[index][:3]
+        self.compiled = compiled
+        self.index = index
+    
+    def resolve(self) -> Scenario:
+        return self.compiled.load(self.index)
+
+
+def _resolve(entry) -> Scenario:
+    return entry.resolve() if isinstance(entry, _LazyScenario) else entry
+
+
+def _module_source_hash(module_names: Iterable[str]) -> str:
+    """Hash the source files of the given modules without importing them"""
+    digest = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode())
+    for name in module_names:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not os.path.exists(spec.origin):
+            digest.update(name.encode())
+            continue
+        with open(spec.origin, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ScenarioRegistry:
+    """Dict-indexed scenario lookup with lazy per-agent loading"""
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        loader: Callable[[str], List[Scenario]] = load_scenarios_for_agent,
+        scenario_dirs: Optional[List[str]] = None
+    ):
+        """
+        Initialize registry
+        
+        Args:
+            cache_dir: Directory for pickled scenario caches (None disables caching)
+            loader: Function building the scenarios for an agent type
+            scenario_dirs: Directories of declarative scenario files to include
+        """
+        self.cache_dir = cache_dir
+        self.loader = loader
+        self.scenario_dirs = [d for d in (scenario_dirs or []) if os.path.isdir(d)]
+        
+        self._files_loaded = False
+        self._loaded_agents = set()
+        self._compiled: List[CompiledScenarioFile] = []
+        self._by_id: Dict[str, Scenario] = {}
+        self._sources: Dict[str, str] = {}  # scenario_id -> file path or BUILTIN_SOURCE
+        # Secondary indexes map key -> {scenario_id: scenario} (insertion
+        # ordered), so replacing a scenario doesn't rescan its buckets
+        self._by_agent: Dict[str, Dict[str, Scenario]] = {}
+        self._by_complexity: Dict[str, Dict[str, Scenario]] = {}
+        self._by_agent_complexity: Dict[tuple, Dict[str, Scenario]] = {}
+        
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    def _cache_path(self, agent_type: str) -> Optional[str]:
+        """Cache file for an agent, named by the hash of its sources"""
+        if not self.cache_dir or agent_type not in _AGENT_MODULES:
+            return None
+        source_hash = _module_source_hash(_SCHEMA_MODULES + (_AGENT_MODULES[agent_type],))
+        return os.path.join(self.cache_dir, f"{agent_type}_{source_hash}.pkl")
+    
+    def _read_cache(self, path: Optional[str]) -> Optional[List[Scenario]]:
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable scenario cache {path}: {e}")
+            return None
+    
+    def _write_cache(self, path: Optional[str], agent_type: str, scenarios: List[Scenario]):
+        if not path:
+            return
+        try:
+            # Drop caches built from older sources
+            prefix = f"{agent_type}_"
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix) and name.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, name))
+            
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(scenarios, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️  Failed to write scenario cache {path}: {e}")
+    
+    def _ensure_files_loaded(self):
+        """Load declarative scenario files once (compiled cache per file)"""
+        if self._files_loaded:
+            return
+        # Left open by an earlier attempt that failed part way
+        for compiled in self._compiled:
+            compiled.close()
+        self._compiled = []
+        
+        for directory in self.scenario_dirs:
+            for path in find_scenario_files(directory):
+                if not self.cache_dir:
+                    for scenario in iter_scenario_file(path):
+                        self._register_from(scenario, path)
+                    continue
+                
+                # Only the compiled index is read here; scenarios are
+                # unpickled when a query returns them
+                compiled = compile_scenario_file(path, self.cache_dir)
+                self._compiled.append(compiled)
+                for index in range(len(compiled)):
+                    self._register_from(_LazyScenario(compiled, index), path)
+        
+        # Only once everything loaded, so a failure is retried next time
+        self._files_loaded = True
+    
+    def _ensure_loaded(self, agent_type: str):
+        """Load an agent's scenarios on first use"""
+        self._ensure_files_loaded()
+        if agent_type in self._loaded_agents:
+            return
+        
+        cache_path = self._cache_path(agent_type)
+        scenarios = self._read_cache(cache_path)
+        if scenarios is None:
+            scenarios = self.loader(agent_type)
+            self._write_cache(cache_path, agent_type, scenarios)
+        
+        for scenario in scenarios:
+            self._register_from(scenario, BUILTIN_SOURCE)
+        # Marked after loading so a loader error doesn't leave the agent empty for good
+        self._loaded_agents.add(agent_type)
+    
+    def load_all(self) -> "ScenarioRegistry":
+        """Eagerly load every built-in agent's scenarios"""
+        for agent_type in AGENT_TYPES:
+            self._ensure_loaded(agent_type)
+        return self
+    
+    def _register_from(self, scenario: Scenario, source: str):
+        """
+        Register a loaded scenario, resolving ID collisions between sources
+        
+        A scenario file wins over a built-in scenario whatever the load
+        order; otherwise the source loaded last wins. Every collision is
+        reported with the winning source.
+        
+        Args:
+            scenario: Scenario (or lazy compiled entry) to register
+            source: Scenario file path, or BUILTIN_SOURCE
+        """
+        scenario_id = scenario.scenario_id
+        previous = self._sources.get(scenario_id)
+        if previous is not None and previous != source and scenario_id in self._by_id:
+            if source == BUILTIN_SOURCE and previous != BUILTIN_SOURCE:
+                print(f"⚠️  Scenario {scenario_id}: {previous} overrides the built-in scenario")
+                return
+            print(f"⚠️  Scenario {scenario_id}: {source} overrides {previous}")
+        
+        self.register(scenario)
+        self._sources[scenario_id] = source
+    
+    def register(self, scenario: Scenario):
+        """
+        Add a scenario to the indexes (replacing any with the same ID)
+        
+        Args:
+            scenario: Scenario (or lazy compiled entry) to register
+        """
+        agent_type = normalize_agent_type(scenario.agent_type)
+        if scenario.scenario_id in self._by_id:
+            self._unindex(self._by_id[scenario.scenario_id])
+        
+        self._sources.pop(scenario.scenario_id, None)
+        self._by_id[scenario.scenario_id] = scenario
+        self._by_agent.setdefault(agent_type, {})[scenario.scenario_id] = scenario
+        self._by_complexity.setdefault(scenario.complexity, {})[scenario.scenario_id] = scenario
+        self._by_agent_complexity.setdefault((agent_type, scenario.complexity), {})[scenario.scenario_id] = scenario
+    
+    def _unindex(self, scenario: Scenario):
+        agent_type = normalize_agent_type(scenario.agent_type)
+        for index, key in (
+            (self._by_agent, agent_type),
+            (self._by_complexity, scenario.complexity),
+            (self._by_agent_complexity, (agent_type, scenario.complexity)),
+        ):
+            index.get(key, {}).pop(scenario.scenario_id, None)
+    
+    def get(self, scenario_id: str) -> Optional[Scenario]:
+        """
+        Get a scenario by ID, loading agents lazily until it is found
+        
+        Args:
+            scenario_id: Scenario identifier
+        
+        Returns:
+            Scenario or None
+        """
+        self._ensure_files_loaded()
+        entry = self._by_id.get(scenario_id)
+        if entry is not None:
+            return _resolve(entry)
+        
+        for agent_type in AGENT_TYPES:
+            if agent_type not in self._loaded_agents:
+                self._ensure_loaded(agent_type)
+                entry = self._by_id.get(scenario_id)
+                if entry is not None:
+                    return _resolve(entry)
+        return None
+    
+    def get_scenarios(self, agent_type: str) -> List[Scenario]:
+        """Get all scenarios for an agent type"""
+        agent_type = normalize_agent_type(agent_type)
+        self._ensure_loaded(agent_type)
+        return [_resolve(e) for e in self._by_agent.get(agent_type, {}).values()]
+    
+    def filter(
+        self,
+        agent_type: Optional[str] = None,
+        complexity: Optional[str] = None
+    ) -> List[Scenario]:
+        """
+        Get scenarios matching an agent type and/or complexity
+        
+        Args:
+            agent_type: Agent type (e.g. agent_c or agent_c_banking)
+            complexity: simple, medium, high, or critical
+        
+        Returns:
+            Matching scenarios
+        """
+        if agent_type is None:
+            self.load_all()
+            if complexity is None:
+                entries = self._by_id.values()
+            else:
+                entries = self._by_complexity.get(complexity, {}).values()
+        else:
+            agent_type = normalize_agent_type(agent_type)
+            self._ensure_loaded(agent_type)
+            if complexity is None:
+                entries = self._by_agent.get(agent_type, {}).values()
+            else:
+                entries = self._by_agent_complexity.get((agent_type, complexity), {}).values()
+        
+        return [_resolve(e) for e in entries]
+    
+    def as_dict(self) -> Dict[str, Scenario]:
+        """Map every scenario ID to its Scenario (loads all agents)"""
+        self.load_all()
+        return {scenario_id: _resolve(e) for scenario_id, e in self._by_id.items()}
+    
+    def count_scenarios(self) -> Dict[str, int]:
+        """Count loaded scenarios per agent"""
+        return {agent_type: len(scenarios) for agent_type, scenarios in self._by_agent.items()}
+    
+    def close(self):
+        """
+        Release the memory maps of compiled scenario files
+        
+        Scenarios already returned stay usable; the registry is emptied and
+        loads everything again on its next query.
+        """
+        for compiled in self._compiled:
+            compiled.close()
+        self._compiled = []
+        self._files_loaded = False
+        self._loaded_agents = set()
+        self._by_id = {}
+        self._sources = {}
+        self._by_agent = {}
+        self._by_complexity = {}
+        self._by_agent_complexity = {}
+    
+    def __enter__(self) -> "ScenarioRegistry":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def __contains__(self, scenario_id: str) -> bool:
+        return self.get(scenario_id) is not None
+    
+    def __len__(self) -> int:
+        return len(self._by_id)
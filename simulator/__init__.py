@@ -3,9 +3,26 @@ Customer simulator for LLM-to-LLM evaluation
 """
 
 from .customer_simulator import CustomerSimulator, CustomerPersona
+from .prompt_templates import CustomerPromptTemplate, PromptTemplateCache
+from .termination import (
+    TerminationDetector,
+    PhraseTerminationDetector,
+    NgramTerminationClassifier,
+    build_termination_examples,
+    evaluate_detector,
+    load_termination_detector,
+)
 
 __all__ = [
     'CustomerSimulator',
     'CustomerPersona',
+    'CustomerPromptTemplate',
+    'PromptTemplateCache',
+    'TerminationDetector',
+    'PhraseTerminationDetector',
+    'NgramTerminationClassifier',
+    'build_termination_examples',
+    'evaluate_detector',
+    'load_termination_detector',
 ]
 
@@ -5,6 +5,8 @@ Customer simulator for realistic LLM-to-LLM interactions
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 from models.base_model import BaseModel
+from .termination import TerminationDetector, load_termination_detector
+from .prompt_templates import PromptTemplateCache, CustomerPromptTemplate, format_context
 
 try:
     import weave
@@ -55,16 +57,26 @@ class CustomerSimulator:
     Simulates customer behavior in conversations
     """
     
-    def __init__(self, model: BaseModel, language: str = "arabic"):
+    def __init__(
+        self,
+        model: BaseModel,
+        language: str = "arabic",
+        termination_detector: Optional[TerminationDetector] = None
+    ):
         """
         Initialize customer simulator
         
         Args:
             model: LLM model to use for simulation
             language: Language for simulation
+            termination_detector: Decides when the customer has closed the
+                conversation (default: the TERMINATION_MODEL classifier if
+                set, else PhraseTerminationDetector)
         """
         self.model = model
         self.language = language
+        self.termination_detector = termination_detector or load_termination_detector()
+        self.prompt_cache = PromptTemplateCache()
         self.conversation_history: List[Dict[str, str]] = []
         
     @weave.op() if WEAVE_AVAILABLE else lambda f: f
@@ -121,21 +133,23 @@ class CustomerSimulator:
             })
             
             # Check if customer wants to end conversation
-            should_end = self._should_end_conversation(
-                result["response"], turn_number, max_turns
-            )
+            customer_closed = self.termination_detector.should_end(result["response"])
+            should_end = customer_closed or turn_number >= max_turns
             
             return {
                 "response": result["response"],
                 "should_end": should_end,
+                "customer_closed": customer_closed,  # Detector verdict, without the turn limit
                 "turn_number": turn_number,
                 "tokens_used": result["tokens_used"],
-                "error": result["error"]
+                "error": result["error"],
+                "served_by": result.get("served_by")
             }
         else:
             return {
                 "response": None,
                 "should_end": True,
+                "customer_closed": False,
                 "turn_number": turn_number,
                 "tokens_used": 0,
                 "error": result["error"]
@@ -189,6 +203,28 @@ class CustomerSimulator:
             # Fallback to context-based message
             return self._generate_fallback_message(goal, context)
     
+    def get_prompt_template(
+        self,
+        persona: CustomerPersona,
+        goal: str,
+        context: Dict[str, any]
+    ) -> CustomerPromptTemplate:
+        """
+        Get the precompiled prompt template for a persona/goal/context
+        
+        The template's static_prefix is identical across turns, so it can be
+        handed to providers that support prompt prefix caching.
+        
+        Args:
+            persona: Customer persona
+            goal: Customer's goal in the conversation
+            context: Additional context
+        
+        Returns:
+            CustomerPromptTemplate
+        """
+        return self.prompt_cache.get(persona, goal, context)
+    
     def _build_customer_prompt(
         self,
         persona: CustomerPersona,
@@ -198,86 +234,11 @@ class CustomerSimulator:
         max_turns: int
     ) -> str:
         """Build system prompt for customer simulator"""
-        
-        prompt = f"""{persona.to_prompt_description()}
-
-هدفك من المحادثة:
-{goal}
-
-معلومات إضافية لديك:
-{self._format_context(context)}
-
-أنت الآن في المحادثة (الدورة {turn_number} من {max_turns}):
-
-إرشادات للرد:
-1. رد بشكل طبيعي على ما قاله الموظف
-2. إذا طلب منك معلومات لديك، قدمها
-3. إذا لم يحل المشكلة، اسأل عن الخطوات التالية
-4. إذا كان الموظف غير واضح، اطلب توضيح
-5. إذا حُلّت المشكلة، اشكره وأنهِ المحادثة
-6. إذا لم يكن متعاوناً، عبّر عن إحباطك
-7. استخدم اللهجة المصرية بشكل طبيعي
-
-تذكر:
-- أنت عميل حقيقي، ليس متعاوناً بشكل مبالغ
-- أظهر مشاعرك الحقيقية
-- كن واقعياً في ردود فعلك
-- إذا وصلت لهدفك، أنهِ المحادثة بشكل طبيعي
-"""
-        
-        return prompt
+        return self.get_prompt_template(persona, goal, context).render(turn_number, max_turns)
     
     def _format_context(self, context: Dict[str, any]) -> str:
         """Format context dictionary as readable text"""
-        if not context:
-            return "لا توجد معلومات إضافية"
-        
-        formatted = []
-        for key, value in context.items():
-            formatted.append(f"- {key}: {value}")
-        return "\n".join(formatted)
-    
-    def _should_end_conversation(
-        self,
-        customer_response: str,
-        turn_number: int,
-        max_turns: int
-    ) -> bool:
-        """
-        Determine if customer wants to end conversation
-        
-        Args:
-            customer_response: Customer's latest response
-            turn_number: Current turn number
-            max_turns: Maximum turns allowed
-            
-        Returns:
-            True if conversation should end
-        """
-        # Check for thank you and goodbye phrases
-        end_phrases = [
-            "شكرا", "شكراً", "ربنا يباركلك", "تمام كده",
-            "خلاص", "ماشي", "مع السلامة", "الله يكرمك",
-            "تسلم", "يعطيك العافية", "ممتاز"
-        ]
-        
-        response_lower = customer_response.lower()
-        
-        # Check if response contains ending phrases
-        contains_thanks = any(phrase in response_lower for phrase in end_phrases)
-        
-        # Check if response is very short (likely ending)
-        is_short = len(customer_response.split()) < 10
-        
-        # End if max turns reached
-        if turn_number >= max_turns:
-            return True
-        
-        # End if customer seems satisfied
-        if contains_thanks and is_short:
-            return True
-        
-        return False
+        return format_context(context)
     
     def _generate_fallback_message(self, goal: str, context: Dict[str, any]) -> str:
         """Generate fallback message if LLM fails"""
@@ -0,0 +1,200 @@
+"""
+Precompiled customer prompt templates
+
+The customer system prompt only changes in its turn counter, so the static
+part (persona, goal, context and guidelines) is rendered once per
+(persona, goal, context) and the turn line is appended at the end. Keeping
+the turn line last also gives providers with prefix caching an identical
+prefix on every turn.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    from .customer_simulator import CustomerPersona
+
+
+TURN_LINE = "أنت الآن في المحادثة (الدورة {turn_number} من {max_turns})."
+
+
+def format_context(context: Dict[str, any]) -> str:
+    """Format context dictionary as readable text"""
+    if not context:
+        return "لا توجد معلومات إضافية"
+    
+    formatted = []
+    for key, value in context.items():
+        formatted.append(f"- {key}: {value}")
+    return "\n".join(formatted)
+
+
+@dataclass(frozen=True)
+class CustomerPromptTemplate:
+    """Customer system prompt split into a static prefix and a turn line"""
+    static_prefix: str
+    
+    def render(self, turn_number: int, max_turns: int) -> str:
+        """Render the full system prompt for a turn"""
+        return self.static_prefix + TURN_LINE.format(
+            turn_number=turn_number,
+            max_turns=max_turns
+        ) + "\n"
+
+
+def prompt_template_key(persona: "CustomerPersona", goal: str, context: Dict[str, any]) -> Tuple:
+    """Hashable copy of everything the static prompt prefix is rendered from"""
+    # Context values are rendered with str(), so that's what has to match
+    return tuple(vars(persona).items()), goal, tuple((key, str(value)) for key, value in context.items())
+
+
+def build_customer_prompt_template(
+    persona: "CustomerPersona",
+    goal: str,
+    context: Dict[str, any]
+) -> CustomerPromptTemplate:
+    """
+    Render the static part of the customer system prompt
+    
+    Args:
+        persona: Customer persona
+        goal: Customer's goal in the conversation
+        context: Additional context (order numbers, account info, etc.)
+    
+    Returns:
+        CustomerPromptTemplate
+    """
+    static_prefix = f"""{persona.to_prompt_description()}
+
+هدفك من المحادثة:
+{goal}
+
+معلومات إضافية لديك:
+{format_context(context)}
+
+إرشادات للرد:
+1. رد بشكل طبيعي على ما قاله الموظف
+2. إذا طلب منك معلومات لديك، قدمها
+3. إذا لم يحل المشكلة، اسأل عن الخطوات التالية
+4. إذا كان الموظف غير واضح، اطلب توضيح
+5. إذا حُلّت المشكلة، اشكره وأنهِ المحادثة
+6. إذا لم يكن متعاوناً، عبّر عن إحباطك
+7. استخدم اللهجة المصرية بشكل طبيعي
+
+تذكر:
+- أنت عميل حقيقي، ليس متعاوناً بشكل مبالغ
+- أظهر مشاعرك الحقيقية
+- كن واقعياً في ردود فعلك
+- إذا وصلت لهدفك، أنهِ المحادثة بشكل طبيعي
+
+"""
+    return CustomerPromptTemplate(static_prefix=static_prefix)
+
+
+class PromptTemplateCache:
+    """
+    LRU cache of customer prompt templates
+    
+    Keyed by the contents of the persona, goal and context, so a persona or
+    context edited in place never gets a stale template and an equal copy
+    shares the cached one.
+    """
+    
+    def __init__(self, max_size: int = 256):
+        """
+        Initialize cache
+        
+        Args:
+            max_size: Maximum number of templates kept
+        """
+        self.max_size = max_size
+        self._templates: "OrderedDict[Tuple, CustomerPromptTemplate]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(
+        self,
+        persona: "CustomerPersona",
+        goal: str,
+        context: Dict[str, any]
+    ) -> CustomerPromptTemplate:
+        """Get the template for a (persona, goal, context), building it once"""
+        key = prompt_template_key(persona, goal, context)
+        template = self._templates.get(key)
+        
+        if template is not None:
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return template
+        
+        self.misses += 1
+        template = build_customer_prompt_template(persona, goal, context)
+        self._templates[key] = template
+        if len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
+        return template
+    
+    def clear(self):
+        """Drop all cached templates"""
+        self._templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def benchmark_prompt_build(
+    persona: "CustomerPersona",
+    goal: str,
+    context: Dict[str, any],
+    max_turns: int = 10,
+    iterations: int = 1000
+) -> Dict[str, float]:
+    """
+    Measure customer prompt build time per turn, uncached vs cached
+    
+    Args:
+        persona: Customer persona
+        goal: Customer's goal
+        context: Additional context
+        max_turns: Turns per simulated conversation
+        iterations: Number of simulated conversations
+    
+    Returns:
+        Dictionary with microseconds per turn and speedup
+    """
+    turns = iterations * max_turns
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for turn in range(1, max_turns + 1):
+            build_customer_prompt_template(persona, goal, context).render(turn, max_turns)
+    uncached = (time.perf_counter() - start) / turns * 1e6
+    
+    cache = PromptTemplateCache()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for turn in range(1, max_turns + 1):
+            cache.get(persona, goal, context).render(turn, max_turns)
+    cached = (time.perf_counter() - start) / turns * 1e6
+    
+    return {
+        "uncached_us_per_turn": uncached,
+        "cached_us_per_turn": cached,
+        "speedup": uncached / cached if cached > 0 else 0.0
+    }
+
+
+if __name__ == "__main__":
+    from scenarios.agent_a_scenarios import get_agent_a_scenarios
+    
+    scenario = get_agent_a_scenarios()[0]
+    stats = benchmark_prompt_build(
+        scenario.customer_persona,
+        scenario.customer_goal,
+        scenario.initial_context,
+        max_turns=scenario.max_turns
+    )
+    print(f"Uncached: {stats['uncached_us_per_turn']:.1f} µs/turn")
+    print(f"Cached:   {stats['cached_us_per_turn']:.1f} µs/turn")
+    print(f"Speedup:  {stats['speedup']:.1f}x")
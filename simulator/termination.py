@@ -0,0 +1,534 @@
+"""
+End-of-conversation detection for the customer simulator
+
+Every extra turn costs an agent call and a customer call, so deciding
+correctly when the simulated customer has closed the conversation matters.
+Detectors work on Arabic-normalized text (see utils.arabic_text).
+"""
+
+import glob
+import json
+import math
+import os
+import random
+import re
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.arabic_text import normalize_arabic
+
+
+# Path of a trained NgramTerminationClassifier for the customer simulator
+TERMINATION_MODEL_ENV = "TERMINATION_MODEL"
+
+# Phrases that signal the customer is wrapping up (thanks / acceptance)
+DEFAULT_CLOSING_PHRASES = [
+    "شكرا", "متشكر", "متشكره", "متشكرين", "ربنا يباركلك", "ربنا يخليك",
+    "تمام كده", "كده تمام", "حلو كده", "خلاص كده", "الله يكرمك", "تسلم",
+    "تسلمي", "تسلم ايدك", "يعطيك العافيه", "جزاك الله خير", "كتر خيرك",
+    "مشكور", "بس كده", "كده كفايه", "thanks",
+]
+
+# Bare acknowledgements: customers also use these to go on ("تمام، رقم
+# الطلب ..."), so they only close a message that is nothing but
+# acknowledgements, or one that also thanks or says goodbye
+DEFAULT_ACKNOWLEDGEMENT_PHRASES = [
+    "تمام", "ماشي", "خلاص", "اوك", "ok", "okay", "ممتاز", "حلو",
+]
+
+# Punctuation and spacing left once the acknowledgements are removed
+_SEPARATORS_RE = re.compile(r"[\s.!,;:،؛…-]*")
+
+# Phrases that end the conversation on their own
+DEFAULT_FAREWELL_PHRASES = [
+    "مع السلامه", "في امان الله", "في رعايه الله", "سلام عليكم ورحمه الله",
+    "باي", "يوم سعيد", "bye",
+]
+
+# Markers that the customer still has something to say after thanking
+DEFAULT_CONTINUATION_MARKERS = [
+    "بس", "لكن", "بالنسبه", "كمان", "لسه", "عايز اسال", "عاوز اسال",
+    "عندي سؤال", "ممكن", "هل", "ازاي", "امتي", "ليه", "فين", "ايه", "طب",
+    "طيب و", "وايه", "ولا",
+]
+
+
+def _compile_phrases(phrases: Iterable[str]) -> "re.Pattern":
+    """Compile normalized phrases into one alternation (longest first)"""
+    normalized = sorted(
+        {normalize_arabic(p) for p in phrases if p.strip()},
+        key=len,
+        reverse=True
+    )
+    alternation = "|".join(re.escape(p) for p in normalized)
+    # Allow the common و/ف conjunction prefix ("وشكرا", "فتمام")
+    return re.compile(rf"(?<!\w)[وف]?(?:{alternation})(?!\w)")
+
+
+class TerminationDetector(ABC):
+    """Base class for end-of-conversation detectors"""
+    
+    threshold: float = 0.5
+    
+    @abstractmethod
+    def score(self, message: str) -> float:
+        """
+        Score how likely a customer message closes the conversation
+        
+        Args:
+            message: Customer message
+        
+        Returns:
+            Probability-like score between 0 and 1
+        """
+        pass
+    
+    def should_end(self, message: str) -> bool:
+        """Return True if the message should end the conversation"""
+        if not message:
+            return False
+        return self.score(message) >= self.threshold
+
+
+class PhraseTerminationDetector(TerminationDetector):
+    """
+    Rule-based detector using compiled phrase matching
+    
+    Looks at what follows the last closing phrase, so "شكراً بس..." keeps
+    the conversation going while long polite closings still end it. Bare
+    acknowledgements ("تمام", "اوك") only close a message on their own.
+    """
+    
+    def __init__(
+        self,
+        closing_phrases: Optional[List[str]] = None,
+        farewell_phrases: Optional[List[str]] = None,
+        continuation_markers: Optional[List[str]] = None,
+        acknowledgement_phrases: Optional[List[str]] = None,
+        max_tail_words: int = 8,
+        threshold: float = 0.5
+    ):
+        """
+        Initialize phrase detector
+        
+        Args:
+            closing_phrases: Thanks/acceptance phrases
+            farewell_phrases: Phrases that end the conversation on their own
+            continuation_markers: Words showing the customer isn't done yet
+            acknowledgement_phrases: Words that only close a message made of
+                nothing else (or one with thanks/farewell)
+            max_tail_words: Max words allowed after the last closing phrase
+            threshold: Score at or above which the conversation ends
+        """
+        self.closing_re = _compile_phrases(closing_phrases or DEFAULT_CLOSING_PHRASES)
+        self.farewell_re = _compile_phrases(farewell_phrases or DEFAULT_FAREWELL_PHRASES)
+        self.acknowledgement_re = _compile_phrases(acknowledgement_phrases or DEFAULT_ACKNOWLEDGEMENT_PHRASES)
+        self.continuation_re = _compile_phrases(continuation_markers or DEFAULT_CONTINUATION_MARKERS)
+        self.max_tail_words = max_tail_words
+        self.threshold = threshold
+    
+    def score(self, message: str) -> float:
+        """Score a customer message"""
+        text = normalize_arabic(message)
+        if not text:
+            return 0.0
+        
+        last_closing = None
+        for match in self.closing_re.finditer(text):
+            last_closing = match
+        last_farewell = None
+        for match in self.farewell_re.finditer(text):
+            last_farewell = match
+        
+        if last_closing is None and last_farewell is None:
+            # "تمام" / "اوك" alone close; "تمام، رقم الطلب 12345" goes on
+            remainder = self.acknowledgement_re.sub("", text)
+            if remainder != text and _SEPARATORS_RE.fullmatch(remainder):
+                return 0.9
+            return 0.0
+        
+        # Whatever comes after the last closing/farewell decides
+        # (an acknowledgement after thanks doesn't add anything)
+        end = max(m.end() for m in (last_closing, last_farewell) if m is not None)
+        tail = self.acknowledgement_re.sub(" ", text[end:])
+        
+        # A question, a request or details (order numbers, IDs) mean more to come
+        if "?" in tail or self.continuation_re.search(tail) or re.search(r"\d", tail):
+            return 0.1
+        
+        if last_farewell is not None:
+            return 1.0
+        
+        if len(tail.split()) > self.max_tail_words:
+            return 0.3
+        
+        return 0.9
+
+
+class NgramTerminationClassifier(TerminationDetector):
+    """
+    Character n-gram logistic regression trained on stored transcripts
+    
+    Pure Python with hashed features, so it needs no extra dependencies and
+    the saved model is stable across processes.
+    """
+    
+    def __init__(
+        self,
+        ngram_range: Tuple[int, int] = (2, 4),
+        num_features: int = 2 ** 18,
+        tail_chars: int = 40,
+        threshold: float = 0.5
+    ):
+        """
+        Initialize classifier
+        
+        Args:
+            ngram_range: Min and max character n-gram length
+            num_features: Size of the hashed feature space
+            tail_chars: Length of the message tail featurized separately
+            threshold: Probability at or above which the conversation ends
+        """
+        self.ngram_range = ngram_range
+        self.num_features = num_features
+        self.tail_chars = tail_chars
+        self.threshold = threshold
+        self.weights: Dict[int, float] = {}
+        self.bias = 0.0
+    
+    def _features(self, message: str) -> Dict[int, float]:
+        """Extract hashed, L2-normalized n-gram features"""
+        text = f" {normalize_arabic(message)} "
+        tail = text[-self.tail_chars:]
+        counts: Dict[int, float] = {}
+        
+        for prefix, segment in (("a", text), ("t", tail)):
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(segment) - n + 1):
+                    key = f"{prefix}:{segment[i:i + n]}".encode("utf-8")
+                    index = zlib.crc32(key) % self.num_features
+                    counts[index] = counts.get(index, 0.0) + 1.0
+        
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return {k: v / norm for k, v in counts.items()}
+    
+    def _predict(self, features: Dict[int, float]) -> float:
+        z = self.bias + sum(self.weights.get(k, 0.0) * v for k, v in features.items())
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+    
+    def fit(
+        self,
+        messages: Sequence[str],
+        labels: Sequence[bool],
+        epochs: int = 15,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 0
+    ) -> "NgramTerminationClassifier":
+        """
+        Train with class-balanced SGD
+        
+        Args:
+            messages: Customer messages
+            labels: True where the message closed the conversation
+            epochs: Passes over the data
+            learning_rate: SGD step size
+            l2: L2 regularization strength
+            seed: Shuffle seed
+        
+        Returns:
+            self
+        """
+        if len(messages) != len(labels):
+            raise ValueError("messages and labels must have the same length")
+        
+        data = [(self._features(m), 1.0 if y else 0.0) for m, y in zip(messages, labels)]
+        positives = sum(y for _, y in data)
+        negatives = len(data) - positives
+        if not positives or not negatives:
+            raise ValueError("Training data needs both ending and non-ending messages")
+        
+        # Weight classes so the rarer "ending" label isn't drowned out
+        class_weight = {
+            1.0: len(data) / (2 * positives),
+            0.0: len(data) / (2 * negatives)
+        }
+        
+        rng = random.Random(seed)
+        self.weights = {}
+        self.bias = 0.0
+        
+        for _ in range(epochs):
+            rng.shuffle(data)
+            for features, y in data:
+                error = (self._predict(features) - y) * class_weight[y]
+                for k, v in features.items():
+                    w = self.weights.get(k, 0.0)
+                    self.weights[k] = w - learning_rate * (error * v + l2 * w)
+                self.bias -= learning_rate * error
+        
+        return self
+    
+    def score(self, message: str) -> float:
+        """Probability that the message ends the conversation"""
+        return self._predict(self._features(message))
+    
+    def save(self, path: str):
+        """Save model weights to JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "ngram_range": list(self.ngram_range),
+                "num_features": self.num_features,
+                "tail_chars": self.tail_chars,
+                "threshold": self.threshold,
+                "bias": self.bias,
+                "weights": {str(k): w for k, w in self.weights.items() if abs(w) > 1e-6}
+            }, f)
+    
+    @classmethod
+    def load(cls, path: str) -> "NgramTerminationClassifier":
+        """Load a model saved with save()"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        model = cls(
+            ngram_range=tuple(data["ngram_range"]),
+            num_features=data["num_features"],
+            tail_chars=data["tail_chars"],
+            threshold=data["threshold"]
+        )
+        model.bias = data["bias"]
+        model.weights = {int(k): w for k, w in data["weights"].items()}
+        return model
+
+
+def judge_labels_from_evaluations(
+    evaluations: Iterable[Dict],
+    min_task_completion: float = 7.0
+) -> Dict[str, bool]:
+    """
+    Derive per-conversation "goal reached" labels from judge evaluations
+    
+    Args:
+        evaluations: Evaluation dictionaries (EvaluationResult.to_dict())
+        min_task_completion: Task completion score counted as resolved
+    
+    Returns:
+        Dictionary mapping conversation_id to resolved flag
+    """
+    return {
+        e["conversation_id"]: float(e.get("task_completion", 0)) >= min_task_completion
+        for e in evaluations
+        if e.get("conversation_id")
+    }
+
+
+def build_termination_examples(
+    conversations: Iterable[Dict],
+    judge_labels: Optional[Dict[str, bool]] = None
+) -> List[Tuple[str, bool]]:
+    """
+    Build labelled customer messages from stored transcripts
+    
+    Customer messages the conversation continued after are negatives. The
+    final customer message is labelled with the judge verdict when one is
+    available, otherwise with the detector's should_end verdict recorded by
+    the orchestrator (end_reason for transcripts stored before it was).
+    
+    Args:
+        conversations: Stored conversation dictionaries
+        judge_labels: Optional conversation_id -> resolved flag
+    
+    Returns:
+        List of (message, should_end) pairs
+    """
+    judge_labels = judge_labels or {}
+    examples = []
+    
+    for conv in conversations:
+        for turn in conv.get("turns", []):
+            message = turn.get("customer", turn.get("customer_message"))
+            if message:
+                examples.append((message, False))
+        
+        final_message = conv.get("final_customer_message")
+        if final_message:
+            label = judge_labels.get(conv.get("conversation_id"))
+            if label is None:
+                label = conv.get("customer_ended")
+            if label is None:
+                label = conv.get("end_reason") == "Customer ended conversation naturally"
+            examples.append((final_message, bool(label)))
+    
+    return examples
+
+
+def evaluate_detector(
+    detector: TerminationDetector,
+    examples: Iterable[Tuple[str, bool]]
+) -> Dict[str, float]:
+    """
+    Compute precision/recall of a detector against labelled messages
+    
+    Args:
+        detector: Detector to evaluate
+        examples: (message, should_end) pairs
+    
+    Returns:
+        Dictionary with confusion counts, precision, recall, f1 and accuracy
+    """
+    tp = fp = fn = tn = 0
+    for message, label in examples:
+        predicted = detector.should_end(message)
+        if predicted and label:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif label:
+            fn += 1
+        else:
+            tn += 1
+    
+    total = tp + fp + fn + tn
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    
+    return {
+        "true_positives": tp,
+        "false_positives": fp,
+        "false_negatives": fn,
+        "true_negatives": tn,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "accuracy": (tp + tn) / total if total else 0.0
+    }
+
+
+def load_termination_detector(model_path: Optional[str] = None) -> TerminationDetector:
+    """
+    Detector for the customer simulator: the trained classifier if configured
+    
+    Args:
+        model_path: Model saved by `python -m simulator.termination train`
+            (default: TERMINATION_MODEL env var; phrase rules when neither is set)
+    
+    Returns:
+        NgramTerminationClassifier or PhraseTerminationDetector
+    """
+    model_path = model_path or os.getenv(TERMINATION_MODEL_ENV)
+    if not model_path:
+        return PhraseTerminationDetector()
+    return NgramTerminationClassifier.load(model_path)
+
+
+def load_labelled_examples(results_dir: str, min_task_completion: float = 7.0) -> List[Tuple[str, bool]]:
+    """
+    Build labelled customer messages from a results directory
+    
+    Final messages are labelled with the judge verdicts in evaluations.json
+    and evaluation_results_*.json where available.
+    
+    Args:
+        results_dir: Results directory with stored transcripts
+        min_task_completion: Task completion score counted as resolved
+    
+    Returns:
+        List of (message, should_end) pairs
+    """
+    from evaluator.evaluation_index import conversation_files, iter_conversation_file
+    
+    evaluation_paths = [os.path.join(results_dir, "evaluations.json")]
+    evaluation_paths += sorted(glob.glob(os.path.join(results_dir, "evaluation_results_*.json")))
+    evaluations = [
+        record
+        for path in evaluation_paths if os.path.exists(path)
+        for record in iter_conversation_file(path)
+        if isinstance(record, dict)
+    ]
+    
+    def unique_conversations() -> Iterator[Dict]:
+        # The same conversation can be in conversations.json and a run file
+        seen = set()
+        for path in conversation_files(results_dir):
+            for conversation in iter_conversation_file(path):
+                conversation_id = conversation.get("conversation_id") if isinstance(conversation, dict) else None
+                if conversation_id in seen:
+                    continue
+                if conversation_id:
+                    seen.add(conversation_id)
+                yield conversation
+    
+    return build_termination_examples(
+        unique_conversations(),
+        judge_labels_from_evaluations(evaluations, min_task_completion)
+    )
+
+
+def _print_metrics(name: str, metrics: Dict[str, float]):
+    print(f"   {name:<12} precision {metrics['precision']:.3f}  recall {metrics['recall']:.3f}  "
+          f"f1 {metrics['f1']:.3f}  accuracy {metrics['accuracy']:.3f}  "
+          f"(tp {metrics['true_positives']}, fp {metrics['false_positives']}, "
+          f"fn {metrics['false_negatives']}, tn {metrics['true_negatives']})")
+
+
+def main():
+    """Train the n-gram classifier or report detector precision/recall"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="End-of-conversation detector tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    train_parser = subparsers.add_parser("train", help="Train the n-gram classifier on stored transcripts")
+    train_parser.add_argument("results_dir")
+    train_parser.add_argument("--output", help="Model file (default: <results_dir>/termination_model.json)")
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Share of messages held out for the report")
+    train_parser.add_argument("--seed", type=int, default=0)
+    
+    eval_parser = subparsers.add_parser("eval", help="Precision/recall of the detectors against stored labels")
+    eval_parser.add_argument("results_dir")
+    eval_parser.add_argument("--model", help="Trained classifier to compare (default: TERMINATION_MODEL env var)")
+    
+    for subparser in (train_parser, eval_parser):
+        subparser.add_argument(
+            "--min-task-completion",
+            type=float,
+            default=7.0,
+            help="Judge task_completion counted as a resolved conversation (default: 7)"
+        )
+    
+    args = parser.parse_args()
+    examples = load_labelled_examples(args.results_dir, args.min_task_completion)
+    positives = sum(1 for _, label in examples if label)
+    print(f"📚 {len(examples)} labelled customer messages ({positives} closings)")
+    
+    if args.command == "train":
+        rng = random.Random(args.seed)
+        rng.shuffle(examples)
+        split = int(len(examples) * (1 - args.holdout))
+        train, held_out = examples[:split], examples[split:] or examples[:split]
+        
+        classifier = NgramTerminationClassifier().fit(
+            [message for message, _ in train],
+            [label for _, label in train],
+            seed=args.seed
+        )
+        output = args.output or os.path.join(args.results_dir, "termination_model.json")
+        classifier.save(output)
+        print(f"✅ Saved classifier to {output} (set {TERMINATION_MODEL_ENV}={output} to use it)")
+        
+        print(f"\n📊 Held-out messages: {len(held_out)}")
+        _print_metrics("phrases", evaluate_detector(PhraseTerminationDetector(), held_out))
+        _print_metrics("classifier", evaluate_detector(classifier, held_out))
+    else:
+        print(f"\n📊 All messages: {len(examples)}")
+        _print_metrics("phrases", evaluate_detector(PhraseTerminationDetector(), examples))
+        model_path = args.model or os.getenv(TERMINATION_MODEL_ENV)
+        if model_path:
+            _print_metrics("classifier", evaluate_detector(NgramTerminationClassifier.load(model_path), examples))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,24 @@ Storage module for saving evaluation results
 """
 
 from .results_storage import ResultsStorage, JSONStorage, CSVStorage, SupabaseStorage
+from .parquet_store import ParquetStorage, ParquetDatasetWriter, ParquetResultsReader
+from .multi_sink import MultiSinkStorage
+from .compressed_store import CompressedJSONStorage, CompressedRecordReader, CompressedRecordWriter
+from .offset_index import OffsetIndex, IndexedResultsReader
 
 __all__ = [
     'ResultsStorage',
     'JSONStorage',
     'CSVStorage',
     'SupabaseStorage',
+    'ParquetStorage',
+    'ParquetDatasetWriter',
+    'ParquetResultsReader',
+    'MultiSinkStorage',
+    'CompressedJSONStorage',
+    'CompressedRecordReader',
+    'CompressedRecordWriter',
+    'OffsetIndex',
+    'IndexedResultsReader',
 ]
 
@@ -0,0 +1,178 @@
+"""
+Dedup compaction for result files
+
+Removes duplicate conversations and evaluations left in a results directory
+by retried or overlapping writes from before conversation IDs were
+deterministic. Legacy IDs only had one-second resolution, so two different
+conversations can share an ID: conversations count as duplicates only when
+their transcripts match too, and CSV conversation and turn rows only when
+the whole row is identical. The last copy of each record wins. Files are
+rewritten atomically and their offset indexes rebuilt; don't run it while
+a pipeline is writing to the same directory.
+"""
+
+import csv
+import json
+import os
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .results_storage import iter_json_records
+from .offset_index import OffsetIndex
+from utils.conversation_ids import transcript_hash
+
+KeyFunction = Callable[[Dict], Hashable]
+
+
+def conversation_key(by_content: bool = False) -> KeyFunction:
+    """
+    Identity of a conversation record
+    
+    The transcript is always part of the key: legacy timestamp IDs collide
+    for different conversations saved in the same second.
+    
+    Args:
+        by_content: Treat records with the same scenario, model and transcript
+            as duplicates even when their IDs differ (legacy timestamp IDs)
+    """
+    def key(record: Dict) -> Hashable:
+        transcript = transcript_hash(record.get("turns", []))
+        if by_content or not record.get("conversation_id"):
+            return (record.get("scenario_id"), record.get("model_name"), transcript)
+        return (record["conversation_id"], transcript)
+    return key
+
+
+def _evaluation_key(record: Dict) -> Hashable:
+    # Evaluations without a conversation_id can't be matched; keep them all
+    return record.get("conversation_id") or ("unmatched", id(record))
+
+
+def dedup_records(records: Iterable[Dict], key: KeyFunction) -> Tuple[List[Dict], int]:
+    """
+    Keep the last record per key, in the order the kept copies were written
+    
+    Returns:
+        (kept records, number of records seen)
+    """
+    latest: Dict[Hashable, Dict] = {}
+    seen = 0
+    for record in records:
+        seen += 1
+        k = key(record)
+        latest.pop(k, None)
+        latest[k] = record
+    return list(latest.values()), seen
+
+
+def _replace(path: str, write: Callable[[str], None]):
+    tmp_path = path + ".compact.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+    if os.path.exists(path + ".idx"):
+        OffsetIndex(path).rebuild()
+
+
+def compact_json(path: str, key: KeyFunction, dry_run: bool = False) -> Tuple[int, int]:
+    """Dedup a JSON array file; returns (records before, records after)"""
+    kept, seen = dedup_records(iter_json_records(path), key)
+    if not dry_run and len(kept) < seen:
+        def write(tmp_path: str):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(kept, f, ensure_ascii=False, indent=2)
+        _replace(path, write)
+    return seen, len(kept)
+
+
+def compact_compressed(path: str, key: KeyFunction, dry_run: bool = False) -> Tuple[int, int]:
+    """Dedup a conversations.zst record file; returns (records before, records after)"""
+    from .compressed_store import CompressedRecordReader, CompressedRecordWriter, latest_dictionary, dictionary_dir
+    
+    kept, seen = dedup_records(CompressedRecordReader(path), key)
+    if not dry_run and len(kept) < seen:
+        def write(tmp_path: str):
+            dictionary = latest_dictionary(dictionary_dir(os.path.dirname(path)))
+            with CompressedRecordWriter(tmp_path, dictionary) as writer:
+                for record in kept:
+                    writer.append(record)
+        _replace(path, write)
+    return seen, len(kept)
+
+
+def compact_csv(path: str, key_columns: Optional[List[str]] = None, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Dedup a CSV file; returns (rows before, rows after)
+    
+    Args:
+        path: CSV file
+        key_columns: Columns identifying a row (default: all columns, so only
+            identical rows are merged)
+        dry_run: Only count duplicates
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or []
+        columns = key_columns or fieldnames
+        kept, seen = dedup_records(reader, lambda row: tuple(row.get(column) for column in columns))
+    if not dry_run and len(kept) < seen:
+        def write(tmp_path: str):
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(kept)
+        _replace(path, write)
+    return seen, len(kept)
+
+
+def compact_results_dir(results_dir: str, by_content: bool = False, dry_run: bool = False) -> Dict[str, Tuple[int, int]]:
+    """
+    Dedup every conversation and evaluation file in a results directory
+    
+    Args:
+        results_dir: Results directory
+        by_content: Also merge conversations with identical transcripts but
+            different IDs (JSON and zstd files, which hold the transcripts)
+        dry_run: Only count duplicates
+    
+    Returns:
+        (records before, records after) per file
+    """
+    key = conversation_key(by_content)
+    jobs = [
+        ("conversations.json", lambda path: compact_json(path, key, dry_run)),
+        ("conversations.zst", lambda path: compact_compressed(path, key, dry_run)),
+        ("evaluations.json", lambda path: compact_json(path, _evaluation_key, dry_run)),
+        # CSV rows carry no transcript hash to tell colliding IDs apart
+        ("conversations.csv", lambda path: compact_csv(path, dry_run=dry_run)),
+        ("conversation_turns.csv", lambda path: compact_csv(path, dry_run=dry_run)),
+        ("evaluations.csv", lambda path: compact_csv(path, ["conversation_id"], dry_run)),
+    ]
+    
+    report = {}
+    for name, compact in jobs:
+        path = os.path.join(results_dir, name)
+        if os.path.exists(path):
+            report[name] = compact(path)
+    return report
+
+
+def main():
+    """Remove duplicate records from a results directory"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Dedup compaction for result files")
+    parser.add_argument("results_dir", help="Results directory")
+    parser.add_argument("--by-content", action="store_true",
+                        help="Also merge conversations with identical transcripts but different IDs")
+    parser.add_argument("--dry-run", action="store_true", help="Only report duplicates")
+    args = parser.parse_args()
+    
+    report = compact_results_dir(args.results_dir, by_content=args.by_content, dry_run=args.dry_run)
+    if not report:
+        print(f"⚠️  No result files in {args.results_dir}")
+    for name, (before, after) in report.items():
+        action = "would remove" if args.dry_run else "removed"
+        print(f"🧹 {name}: {before} records, {action} {before - after} duplicates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Compressed transcript storage
+
+Stores each conversation as its own zstd frame in conversations.zst,
+compressed with a dictionary trained on our Arabic transcripts so that the
+greetings and system-prompt phrasing repeated across conversations cost
+almost nothing. Records are length-framed, so any record can be read on its
+own. Frames carry the ID of the dictionary they were compressed with, so
+retraining the dictionary never makes older records unreadable.
+"""
+
+import glob
+import json
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .results_storage import JSONStorage, Filters, normalize_filters, matches_filters, project_record
+from .offset_index import OffsetIndex, locked
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+MAGIC = b"ZTR1"
+# Each record: 4-byte little-endian frame length, then the zstd frame
+RECORD_HEADER = struct.Struct("<I")
+DEFAULT_LEVEL = 10
+DEFAULT_DICT_SIZE = 112 * 1024
+# Transcripts sampled when training a dictionary
+MAX_TRAINING_SAMPLES = 5000
+MIN_TRAINING_SAMPLES = 20
+
+
+def _require_zstd():
+    if not ZSTD_AVAILABLE:
+        raise ImportError("يرجى تثبيت zstandard: pip install zstandard")
+
+
+def encode_record(record: Dict) -> bytes:
+    """Compact UTF-8 JSON for a record (Arabic kept as-is)"""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def dictionary_dir(results_dir: str) -> str:
+    return os.path.join(results_dir, "dictionaries")
+
+
+def train_dictionary(records: Iterable[Dict], dict_size: int = DEFAULT_DICT_SIZE) -> "zstd.ZstdCompressionDict":
+    """
+    Train a zstd dictionary on conversation records
+    
+    Args:
+        records: Conversations (the first MAX_TRAINING_SAMPLES are used)
+        dict_size: Dictionary size in bytes
+    
+    Returns:
+        Trained dictionary
+    """
+    _require_zstd()
+    samples = []
+    for record in records:
+        samples.append(encode_record(record))
+        if len(samples) >= MAX_TRAINING_SAMPLES:
+            break
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        raise ValueError(f"Need at least {MIN_TRAINING_SAMPLES} conversations to train a dictionary, got {len(samples)}")
+    return zstd.train_dictionary(dict_size, samples)
+
+
+def save_dictionary(dictionary: "zstd.ZstdCompressionDict", directory: str) -> str:
+    """Save a dictionary as <directory>/transcripts_<dict_id>.dict"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"transcripts_{dictionary.dict_id()}.dict")
+    with open(path, 'wb') as f:
+        f.write(dictionary.as_bytes())
+    return path
+
+
+def load_dictionaries(directory: str) -> Dict[int, "zstd.ZstdCompressionDict"]:
+    """Load every saved dictionary, keyed by dictionary ID"""
+    _require_zstd()
+    dictionaries = {}
+    for path in glob.glob(os.path.join(directory, "transcripts_*.dict")):
+        with open(path, 'rb') as f:
+            dictionary = zstd.ZstdCompressionDict(f.read())
+        dictionaries[dictionary.dict_id()] = dictionary
+    return dictionaries
+
+
+def latest_dictionary(directory: str) -> Optional["zstd.ZstdCompressionDict"]:
+    """Most recently trained dictionary, or None"""
+    paths = glob.glob(os.path.join(directory, "transcripts_*.dict"))
+    if not paths:
+        return None
+    _require_zstd()
+    with open(max(paths, key=os.path.getmtime), 'rb') as f:
+        return zstd.ZstdCompressionDict(f.read())
+
+
+class CompressedRecordWriter:
+    """Appends length-framed zstd records to a file"""
+    
+    def __init__(self, path: str, dictionary: Optional["zstd.ZstdCompressionDict"] = None, level: int = DEFAULT_LEVEL):
+        """
+        Initialize writer
+        
+        Args:
+            path: Record file (created with a header if missing)
+            dictionary: Trained dictionary (None compresses without one)
+            level: zstd compression level
+        """
+        _require_zstd()
+        self.path = path
+        self._compressor = zstd.ZstdCompressor(level=level, dict_data=dictionary, write_content_size=True)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with locked(path):
+            self._file = open(path, 'ab')
+            self._file.seek(0, os.SEEK_END)
+            if self._file.tell() == 0:
+                self._file.write(MAGIC)
+                self._file.flush()
+    
+    def append(self, record: Dict, index: Optional[OffsetIndex] = None) -> Tuple[int, int]:
+        """
+        Compress and append a record
+        
+        Other writers (threads or processes) may have appended since the
+        last call, so the offset is taken at the real end of the file and
+        the record is flushed before the lock is released.
+        
+        Args:
+            record: Record to append
+            index: Offset index to add the record to under the same lock
+        
+        Returns:
+            (offset, length) of the framed record in the file
+        """
+        frame = self._compressor.compress(encode_record(record))
+        length = RECORD_HEADER.size + len(frame)
+        with self._lock, locked(self.path):
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(RECORD_HEADER.pack(len(frame)) + frame)
+            self._file.flush()
+            if index is not None:
+                index.append(record, offset, length)
+        return offset, length
+    
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+    
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+    
+    def __enter__(self) -> "CompressedRecordWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CompressedRecordReader:
+    """Reads records written by CompressedRecordWriter"""
+    
+    def __init__(self, path: str, dictionaries: Optional[Dict[int, "zstd.ZstdCompressionDict"]] = None):
+        """
+        Initialize reader
+        
+        Args:
+            path: Record file
+            dictionaries: Dictionaries by ID (default: <dir>/dictionaries)
+        """
+        _require_zstd()
+        self.path = path
+        if dictionaries is None:
+            dictionaries = load_dictionaries(dictionary_dir(os.path.dirname(path)))
+        self.dictionaries = dictionaries
+        self._decompressors: Dict[int, "zstd.ZstdDecompressor"] = {}
+    
+    def _decompressor(self, frame: bytes) -> "zstd.ZstdDecompressor":
+        dict_id = zstd.get_frame_parameters(frame).dict_id
+        if dict_id not in self._decompressors:
+            if dict_id and dict_id not in self.dictionaries:
+                raise ValueError(f"Missing zstd dictionary {dict_id} for {self.path}")
+            self._decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=self.dictionaries.get(dict_id))
+        return self._decompressors[dict_id]
+    
+    def decode_frame(self, frame: bytes) -> Dict:
+        """Decompress one zstd frame into its record"""
+        return json.loads(self._decompressor(frame).decompress(frame))
+    
+    def iter_with_offsets(self) -> Iterator[Tuple[int, int, Dict]]:
+        """Yield (offset, length, record) for every record in file order"""
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a compressed transcript file: {self.path}")
+            while True:
+                offset = f.tell()
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                (size,) = RECORD_HEADER.unpack(header)
+                frame = f.read(size)
+                if len(frame) < size:
+                    # Torn final write
+                    print(f"⚠️  Truncated record at offset {offset} in {self.path}")
+                    return
+                yield offset, RECORD_HEADER.size + size, self.decode_frame(frame)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for _, _, record in self.iter_with_offsets():
+            yield record
+    
+    def read_at(self, offset: int) -> Dict:
+        """Read the record framed at a byte offset"""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            (size,) = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            return self.decode_frame(f.read(size))
+
+
+def read_compressed_file(path: str) -> List[Dict]:
+    """Load every record of a .zst transcript file"""
+    return list(CompressedRecordReader(path))
+
+
+class CompressedJSONStorage(JSONStorage):
+    """JSON storage with conversations compressed into conversations.zst"""
+    
+    conversations_format = "zstd"
+    
+    def __init__(self, output_dir: str = "results", level: int = DEFAULT_LEVEL):
+        """
+        Initialize compressed storage
+        
+        Conversations are compressed with the latest dictionary in
+        <output_dir>/dictionaries (train one with `python -m storage.compressed_store train`);
+        evaluations stay in evaluations.json.
+        
+        Args:
+            output_dir: Results directory
+            level: zstd compression level
+        """
+        _require_zstd()
+        super().__init__(output_dir)
+        self.compressed_file = os.path.join(output_dir, "conversations.zst")
+        self.dictionary = latest_dictionary(dictionary_dir(output_dir))
+        if self.dictionary is None:
+            print("⚠️  لا يوجد قاموس zstd، سيتم الضغط بدون قاموس")
+        self.writer = CompressedRecordWriter(self.compressed_file, self.dictionary, level)
+        
+        self.index = OffsetIndex(self.compressed_file)
+        if self.index.is_stale():
+            self.index.rebuild()
+    
+    def _append_conversation(self, record: Dict):
+        self.writer.append(record, self.index)
+    
+    def _reader(self) -> CompressedRecordReader:
+        dictionaries = load_dictionaries(dictionary_dir(self.output_dir))
+        return CompressedRecordReader(self.compressed_file, dictionaries)
+    
+    def get_all_conversations(self) -> List[Dict]:
+        try:
+            return list(self._reader())
+        except Exception as e:
+            print(f"❌ خطأ في قراءة المحادثات: {e}")
+            return []
+    
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """Stream conversations, decompressing one record at a time"""
+        conditions = normalize_filters(filters)
+        for record in self._reader():
+            if matches_filters(record, conditions):
+                yield project_record(record, columns)
+    
+    def close(self):
+        self.writer.close()
+
+
+def compression_report(
+    records: List[Dict],
+    dictionary: Optional["zstd.ZstdCompressionDict"] = None,
+    level: int = DEFAULT_LEVEL
+) -> Dict[str, Dict]:
+    """
+    Compare pretty-printed JSON with zstd framing, with and without a dictionary
+    
+    Throughput is MB of pretty-printed JSON per second, in memory (disk I/O
+    shrinks with the output, so this understates the gain on disk).
+    
+    Args:
+        records: Conversations to measure (use ones the dictionary was not trained on)
+        dictionary: Trained dictionary (its row is skipped when None)
+        level: zstd compression level
+    
+    Returns:
+        Bytes, compression ratio and read/write MB/s per format
+    """
+    _require_zstd()
+    plain = [json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8") for record in records]
+    plain_bytes = sum(len(data) for data in plain)
+    megabytes = plain_bytes / 1e6
+    
+    def rate(seconds: float) -> float:
+        return megabytes / seconds if seconds > 0 else float("inf")
+    
+    start = time.perf_counter()
+    for record in records:
+        json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8")
+    write_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for data in plain:
+        json.loads(data)
+    read_seconds = time.perf_counter() - start
+    report = {
+        "json": {"bytes": plain_bytes, "ratio": 1.0, "write_mb_s": rate(write_seconds), "read_mb_s": rate(read_seconds)},
+    }
+    
+    variants = [("zstd", None)]
+    if dictionary is not None:
+        variants.append(("zstd_dict", dictionary))
+    for name, dict_data in variants:
+        compressor = zstd.ZstdCompressor(level=level, dict_data=dict_data, write_content_size=True)
+        decompressor = zstd.ZstdDecompressor(dict_data=dict_data)
+        
+        start = time.perf_counter()
+        frames = [compressor.compress(encode_record(record)) for record in records]
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for frame in frames:
+            json.loads(decompressor.decompress(frame))
+        read_seconds = time.perf_counter() - start
+        
+        size = sum(RECORD_HEADER.size + len(frame) for frame in frames)
+        report[name] = {
+            "bytes": size,
+            "ratio": plain_bytes / size if size else 0.0,
+            "write_mb_s": rate(write_seconds),
+            "read_mb_s": rate(read_seconds),
+        }
+    return report
+
+
+def main():
+    """Train a transcript dictionary, convert conversations.json, or report compression"""
+    import argparse
+    from evaluator.evaluation_index import conversation_files, load_conversation_file
+    
+    parser = argparse.ArgumentParser(description="Compressed transcript tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    train_parser = subparsers.add_parser("train", help="Train a dictionary on a results directory")
+    train_parser.add_argument("results_dir")
+    train_parser.add_argument("--dict-size", type=int, default=DEFAULT_DICT_SIZE, help="Dictionary size in bytes")
+    
+    convert_parser = subparsers.add_parser("convert", help="Compress the JSON conversations into conversations.zst")
+    convert_parser.add_argument("results_dir")
+    convert_parser.add_argument("--level", type=int, default=DEFAULT_LEVEL)
+    
+    report_parser = subparsers.add_parser("report", help="Compare compression ratio and throughput with plain JSON")
+    report_parser.add_argument("results_dir")
+    report_parser.add_argument("--level", type=int, default=DEFAULT_LEVEL)
+    report_parser.add_argument("--holdout", type=float, default=0.2,
+                               help="Fraction of conversations kept out of dictionary training")
+    
+    args = parser.parse_args()
+    
+    json_files = [path for path in conversation_files(args.results_dir) if path.endswith(".json")]
+    conversations = [c for path in json_files for c in load_conversation_file(path)]
+    directory = dictionary_dir(args.results_dir)
+    
+    if args.command == "train":
+        path = save_dictionary(train_dictionary(conversations, args.dict_size), directory)
+        print(f"✅ Trained dictionary on {min(len(conversations), MAX_TRAINING_SAMPLES)} conversations: {path}")
+    elif args.command == "convert":
+        output = os.path.join(args.results_dir, "conversations.zst")
+        index = OffsetIndex(output)
+        if os.path.exists(output) and index.is_stale():
+            index.rebuild()
+        converted = skipped = 0
+        with CompressedRecordWriter(output, latest_dictionary(directory), args.level) as writer:
+            for conversation in conversations:
+                # Conversations converted by an earlier run (or kept in two
+                # JSON files) are already in the .zst file
+                conversation_id = conversation.get("conversation_id")
+                if conversation_id and conversation_id in index.offsets:
+                    skipped += 1
+                    continue
+                writer.append(conversation, index)
+                converted += 1
+        print(f"✅ Compressed {converted} conversations into {output} ({skipped} already there)")
+    else:
+        split = int(len(conversations) * (1 - args.holdout))
+        training, holdout = conversations[:split], conversations[split:]
+        dictionary = train_dictionary(training) if len(training) >= MIN_TRAINING_SAMPLES else None
+        report = compression_report(holdout or conversations, dictionary, args.level)
+        print(f"🗜️  {len(holdout or conversations)} held-out conversations, level {args.level}")
+        for name, row in report.items():
+            print(f"   {name:10s} {row['bytes'] / 1e6:8.2f} MB  x{row['ratio']:.1f}  "
+                  f"write {row['write_mb_s']:.1f} MB/s  read {row['read_mb_s']:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
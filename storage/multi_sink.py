@@ -0,0 +1,275 @@
+"""
+Concurrent multi-sink storage router
+
+Fans every write out to several storage backends at once. Each sink has its
+own bounded queue and worker thread, so a slow Supabase round-trip no longer
+holds up the conversation loop or the other sinks. Writes a sink fails are
+appended to a local spool file and replayed when the sink is idle again;
+while a sink has spooled writes, newer writes queue behind them, so an
+older evaluation can never overwrite a newer one through an upsert.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from .results_storage import ResultsStorage, Filters
+
+# Write latencies kept per sink for the percentile report
+LATENCY_WINDOW = 1000
+
+_SAVE_METHODS = {
+    "conversation": "save_conversation",
+    "evaluation": "save_evaluation",
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class SinkStats:
+    """Write counters and latencies of one sink"""
+    
+    def __init__(self):
+        self.writes = 0
+        self.failures = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+    
+    def to_dict(self) -> Dict[str, any]:
+        latencies = list(self.latencies)
+        return {
+            "writes": self.writes,
+            "failures": self.failures,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "mean_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_latency": _percentile(latencies, 0.5),
+            "p95_latency": _percentile(latencies, 0.95),
+            "max_latency": max(latencies) if latencies else 0.0,
+        }
+
+
+class _Sink:
+    """One backend with its queue, worker thread and spool file"""
+    
+    def __init__(self, name: str, storage: ResultsStorage, max_pending: int, spool_dir: str, retry_interval: float):
+        self.name = name
+        self.storage = storage
+        self.queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self.spool_path = os.path.join(spool_dir, f"{name}.jsonl")
+        self.retry_interval = retry_interval
+        self.stats = SinkStats()
+        self._spool_lock = threading.Lock()
+        self._last_replay = 0.0
+        self.thread = threading.Thread(target=self._work, name=f"storage-sink-{name}", daemon=True)
+        self.thread.start()
+    
+    def _write(self, kind: str, record: Dict) -> bool:
+        start = time.perf_counter()
+        try:
+            # Sinks get their own copy since some of them add fields
+            ok = getattr(self.storage, _SAVE_METHODS[kind])(dict(record))
+        except Exception as e:
+            print(f"❌ خطأ في الكتابة إلى {self.name}: {e}")
+            ok = False
+        self.stats.latencies.append(time.perf_counter() - start)
+        if ok:
+            self.stats.writes += 1
+        else:
+            self.stats.failures += 1
+        return bool(ok)
+    
+    def spool(self, kind: str, record: Dict, queued_at: Optional[int] = None):
+        """Append a write to the spool file for a later retry"""
+        entry = {"kind": kind, "record": record, "queued_at": queued_at or time.time_ns()}
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+            self.stats.spooled += 1
+    
+    def has_spool(self) -> bool:
+        """Whether writes are waiting in the spool file"""
+        with self._spool_lock:
+            return os.path.exists(self.spool_path)
+    
+    def _take_spool(self) -> List[Dict]:
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return []
+            with open(self.spool_path, 'r', encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spool_path)
+            return entries
+    
+    def _restore_spool(self, entries: List[Dict]):
+        # Ahead of anything spooled by callers in the meantime, to keep the write order
+        with self._spool_lock:
+            lines = [json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries]
+            if os.path.exists(self.spool_path):
+                with open(self.spool_path, 'r', encoding='utf-8') as f:
+                    lines.extend(f.readlines())
+            with open(self.spool_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+    
+    def replay_spool(self):
+        """Retry spooled writes in order, stopping at the first one that still fails"""
+        self._last_replay = time.time()
+        entries = self._take_spool()
+        if not entries:
+            return
+        # Writes spooled under backpressure can land in the file ahead of older
+        # queued ones; dispatch order is restored from their queue timestamps
+        entries.sort(key=lambda entry: entry.get("queued_at", 0))
+        
+        print(f"♻️  إعادة محاولة {len(entries)} عملية كتابة مؤجلة إلى {self.name}")
+        for i, entry in enumerate(entries):
+            if not self._write(entry["kind"], entry["record"]):
+                # Still failing: put this and the remaining entries back
+                self._restore_spool(entries[i:])
+                return
+            self.stats.replayed += 1
+    
+    def _work(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.retry_interval)
+            except queue.Empty:
+                self.replay_spool()
+                continue
+            
+            try:
+                if item is None:
+                    return
+                kind, record, queued_at = item
+                if self.has_spool() and time.time() - self._last_replay >= self.retry_interval:
+                    # Catch up on earlier failures before anything newer is written
+                    self.replay_spool()
+                if self.has_spool():
+                    # Older writes are still pending: queue behind them to keep the order
+                    self.spool(kind, record, queued_at)
+                elif not self._write(kind, record):
+                    # The retry interval counts from this failure
+                    self._last_replay = time.time()
+                    self.spool(kind, record, queued_at)
+            finally:
+                self.queue.task_done()
+
+
+class MultiSinkStorage(ResultsStorage):
+    """Writes to several storage backends concurrently"""
+    
+    def __init__(
+        self,
+        sinks: Dict[str, ResultsStorage],
+        read_from: Optional[str] = None,
+        max_pending: int = 1000,
+        backpressure_timeout: float = 5.0,
+        spool_dir: str = os.path.join("results", "spool"),
+        retry_interval: float = 30.0
+    ):
+        """
+        Initialize the router and start one writer thread per sink
+        
+        Args:
+            sinks: Backends by name (names are also the spool file names)
+            read_from: Sink that serves reads (default: the first sink)
+            max_pending: Queued writes per sink before callers wait
+            backpressure_timeout: Seconds a caller waits on a full queue before
+                the write is spooled instead
+            spool_dir: Directory for the per-sink spool files
+            retry_interval: Seconds between retries of spooled writes
+        """
+        if not sinks:
+            raise ValueError("MultiSinkStorage needs at least one sink")
+        if read_from is not None and read_from not in sinks:
+            raise ValueError(f"Unknown read sink: {read_from}. Use one of {list(sinks)}")
+        
+        self.read_from = read_from or next(iter(sinks))
+        self.backpressure_timeout = backpressure_timeout
+        self._sinks = {
+            name: _Sink(name, storage, max_pending, spool_dir, retry_interval)
+            for name, storage in sinks.items()
+        }
+        self._closed = False
+        atexit.register(self.close)
+    
+    @property
+    def sinks(self) -> Dict[str, ResultsStorage]:
+        return {name: sink.storage for name, sink in self._sinks.items()}
+    
+    def _dispatch(self, kind: str, record: Dict) -> bool:
+        if self._closed:
+            print(f"❌ تم إغلاق التخزين، لم يتم حفظ {kind}")
+            return False
+        queued_at = time.time_ns()
+        for sink in self._sinks.values():
+            try:
+                sink.queue.put((kind, record, queued_at), timeout=self.backpressure_timeout)
+            except queue.Full:
+                print(f"⚠️  قائمة الانتظار ممتلئة لـ {sink.name}، تم تأجيل الكتابة")
+                sink.spool(kind, record, queued_at)
+        return True
+    
+    def save_conversation(self, conversation_data: Dict) -> bool:
+        """Queue a conversation for every sink (True once accepted)"""
+        return self._dispatch("conversation", conversation_data)
+    
+    def save_evaluation(self, evaluation_data: Dict) -> bool:
+        """Queue an evaluation for every sink (True once accepted)"""
+        return self._dispatch("evaluation", evaluation_data)
+    
+    def get_all_conversations(self) -> List[Dict]:
+        return self._sinks[self.read_from].storage.get_all_conversations()
+    
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        return self._sinks[self.read_from].storage.iter_conversations(filters, columns, batch_size)
+    
+    @property
+    def pending(self) -> Dict[str, int]:
+        """Queued writes per sink"""
+        return {name: sink.queue.qsize() for name, sink in self._sinks.items()}
+    
+    def flush(self):
+        """Wait until every queued write has been attempted"""
+        for sink in self._sinks.values():
+            sink.queue.join()
+    
+    def close(self):
+        """Drain the queues and stop the writer threads (spooled writes are kept for the next run)"""
+        if self._closed:
+            return
+        self._closed = True
+        for sink in self._sinks.values():
+            sink.queue.put(None)
+        for sink in self._sinks.values():
+            sink.thread.join()
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Per-sink write counters and latency percentiles"""
+        return {name: sink.stats.to_dict() for name, sink in self._sinks.items()}
+    
+    def print_stats(self):
+        """Print per-sink write latency and failures"""
+        for name, stats in self.stats().items():
+            print(f"📦 {name}: {stats['writes']} writes, {stats['failures']} failed, "
+                  f"{stats['spooled']} spooled, {stats['replayed']} replayed | "
+                  f"latency p50 {stats['p50_latency'] * 1000:.0f}ms, "
+                  f"p95 {stats['p95_latency'] * 1000:.0f}ms")
@@ -0,0 +1,407 @@
+"""
+Sidecar offset index for random access to stored conversations
+
+Each data file (conversations.json or conversations.zst) gets an
+append-only <file>.idx with one line per record: conversation_id, byte
+offset and length, plus scenario_id and model_name for secondary lookups.
+Storage backends add a line on every append; IndexedResultsReader memory-maps
+the data file and slices out single records instead of parsing the file.
+Appends hold an exclusive lock on <file>.lock, so concurrent writers (threads
+or processes) can't interleave records or index lines.
+"""
+
+import json
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+INDEX_SUFFIX = ".idx"
+LOCK_SUFFIX = ".lock"
+SECONDARY_KEYS = ("scenario_id", "model_name")
+# Unindexed bytes allowed after the last record: the "\n]" closing a JSON
+# array, or an empty file's "[]" or record-file header
+_MAX_TRAILER_BYTES = 4
+
+
+def _json_array_entries(data: bytes) -> Iterator[Tuple[int, int, Dict]]:
+    """Yield (byte offset, byte length, record) for each element of a JSON array"""
+    text = data.decode("utf-8")
+    decoder = json.JSONDecoder()
+    position = text.find("[") + 1
+    if position == 0:
+        return
+    # Byte offsets advance with the encoded size of the text skipped so far
+    char_position, byte_position = 0, 0
+    while True:
+        while position < len(text) and (text[position].isspace() or text[position] == ","):
+            position += 1
+        if position >= len(text) or text[position] == "]":
+            return
+        record, end = decoder.raw_decode(text, position)
+        byte_position += len(text[char_position:position].encode("utf-8"))
+        length = len(text[position:end].encode("utf-8"))
+        yield byte_position, length, record
+        byte_position += length
+        char_position = position = end
+
+
+# Without fcntl (Windows) appends are only serialized within this process
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def locked(path: str):
+    """
+    Hold an exclusive lock for writing a data file
+    
+    Args:
+        path: Data file; the lock is taken on <path>.lock
+    """
+    if not FCNTL_AVAILABLE:
+        with _process_lock:
+            yield
+        return
+    # flock is per open file, so this also excludes other threads
+    with open(path + LOCK_SUFFIX, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def append_to_json_array(path: str, record: Dict, index: Optional["OffsetIndex"] = None) -> Tuple[int, int]:
+    """
+    Append a record to a pretty-printed JSON array file in place
+    
+    Only the closing bracket is rewritten, so earlier records keep their
+    byte offsets and an append no longer rewrites the whole file.
+    
+    Args:
+        path: JSON file holding an array (created if missing)
+        record: Record to append
+        index: Offset index to add the record to under the same lock
+    
+    Returns:
+        (offset, length) of the record's bytes in the file
+    """
+    body = "\n".join("  " + line for line in json.dumps(record, ensure_ascii=False, indent=2).split("\n"))
+    encoded = body[2:].encode("utf-8")  # Offsets point at the record, not its indent
+    
+    with locked(path):
+        offset = _append_encoded(path, encoded)
+        if index is not None:
+            index.append(record, offset, len(encoded))
+    return offset, len(encoded)
+
+
+def _append_encoded(path: str, encoded: bytes) -> int:
+    """Write an encoded element before the closing bracket and return its offset"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, 'wb') as f:
+            f.write(b"[\n  " + encoded + b"\n]")
+        return len(b"[\n  ")
+    
+    with open(path, 'r+b') as f:
+        # Everything after the last element (or the "[" of an empty array) is rewritten
+        f.seek(0, os.SEEK_END)
+        start = max(0, f.tell() - 4096)
+        f.seek(start)
+        tail = f.read().rstrip()
+        if not tail.endswith(b"]"):
+            raise ValueError(f"{path} does not end with a JSON array")
+        content = tail[:-1].rstrip()
+        separator = b"\n  " if content.endswith(b"[") else b",\n  "
+        f.seek(start + len(content))
+        f.truncate()
+        offset = f.tell() + len(separator)
+        f.write(separator + encoded + b"\n]")
+    return offset
+
+
+class OffsetIndex:
+    """conversation_id -> (offset, length) index with scenario/model lookups"""
+    
+    def __init__(self, data_path: str):
+        """
+        Initialize index (loaded from <data_path>.idx if it exists)
+        
+        Args:
+            data_path: conversations.json or a .zst record file
+        """
+        self.data_path = data_path
+        self.path = data_path + INDEX_SUFFIX
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.secondary: Dict[str, Dict[str, List[str]]] = {key: {} for key in SECONDARY_KEYS}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            self._load()
+    
+    def _add(self, entry: Dict):
+        conversation_id = entry["id"]
+        if conversation_id not in self.offsets:
+            for key in SECONDARY_KEYS:
+                value = entry.get(key)
+                if value is not None:
+                    self.secondary[key].setdefault(str(value), []).append(conversation_id)
+        # A re-saved conversation points at its latest copy
+        self.offsets[conversation_id] = (entry["offset"], entry["length"])
+    
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._add(json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    # Torn final line from an interrupted append
+                    continue
+    
+    def append(self, record: Dict, offset: int, length: int):
+        """Record where a just-appended conversation lives"""
+        entry = {"id": str(record.get("conversation_id")), "offset": offset, "length": length}
+        for key in SECONDARY_KEYS:
+            entry[key] = record.get(key)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._add(entry)
+    
+    @property
+    def covered_bytes(self) -> int:
+        """End of the last indexed record"""
+        return max((offset + length for offset, length in self.offsets.values()), default=0)
+    
+    def is_stale(self) -> bool:
+        """Whether the index is missing or doesn't match the end of the data file"""
+        if not os.path.exists(self.path):
+            return True
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        slack = size - self.covered_bytes
+        return slack < 0 or slack > _MAX_TRAILER_BYTES
+    
+    def rebuild(self) -> int:
+        """
+        Re-index the whole data file
+        
+        Returns:
+            Number of records indexed
+        """
+        if self.data_path.endswith(".zst"):
+            from .compressed_store import CompressedRecordReader
+            entries = CompressedRecordReader(self.data_path).iter_with_offsets()
+        else:
+            with open(self.data_path, 'rb') as f:
+                entries = list(_json_array_entries(f.read()))
+        
+        with self._lock:
+            self.offsets = {}
+            self.secondary = {key: {} for key in SECONDARY_KEYS}
+            lines = []
+            for offset, length, record in entries:
+                entry = {"id": str(record.get("conversation_id")), "offset": offset, "length": length}
+                for key in SECONDARY_KEYS:
+                    entry[key] = record.get(key)
+                lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._add(entry)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(tmp_path, self.path)
+        return len(self.offsets)
+    
+    def ids(self, **criteria) -> List[str]:
+        """
+        Conversation IDs matching secondary keys (all IDs without criteria)
+        
+        Args:
+            **criteria: scenario_id and/or model_name values
+        """
+        unknown = set(criteria) - set(SECONDARY_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown index keys: {sorted(unknown)}. Use {SECONDARY_KEYS}")
+        selected = None
+        for key, value in criteria.items():
+            if value is None:
+                continue
+            matches = self.secondary[key].get(str(value), [])
+            if selected is None:
+                selected = list(matches)
+            else:
+                matched = set(matches)
+                selected = [cid for cid in selected if cid in matched]
+        return list(self.offsets) if selected is None else selected
+    
+    def __len__(self) -> int:
+        return len(self.offsets)
+    
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self.offsets
+
+
+class IndexedResultsReader:
+    """Random access to conversations through an offset index and mmap"""
+    
+    def __init__(self, data_path: str, index: Optional[OffsetIndex] = None):
+        """
+        Open a data file, rebuilding its index if missing or stale
+        
+        Args:
+            data_path: conversations.json or conversations.zst
+            index: Already loaded index of the file (e.g. a storage's own)
+        """
+        self.data_path = data_path
+        self.index = index or OffsetIndex(data_path)
+        if self.index.is_stale():
+            count = self.index.rebuild()
+            print(f"📇 Rebuilt offset index for {data_path}: {count} conversations")
+        self._decoder = None
+        if data_path.endswith(".zst"):
+            from .compressed_store import CompressedRecordReader, RECORD_HEADER
+            self._decoder = CompressedRecordReader(data_path)
+            self._header_size = RECORD_HEADER.size
+        self._file = open(data_path, 'rb')
+        self._map: Optional[mmap.mmap] = None
+        self._remap()
+    
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        size = os.path.getsize(self.data_path)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+    
+    def _slice(self, offset: int, length: int) -> bytes:
+        if self._map is None or offset + length > len(self._map):
+            # The file grew since it was mapped
+            self._remap()
+        return self._map[offset:offset + length]
+    
+    def _decode(self, data: bytes) -> Dict:
+        if self._decoder is not None:
+            return self._decoder.decode_frame(data[self._header_size:])
+        return json.loads(data)
+    
+    def get(self, conversation_id: str) -> Optional[Dict]:
+        """
+        Read one conversation
+        
+        Args:
+            conversation_id: Conversation identifier
+        
+        Returns:
+            Conversation record, or None if it isn't indexed
+        """
+        location = self.index.offsets.get(conversation_id)
+        if location is None:
+            return None
+        record = self._decode(self._slice(*location))
+        if str(record.get("conversation_id")) != conversation_id:
+            raise ValueError(f"Offset index for {self.data_path} is out of date; rebuild it")
+        return record
+    
+    def find(self, scenario_id: Optional[str] = None, model_name: Optional[str] = None) -> Iterator[Dict]:
+        """Yield conversations by scenario and/or model without scanning the file"""
+        for conversation_id in self.index.ids(scenario_id=scenario_id, model_name=model_name):
+            yield self.get(conversation_id)
+    
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+    
+    def __enter__(self) -> "IndexedResultsReader":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def indexed_data_files(results_dir: str) -> List[str]:
+    """Conversation data files in a results directory that support indexing"""
+    return [
+        path for path in (
+            os.path.join(results_dir, "conversations.json"),
+            os.path.join(results_dir, "conversations.zst"),
+        )
+        if os.path.exists(path)
+    ]
+
+
+def load_indexed_conversations(
+    results_dir: str,
+    conversation_ids: Optional[List[str]] = None,
+    scenario_id: Optional[str] = None,
+    model_name: Optional[str] = None
+) -> List[Dict]:
+    """
+    Look up conversations by ID, scenario or model through the offset indexes
+    
+    Args:
+        results_dir: Results directory
+        conversation_ids: Conversations to fetch (default: all matching the other criteria)
+        scenario_id: Only this scenario
+        model_name: Only this model
+    
+    Returns:
+        Matching conversations
+    """
+    conversations = []
+    for path in indexed_data_files(results_dir):
+        with IndexedResultsReader(path) as reader:
+            if conversation_ids:
+                for conversation_id in conversation_ids:
+                    record = reader.get(conversation_id)
+                    if record is None:
+                        continue
+                    if scenario_id and record.get("scenario_id") != scenario_id:
+                        continue
+                    if model_name and record.get("model_name") != model_name:
+                        continue
+                    conversations.append(record)
+            else:
+                conversations.extend(reader.find(scenario_id=scenario_id, model_name=model_name))
+    return conversations
+
+
+def main():
+    """Build an offset index or look up a conversation"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Offset index tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    build_parser = subparsers.add_parser("build", help="(Re)build the indexes of a results directory")
+    build_parser.add_argument("results_dir")
+    
+    get_parser = subparsers.add_parser("get", help="Print conversations by ID, scenario or model")
+    get_parser.add_argument("results_dir")
+    get_parser.add_argument("conversation_ids", nargs="*")
+    get_parser.add_argument("--scenario-id")
+    get_parser.add_argument("--model-name")
+    
+    args = parser.parse_args()
+    
+    if args.command == "build":
+        for path in indexed_data_files(args.results_dir):
+            count = OffsetIndex(path).rebuild()
+            print(f"📇 {path}: {count} conversations indexed")
+    else:
+        for record in load_indexed_conversations(
+            args.results_dir, args.conversation_ids, args.scenario_id, args.model_name
+        ):
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,572 @@
+"""
+Columnar Parquet storage for results
+
+Writes conversations, turns and evaluations as Parquet datasets partitioned
+by run date, model and agent (hive layout: run_date=.../model_name=.../
+agent_type=...), and reads them back with column and predicate pushdown so
+analytical queries only touch the files and columns they need.
+"""
+
+import atexit
+import json
+import operator
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .results_storage import ResultsStorage, Filters, normalize_filters, project_record
+from utils.conversation_ids import ensure_conversation_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+TABLES = ("conversations", "turns", "evaluations")
+PARTITION_COLUMNS = ("run_date", "model_name", "agent_type")
+UNKNOWN = "unknown"
+
+# Filter operators accepted by ParquetResultsReader, as (column, op, value)
+_FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda field, value: field.isin(list(value)),
+}
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("يرجى تثبيت pyarrow: pip install pyarrow")
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    partitions = [(name, pa.string()) for name in PARTITION_COLUMNS]
+    return {
+        "conversations": pa.schema([
+            ("conversation_id", pa.string()),
+            ("scenario_id", pa.string()),
+            ("base_scenario_id", pa.string()),
+            ("variant_params", pa.string()),  # JSON
+            ("language_mode", pa.string()),
+            ("total_turns", pa.int32()),
+            ("success", pa.bool_()),
+            ("end_reason", pa.string()),
+            ("total_tokens", pa.int64()),
+            ("total_latency", pa.float64()),
+            ("final_customer_message", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+        ] + partitions),
+        "turns": pa.schema([
+            ("conversation_id", pa.string()),
+            ("scenario_id", pa.string()),
+            ("turn_number", pa.int32()),
+            ("customer_message", pa.string()),
+            ("agent_message", pa.string()),
+            ("tokens", pa.int64()),
+            ("latency", pa.float64()),
+        ] + partitions),
+        "evaluations": pa.schema([
+            ("conversation_id", pa.string()),
+            ("scenario_id", pa.string()),
+            ("task_completion", pa.float64()),
+            ("empathy", pa.float64()),
+            ("clarity", pa.float64()),
+            ("cultural_fit", pa.float64()),
+            ("problem_solving", pa.float64()),
+            ("overall_score", pa.float64()),
+            ("judge_spread", pa.float64()),  # Ensemble disagreement, null for single judges
+            ("timestamp", pa.timestamp("us")),
+        ] + partitions),
+    }
+
+
+def _partitioning() -> "ds.Partitioning":
+    # Hive values are URI-encoded, so model names like "openai/gpt-oss-20b" are safe
+    return ds.partitioning(
+        pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]),
+        flavor="hive"
+    )
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _turn_text(turn: Dict, *keys) -> str:
+    for key in keys:
+        if key in turn:
+            return turn[key] or ""
+    return ""
+
+
+def conversation_rows(conversation: Dict) -> Tuple[Dict, List[Dict]]:
+    """
+    Flatten a conversation record into a conversations row and turns rows
+    
+    Args:
+        conversation: Conversation dictionary (pipeline or storage format)
+    
+    Returns:
+        (conversation row, turn rows)
+    """
+    timestamp = _parse_timestamp(conversation.get("timestamp")) or datetime.now()
+    partitions = {
+        "run_date": timestamp.date().isoformat(),
+        "model_name": conversation.get("model_name") or UNKNOWN,
+        "agent_type": conversation.get("agent_type") or UNKNOWN,
+    }
+    conversation_id = ensure_conversation_id(conversation)
+    
+    row = {
+        "conversation_id": conversation_id,
+        "scenario_id": conversation.get("scenario_id"),
+        "base_scenario_id": conversation.get("base_scenario_id"),
+        "variant_params": json.dumps(conversation.get("variant_params") or {}, ensure_ascii=False),
+        "language_mode": conversation.get("language_mode"),
+        "total_turns": conversation.get("total_turns", len(conversation.get("turns", []))),
+        "success": conversation.get("success"),
+        "end_reason": conversation.get("end_reason"),
+        "total_tokens": conversation.get("total_tokens"),
+        "total_latency": conversation.get("total_latency"),
+        "final_customer_message": conversation.get("final_customer_message"),
+        "timestamp": timestamp,
+        **partitions,
+    }
+    
+    turns = [
+        {
+            "conversation_id": conversation_id,
+            "scenario_id": conversation.get("scenario_id"),
+            "turn_number": turn.get("turn", turn.get("turn_number", i)),
+            "customer_message": _turn_text(turn, "customer", "customer_message"),
+            "agent_message": _turn_text(turn, "agent", "agent_message"),
+            "tokens": turn.get("tokens", 0),
+            "latency": turn.get("latency", turn.get("turn_latency", 0.0)),
+            **partitions,
+        }
+        for i, turn in enumerate(conversation.get("turns", []), 1)
+    ]
+    return row, turns
+
+
+def evaluation_row(evaluation: Dict, agent_type: Optional[str] = None) -> Dict:
+    """Flatten an evaluation record (EvaluationResult.to_dict() or storage format)"""
+    timestamp = _parse_timestamp(evaluation.get("timestamp")) or datetime.now()
+    ensemble = evaluation.get("ensemble") or {}
+    return {
+        "conversation_id": evaluation.get("conversation_id", ""),
+        "scenario_id": evaluation.get("scenario_id"),
+        "task_completion": evaluation.get("task_completion"),
+        "empathy": evaluation.get("empathy"),
+        "clarity": evaluation.get("clarity"),
+        "cultural_fit": evaluation.get("cultural_fit"),
+        "problem_solving": evaluation.get("problem_solving"),
+        "overall_score": evaluation.get("overall_score"),
+        "judge_spread": ensemble.get("spread"),
+        "timestamp": timestamp,
+        "run_date": timestamp.date().isoformat(),
+        "model_name": evaluation.get("model_name") or UNKNOWN,
+        "agent_type": evaluation.get("agent_type") or agent_type or UNKNOWN,
+    }
+
+
+class ParquetDatasetWriter:
+    """Buffers rows and writes them as partitioned Parquet files"""
+    
+    def __init__(self, dataset_dir: str, flush_every: int = 1000):
+        """
+        Initialize writer
+        
+        Args:
+            dataset_dir: Root directory with one dataset per table
+            flush_every: Buffered rows (per table) that trigger a write
+        """
+        _require_pyarrow()
+        self.dataset_dir = dataset_dir
+        self.flush_every = flush_every
+        self.schemas = _schemas()
+        self._buffers: Dict[str, List[Dict]] = {table: [] for table in TABLES}
+        self._agent_types: Dict[str, str] = {}  # conversation_id -> agent_type, for evaluations
+        self.rows_written = {table: 0 for table in TABLES}
+    
+    def add_conversation(self, conversation: Dict):
+        row, turns = conversation_rows(conversation)
+        self._agent_types[row["conversation_id"]] = row["agent_type"]
+        self._append("conversations", [row])
+        self._append("turns", turns)
+    
+    def add_evaluation(self, evaluation: Dict):
+        agent_type = evaluation.get("agent_type") or self._agent_type(evaluation.get("conversation_id", ""))
+        self._append("evaluations", [evaluation_row(evaluation, agent_type)])
+    
+    def _agent_type(self, conversation_id: str) -> Optional[str]:
+        """Agent type of a conversation saved by this process or an earlier run"""
+        if not conversation_id:
+            return None
+        if conversation_id not in self._agent_types:
+            # Evaluated in a later run than it was simulated: look it up on disk
+            root = os.path.join(self.dataset_dir, "conversations")
+            if not os.path.isdir(root):
+                return None
+            dataset = ds.dataset(root, schema=self.schemas["conversations"], format="parquet", partitioning=_partitioning())
+            rows = dataset.to_table(
+                columns=["agent_type"],
+                filter=ds.field("conversation_id") == conversation_id
+            ).column("agent_type").to_pylist()
+            if not rows:
+                return None
+            self._agent_types[conversation_id] = rows[0]
+        return self._agent_types[conversation_id]
+    
+    def remove_evaluation(self, conversation_id: str) -> int:
+        """
+        Delete a conversation's evaluation rows, buffered and written
+        
+        Parquet files are immutable, so files holding the conversation are
+        rewritten without it; only re-judged conversations pay for this.
+        
+        Args:
+            conversation_id: Conversation whose verdict is replaced
+        
+        Returns:
+            Rows removed
+        """
+        buffer = self._buffers["evaluations"]
+        self._buffers["evaluations"] = [row for row in buffer if row["conversation_id"] != conversation_id]
+        removed = len(buffer) - len(self._buffers["evaluations"])
+        
+        root = os.path.join(self.dataset_dir, "evaluations")
+        if not os.path.isdir(root):
+            return removed
+        for path in ds.dataset(root, format="parquet").files:
+            ids = pq.read_table(path, columns=["conversation_id"])["conversation_id"]
+            matches = pc.fill_null(pc.equal(ids, conversation_id), False)
+            count = pc.sum(matches).as_py() or 0
+            if not count:
+                continue
+            if count == len(ids):
+                os.remove(path)
+            else:
+                table = pq.read_table(path)
+                pq.write_table(table.filter(pc.invert(matches)), path)
+            removed += count
+        return removed
+    
+    def _append(self, table: str, rows: List[Dict]):
+        buffer = self._buffers[table]
+        buffer.extend(rows)
+        if len(buffer) >= self.flush_every:
+            self._flush_table(table)
+    
+    def _flush_table(self, table: str):
+        rows = self._buffers[table]
+        if not rows:
+            return
+        self._buffers[table] = []
+        
+        data = pa.Table.from_pylist(rows, schema=self.schemas[table])
+        ds.write_dataset(
+            data,
+            os.path.join(self.dataset_dir, table),
+            format="parquet",
+            partitioning=_partitioning(),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore"
+        )
+        self.rows_written[table] += len(rows)
+    
+    def flush(self):
+        """Write all buffered rows"""
+        for table in TABLES:
+            self._flush_table(table)
+    
+    def close(self):
+        self.flush()
+    
+    def __enter__(self) -> "ParquetDatasetWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ParquetResultsReader:
+    """Reads Parquet result datasets with column and partition pruning"""
+    
+    def __init__(self, dataset_dir: str):
+        """
+        Initialize reader
+        
+        Args:
+            dataset_dir: Root directory written by ParquetDatasetWriter
+        """
+        _require_pyarrow()
+        self.dataset_dir = dataset_dir
+        self.schemas = _schemas()
+    
+    def dataset(self, table: str) -> "ds.Dataset":
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}. Use one of {TABLES}")
+        return ds.dataset(
+            os.path.join(self.dataset_dir, table),
+            schema=self.schemas[table],
+            format="parquet",
+            partitioning=_partitioning()
+        )
+    
+    @staticmethod
+    def _expression(filters: Optional[Filters]):
+        expression = None
+        for column, op, value in normalize_filters(filters):
+            term = _FILTER_OPS[op](ds.field(column), value)
+            expression = term if expression is None else expression & term
+        return expression
+    
+    def read(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None
+    ) -> "pa.Table":
+        """
+        Read rows from a table
+        
+        Filters on partition columns (run_date, model_name, agent_type) skip
+        whole directories; other filters are pushed into the Parquet scan.
+        
+        Args:
+            table: conversations, turns or evaluations
+            columns: Columns to read (default: all)
+            filters: (column, op, value) conditions combined with AND
+        
+        Returns:
+            Arrow table
+        """
+        if not os.path.isdir(os.path.join(self.dataset_dir, table)):
+            return self.schemas[table].empty_table().select(columns or self.schemas[table].names)
+        return self.dataset(table).to_table(columns=columns, filter=self._expression(filters))
+    
+    def iter_rows(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """Stream rows batch by batch (same pruning as read())"""
+        if not os.path.isdir(os.path.join(self.dataset_dir, table)):
+            return
+        batches = self.dataset(table).to_batches(
+            columns=columns,
+            filter=self._expression(filters),
+            batch_size=batch_size
+        )
+        for batch in batches:
+            yield from batch.to_pylist()
+    
+    def aggregate(
+        self,
+        table: str,
+        by: List[str],
+        metrics: Dict[str, str],
+        filters: Optional[Filters] = None
+    ) -> List[Dict]:
+        """
+        Group and aggregate, reading only the columns involved
+        
+        Example: mean latency by model for agent_c over the last week:
+            reader.aggregate("conversations", ["model_name"], {"total_latency": "mean"},
+                             [("agent_type", "==", "agent_c"), ("run_date", ">=", "2025-01-01")])
+        
+        Args:
+            table: conversations, turns or evaluations
+            by: Group-by columns
+            metrics: Column -> Arrow aggregation (mean, sum, min, max, count, ...)
+            filters: (column, op, value) conditions combined with AND
+        
+        Returns:
+            One dictionary per group
+        """
+        columns = list(dict.fromkeys(by + list(metrics)))
+        data = self.read(table, columns=columns, filters=filters)
+        return data.group_by(by).aggregate(list(metrics.items())).to_pylist()
+
+
+def since_days(days: int) -> str:
+    """run_date lower bound for "the last N days" filters"""
+    return (datetime.now() - timedelta(days=days)).date().isoformat()
+
+
+class ParquetStorage(ResultsStorage):
+    """Results storage backed by partitioned Parquet datasets"""
+    
+    def __init__(self, output_dir: str = "results", flush_every: int = 100):
+        """
+        Initialize Parquet storage
+        
+        Args:
+            output_dir: Results directory (datasets go in <output_dir>/parquet)
+            flush_every: Buffered rows per table before a file is written
+        """
+        self.dataset_dir = os.path.join(output_dir, "parquet")
+        self.writer = ParquetDatasetWriter(self.dataset_dir, flush_every=flush_every)
+        self.reader = ParquetResultsReader(self.dataset_dir)
+        atexit.register(self.writer.close)
+        
+        # Conversations already in the dataset, so retried writes are skipped
+        self._conversation_ids = set()
+        if os.path.isdir(os.path.join(self.dataset_dir, "conversations")):
+            self._conversation_ids = set(self.reader.read("conversations", ["conversation_id"]).column("conversation_id").to_pylist())
+        # Evaluated conversations, so a re-judged one replaces its verdict
+        self._evaluation_ids = set()
+        if os.path.isdir(os.path.join(self.dataset_dir, "evaluations")):
+            self._evaluation_ids = set(self.reader.read("evaluations", ["conversation_id"]).column("conversation_id").to_pylist())
+    
+    def save_conversation(self, conversation_data: Dict) -> bool:
+        try:
+            conversation_id = ensure_conversation_id(conversation_data)
+            if conversation_id in self._conversation_ids:
+                print(f"♻️  المحادثة محفوظة مسبقاً: {conversation_id}")
+                return True
+            self.writer.add_conversation(dict(conversation_data, conversation_id=conversation_id))
+            self._conversation_ids.add(conversation_id)
+            return True
+        except Exception as e:
+            print(f"❌ خطأ في حفظ المحادثة في Parquet: {e}")
+            return False
+    
+    def save_evaluation(self, evaluation_data: Dict) -> bool:
+        try:
+            conversation_id = evaluation_data.get("conversation_id", "")
+            if conversation_id and conversation_id in self._evaluation_ids:
+                # Upsert: the new verdict replaces the earlier one
+                self.writer.remove_evaluation(conversation_id)
+            self.writer.add_evaluation(evaluation_data)
+            if conversation_id:
+                self._evaluation_ids.add(conversation_id)
+            return True
+        except Exception as e:
+            print(f"❌ خطأ في حفظ التقييم في Parquet: {e}")
+            return False
+    
+    def get_all_conversations(self) -> List[Dict]:
+        """Get all conversation rows (without turns; read the turns table for those)"""
+        try:
+            self.writer.flush()
+            return self.reader.read("conversations").to_pylist()
+        except Exception as e:
+            print(f"❌ خطأ في قراءة المحادثات من Parquet: {e}")
+            return []
+    
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """Stream conversation rows with column and predicate pushdown"""
+        self.writer.flush()
+        for row in self.reader.iter_rows("conversations", columns, filters, batch_size):
+            yield project_record(row, columns)
+    
+    def close(self):
+        self.writer.close()
+
+
+def _load_json_records(path: str) -> Iterable[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"⚠️  Failed to load {path}: {e}")
+        return []
+    return data if isinstance(data, list) else [data]
+
+
+def export_results_dir(results_dir: str, dataset_dir: str) -> Dict[str, int]:
+    """
+    Convert the JSON files in a results directory to Parquet datasets
+    
+    Args:
+        results_dir: Directory with conversation and evaluation JSON files
+        dataset_dir: Output root for the Parquet datasets
+    
+    Returns:
+        Rows written per table
+    """
+    import glob
+    from evaluator.evaluation_index import conversation_files, load_conversation_file
+    
+    with ParquetDatasetWriter(dataset_dir) as writer:
+        for path in conversation_files(results_dir):
+            for conversation in load_conversation_file(path):
+                writer.add_conversation(conversation)
+        
+        evaluation_files = sorted(glob.glob(os.path.join(results_dir, "evaluation_results_*.json")))
+        evaluations_file = os.path.join(results_dir, "evaluations.json")
+        if os.path.exists(evaluations_file):
+            evaluation_files.append(evaluations_file)
+        for path in evaluation_files:
+            for evaluation in _load_json_records(path):
+                writer.add_evaluation(evaluation)
+    
+    return writer.rows_written
+
+
+def main():
+    """Export JSON results to Parquet, or run a quick aggregate query"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Parquet results tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Convert a results directory to Parquet")
+    export_parser.add_argument("results_dir", help="Directory with JSON results")
+    export_parser.add_argument("--output", help="Dataset directory (default: <results_dir>/parquet)")
+    
+    query_parser = subparsers.add_parser("query", help="Aggregate a column by model")
+    query_parser.add_argument("dataset_dir", help="Dataset directory")
+    query_parser.add_argument("--table", choices=TABLES, default="conversations")
+    query_parser.add_argument("--metric", default="total_latency", help="Column to aggregate")
+    query_parser.add_argument("--agg", default="mean", help="Aggregation (default: mean)")
+    query_parser.add_argument("--by", nargs="+", default=["model_name"], help="Group-by columns")
+    query_parser.add_argument("--agent-type", help="Only this agent type")
+    query_parser.add_argument("--days", type=int, help="Only runs from the last N days")
+    
+    args = parser.parse_args()
+    
+    if args.command == "export":
+        output = args.output or os.path.join(args.results_dir, "parquet")
+        counts = export_results_dir(args.results_dir, output)
+        print(f"✅ Exported to {output}: " + ", ".join(f"{n} {table}" for table, n in counts.items()))
+    else:
+        filters = []
+        if args.agent_type:
+            filters.append(("agent_type", "==", args.agent_type))
+        if args.days:
+            filters.append(("run_date", ">=", since_days(args.days)))
+        reader = ParquetResultsReader(args.dataset_dir)
+        for row in reader.aggregate(args.table, args.by, {args.metric: args.agg}, filters):
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,143 @@
 """
 Results storage for conversation evaluation data
-Supports CSV and Supabase
+Supports JSON, CSV, Supabase, Parquet and zstd-compressed JSON
 """
 
 import os
 import csv
 import json
+import queue
+import atexit
+import operator
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from abc import ABC, abstractmethod
 import pandas as pd
 
+from .offset_index import OffsetIndex, IndexedResultsReader, append_to_json_array, locked
+from utils.conversation_ids import ensure_conversation_id
+
+
+# (column, op, value) conditions, or a {column: value} shorthand for equality
+Filters = Union[Dict[str, any], Sequence[Tuple[str, str, any]]]
+
+FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, options: value in options,
+}
+
+# Bytes read per step when streaming a JSON array
+JSON_CHUNK_SIZE = 1 << 16
+
+
+def normalize_filters(filters: Optional[Filters]) -> List[Tuple[str, str, any]]:
+    """Turn filters into a list of (column, op, value) conditions"""
+    if not filters:
+        return []
+    if isinstance(filters, dict):
+        return [(column, "==", value) for column, value in filters.items()]
+    conditions = [tuple(condition) for condition in filters]
+    for column, op, _ in conditions:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown filter operator for {column}: {op}. Use one of {list(FILTER_OPS)}")
+    return conditions
+
+
+def matches_filters(record: Dict, conditions: List[Tuple[str, str, any]]) -> bool:
+    """Check a record against (column, op, value) conditions (missing values never match)"""
+    for column, op, value in conditions:
+        field = record.get(column)
+        if field is None:
+            return False
+        try:
+            if not FILTER_OPS[op](field, value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def project_record(record: Dict, columns: Optional[List[str]]) -> Dict:
+    """Keep only the requested columns"""
+    if not columns:
+        return record
+    return {column: record.get(column) for column in columns}
+
+
+def iter_json_records(path: str, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Stream the records of a JSON array or JSONL file
+    
+    Only one record (plus one read chunk) is held in memory at a time, so
+    large conversations.json files can be scanned without loading them.
+    
+    Args:
+        path: .json file holding an array (or a single object) or a .jsonl file
+        chunk_size: Characters read per step
+    
+    Yields:
+        Record dictionaries
+    """
+    if path.endswith(".jsonl"):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        return
+    
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace, the opening bracket and separators
+            position = 0
+            while True:
+                while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+                    position += 1
+                if not started and position < len(buffer):
+                    if buffer[position] == "[":
+                        position += 1
+                    else:
+                        # A single top-level object
+                        buffer = buffer[position:] + f.read()
+                        if buffer.strip():
+                            yield json.loads(buffer)
+                        return
+                    started = True
+                    continue
+                break
+            buffer = buffer[position:]
+            
+            if buffer.startswith("]"):
+                return
+            
+            if buffer:
+                try:
+                    record, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield record
+                    buffer = buffer[end:]
+                    continue
+            
+            if eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+
 
 class ResultsStorage(ABC):
     """Base class for results storage"""
@@ -29,11 +156,40 @@ class ResultsStorage(ABC):
     def get_all_conversations(self) -> List[Dict]:
         """Get all stored conversations"""
         pass
+    
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """
+        Iterate over stored conversations without loading them all
+        
+        Backends override this to stream from storage; the default filters
+        get_all_conversations() in memory.
+        
+        Args:
+            filters: (column, op, value) conditions combined with AND, or
+                {column: value} for equality
+            columns: Columns to return (default: all)
+            batch_size: Records fetched per read where the backend pages
+        
+        Yields:
+            Conversation dictionaries
+        """
+        conditions = normalize_filters(filters)
+        for record in self.get_all_conversations():
+            if matches_filters(record, conditions):
+                yield project_record(record, columns)
 
 
 class JSONStorage(ResultsStorage):
     """JSON file storage for results"""
     
+    # Where conversations go, for save messages
+    conversations_format = "JSON"
+    
     def __init__(self, output_dir: str = "results"):
         """
         Initialize JSON storage
@@ -49,6 +205,18 @@ class JSONStorage(ResultsStorage):
         
         # Initialize JSON files if they don't exist
         self._initialize_files()
+        
+        # Sidecar offset index for random access by conversation_id
+        self.index = OffsetIndex(self.conversations_file)
+        if self.index.is_stale():
+            self.index.rebuild()
+        self._indexed_reader: Optional[IndexedResultsReader] = None
+        
+        # Evaluated conversations: new verdicts are appended in place, only a
+        # re-judged conversation rewrites evaluations.json
+        self._evaluation_ids = {
+            record.get('conversation_id') for record in iter_json_records(self.evaluations_file)
+        }
     
     def _initialize_files(self):
         """Initialize JSON files with empty arrays"""
@@ -60,6 +228,43 @@ class JSONStorage(ResultsStorage):
             with open(self.evaluations_file, 'w', encoding='utf-8') as f:
                 json.dump([], f, ensure_ascii=False, indent=2)
     
+    def _conversation_record(self, conversation_data: Dict) -> Dict:
+        """Build the stored conversation record"""
+        conversation_id = ensure_conversation_id(conversation_data)
+        timestamp = datetime.now().isoformat()
+        
+        return {
+            'conversation_id': conversation_id,
+            'run_id': conversation_data.get('run_id'),
+            'trial': conversation_data.get('trial', 0),
+            'scenario_id': conversation_data['scenario_id'],
+            'agent_type': conversation_data['agent_type'],
+            'model_name': conversation_data['model_name'],
+            'customer_persona': conversation_data.get('customer_persona', ''),
+            'customer_goal': conversation_data.get('customer_goal', ''),
+            'total_turns': conversation_data['total_turns'],
+            'success': conversation_data['success'],
+            'end_reason': conversation_data['end_reason'],
+            'total_tokens': conversation_data['total_tokens'],
+            'total_latency': conversation_data['total_latency'],
+            'turns': conversation_data.get('turns', []),
+            'final_customer_message': conversation_data.get('final_customer_message', ''),
+            'customer_ended': conversation_data.get('customer_ended'),
+            'base_scenario_id': conversation_data.get('base_scenario_id'),
+            'variant_params': conversation_data.get('variant_params', {}),
+            'timestamp': timestamp
+        }
+    
+    def _append_conversation(self, record: Dict):
+        """Append a conversation record to conversations.json and index it"""
+        append_to_json_array(self.conversations_file, record, self.index)
+    
+    def get_conversation(self, conversation_id: str) -> Optional[Dict]:
+        """Read one conversation through the offset index"""
+        if self._indexed_reader is None:
+            self._indexed_reader = IndexedResultsReader(self.index.data_path, self.index)
+        return self._indexed_reader.get(conversation_id)
+    
     def save_conversation(self, conversation_data: Dict) -> bool:
         """
         Save conversation to JSON
@@ -71,39 +276,14 @@ class JSONStorage(ResultsStorage):
             True if successful
         """
         try:
-            # Generate conversation ID
-            conversation_id = f"{conversation_data['scenario_id']}_{conversation_data['model_name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            timestamp = datetime.now().isoformat()
-            
-            # Prepare conversation record
-            record = {
-                'conversation_id': conversation_id,
-                'scenario_id': conversation_data['scenario_id'],
-                'agent_type': conversation_data['agent_type'],
-                'model_name': conversation_data['model_name'],
-                'customer_persona': conversation_data.get('customer_persona', ''),
-                'customer_goal': conversation_data.get('customer_goal', ''),
-                'total_turns': conversation_data['total_turns'],
-                'success': conversation_data['success'],
-                'end_reason': conversation_data['end_reason'],
-                'total_tokens': conversation_data['total_tokens'],
-                'total_latency': conversation_data['total_latency'],
-                'turns': conversation_data.get('turns', []),
-                'timestamp': timestamp
-            }
-            
-            # Read existing data
-            with open(self.conversations_file, 'r', encoding='utf-8') as f:
-                conversations = json.load(f)
-            
-            # Append new record
-            conversations.append(record)
-            
-            # Write back
-            with open(self.conversations_file, 'w', encoding='utf-8') as f:
-                json.dump(conversations, f, ensure_ascii=False, indent=2)
-            
-            print(f"✅ تم حفظ المحادثة في JSON: {conversation_id}")
+            record = self._conversation_record(conversation_data)
+            if record['conversation_id'] in self.index:
+                # IDs are derived from the transcript, so this is a retried write
+                print(f"♻️  المحادثة محفوظة مسبقاً: {record['conversation_id']}")
+                return True
+            self._append_conversation(record)
+            
+            print(f"✅ تم حفظ المحادثة في {self.conversations_format}: {record['conversation_id']}")
             return True
             
         except Exception as e:
@@ -134,19 +314,26 @@ class JSONStorage(ResultsStorage):
                 'problem_solving': evaluation_data.get('problem_solving', 0),
                 'overall_score': evaluation_data.get('overall_score', 0),
                 'evaluator_notes': evaluation_data.get('notes', ''),
+                'ensemble': evaluation_data.get('ensemble', {}),
                 'timestamp': timestamp
             }
             
-            # Read existing data
-            with open(self.evaluations_file, 'r', encoding='utf-8') as f:
-                evaluations = json.load(f)
-            
-            # Append new record
-            evaluations.append(record)
-            
-            # Write back
-            with open(self.evaluations_file, 'w', encoding='utf-8') as f:
-                json.dump(evaluations, f, ensure_ascii=False, indent=2)
+            conversation_id = record['conversation_id']
+            if conversation_id and conversation_id in self._evaluation_ids:
+                # Upsert: a re-judged conversation replaces its earlier verdict
+                with locked(self.evaluations_file):
+                    evaluations = [
+                        e for e in iter_json_records(self.evaluations_file)
+                        if e.get('conversation_id') != conversation_id
+                    ]
+                    evaluations.append(record)
+                    tmp_path = self.evaluations_file + ".tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(evaluations, f, ensure_ascii=False, indent=2)
+                    os.replace(tmp_path, self.evaluations_file)
+            else:
+                append_to_json_array(self.evaluations_file, record)
+            self._evaluation_ids.add(conversation_id)
             
             print(f"✅ تم حفظ التقييم في JSON")
             return True
@@ -163,17 +350,53 @@ class JSONStorage(ResultsStorage):
         except Exception as e:
             print(f"❌ خطأ في قراءة المحادثات: {e}")
             return []
+    
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """Stream conversations from the JSON file one record at a time"""
+        conditions = normalize_filters(filters)
+        for record in iter_json_records(self.conversations_file):
+            if matches_filters(record, conditions):
+                yield project_record(record, columns)
+
+
+CSV_CONVERSATION_FIELDS = [
+    'conversation_id', 'scenario_id', 'agent_type', 'model_name',
+    'customer_persona', 'customer_goal', 'total_turns', 'success',
+    'end_reason', 'total_tokens', 'total_latency', 'timestamp'
+]
+CSV_TURN_FIELDS = [
+    'conversation_id', 'turn_number', 'customer_message',
+    'agent_message', 'customer_tokens', 'agent_tokens',
+    'turn_latency', 'timestamp'
+]
+CSV_EVALUATION_FIELDS = [
+    'conversation_id', 'scenario_id', 'model_name',
+    'task_completion', 'empathy', 'clarity', 'cultural_fit',
+    'problem_solving', 'overall_score', 'evaluator_notes',
+    'timestamp'
+]
 
 
 class CSVStorage(ResultsStorage):
     """CSV file storage for results"""
     
-    def __init__(self, output_dir: str = "results"):
+    def __init__(self, output_dir: str = "results", flush_every: int = 100, flush_interval: float = 2.0):
         """
         Initialize CSV storage
         
+        Rows are handed to a single writer thread that keeps the CSV files
+        open and writes them in batches, so concurrent producers never touch
+        the files and a save costs no file syscalls.
+        
         Args:
             output_dir: Directory to store CSV files
+            flush_every: Buffered rows per file that trigger a write
+            flush_interval: Seconds after which buffered rows are written anyway
         """
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
@@ -184,40 +407,150 @@ class CSVStorage(ResultsStorage):
         
         # Initialize CSV files with headers if they don't exist
         self._initialize_files()
+        
+        # Conversations already written, so retried writes are skipped
+        with open(self.conversations_file, 'r', newline='', encoding='utf-8') as f:
+            self._conversation_ids = {row['conversation_id'] for row in csv.DictReader(f)}
+        # Evaluated conversations, so a re-judged one replaces its verdict
+        with open(self.evaluations_file, 'r', newline='', encoding='utf-8') as f:
+            self._evaluation_ids = {row['conversation_id'] for row in csv.DictReader(f)}
+        self._ids_lock = threading.Lock()
+        
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.write_errors = 0
+        self._files = {
+            path: open(path, 'a', newline='', encoding='utf-8')
+            for path in (self.conversations_file, self.turns_file, self.evaluations_file)
+        }
+        self._writers = {
+            self.conversations_file: csv.DictWriter(self._files[self.conversations_file], fieldnames=CSV_CONVERSATION_FIELDS),
+            self.turns_file: csv.DictWriter(self._files[self.turns_file], fieldnames=CSV_TURN_FIELDS),
+            self.evaluations_file: csv.DictWriter(self._files[self.evaluations_file], fieldnames=CSV_EVALUATION_FIELDS),
+        }
+        self._buffers: Dict[str, List[Dict]] = {path: [] for path in self._files}
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="csv-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
     
     def _initialize_files(self):
         """Initialize CSV files with headers"""
+        for path, fieldnames in (
+            (self.conversations_file, CSV_CONVERSATION_FIELDS),
+            (self.turns_file, CSV_TURN_FIELDS),
+            (self.evaluations_file, CSV_EVALUATION_FIELDS),
+        ):
+            if not os.path.exists(path):
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    csv.DictWriter(f, fieldnames=fieldnames).writeheader()
+    
+    def _write_buffers(self):
+        for path, rows in self._buffers.items():
+            if not rows:
+                continue
+            try:
+                self._writers[path].writerows(rows)
+                self._files[path].flush()
+            except Exception as e:
+                self.write_errors += len(rows)
+                print(f"❌ خطأ في الكتابة إلى {os.path.basename(path)}: {e}")
+            rows.clear()
+    
+    def _write_loop(self):
+        last_write = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_write))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()  # Interval elapsed with nothing queued
+            
+            try:
+                if item is None:
+                    self._write_buffers()
+                    return
+                if isinstance(item, threading.Event):
+                    # flush() request
+                    self._write_buffers()
+                    last_write = time.monotonic()
+                    item.set()
+                    continue
+                if item:
+                    path, rows, replace_id = item
+                    if replace_id:
+                        self._remove_rows(path, replace_id)
+                    self._buffers[path].extend(rows)
+                if (
+                    any(len(rows) >= self.flush_every for rows in self._buffers.values())
+                    or time.monotonic() - last_write >= self.flush_interval
+                ):
+                    self._write_buffers()
+                    last_write = time.monotonic()
+            finally:
+                if item != ():
+                    self._queue.task_done()
+    
+    def _remove_rows(self, path: str, conversation_id: str):
+        """Drop a conversation's rows from a file and its buffer (writer thread only)"""
+        self._buffers[path] = [row for row in self._buffers[path] if row['conversation_id'] != conversation_id]
+        self._write_buffers()
         
-        # Conversations file
-        if not os.path.exists(self.conversations_file):
-            with open(self.conversations_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'conversation_id', 'scenario_id', 'agent_type', 'model_name',
-                    'customer_persona', 'customer_goal', 'total_turns', 'success',
-                    'end_reason', 'total_tokens', 'total_latency', 'timestamp'
-                ])
-                writer.writeheader()
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames
+            rows = list(reader)
+        kept = [row for row in rows if row['conversation_id'] != conversation_id]
+        if len(kept) == len(rows):
+            return
         
-        # Turns file
-        if not os.path.exists(self.turns_file):
-            with open(self.turns_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'conversation_id', 'turn_number', 'customer_message',
-                    'agent_message', 'customer_tokens', 'agent_tokens',
-                    'turn_latency', 'timestamp'
-                ])
-                writer.writeheader()
+        self._files[path].close()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(kept)
+        os.replace(tmp_path, path)
+        self._files[path] = open(path, 'a', newline='', encoding='utf-8')
+        self._writers[path] = csv.DictWriter(self._files[path], fieldnames=fieldnames)
+    
+    def _enqueue(self, path: str, rows: List[Dict], replace_id: Optional[str] = None):
+        """
+        Hand rows to the writer thread
         
-        # Evaluations file
-        if not os.path.exists(self.evaluations_file):
-            with open(self.evaluations_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'conversation_id', 'scenario_id', 'model_name',
-                    'task_completion', 'empathy', 'clarity', 'cultural_fit',
-                    'problem_solving', 'overall_score', 'evaluator_notes',
-                    'timestamp'
-                ])
-                writer.writeheader()
+        Args:
+            path: CSV file
+            rows: Rows to append
+            replace_id: Remove this conversation's existing rows first (upsert)
+        """
+        if self._closed:
+            raise RuntimeError("CSVStorage is closed")
+        self._queue.put((path, rows, replace_id))
+    
+    def flush(self):
+        """Write all buffered rows to disk"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+    
+    def close(self):
+        """Write buffered rows, stop the writer thread and close the files"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        for f in self._files.values():
+            f.close()
+    
+    def __enter__(self) -> "CSVStorage":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def save_conversation(self, conversation_data: Dict) -> bool:
         """
@@ -230,50 +563,46 @@ class CSVStorage(ResultsStorage):
             True if successful
         """
         try:
-            # Generate conversation ID
-            conversation_id = f"{conversation_data['scenario_id']}_{conversation_data['model_name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            conversation_id = ensure_conversation_id(conversation_data)
             timestamp = datetime.now().isoformat()
             
+            with self._ids_lock:
+                duplicate = conversation_id in self._conversation_ids
+                self._conversation_ids.add(conversation_id)
+            if duplicate:
+                print(f"♻️  المحادثة محفوظة مسبقاً: {conversation_id}")
+                return True
+            
             # Save conversation metadata
-            with open(self.conversations_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'conversation_id', 'scenario_id', 'agent_type', 'model_name',
-                    'customer_persona', 'customer_goal', 'total_turns', 'success',
-                    'end_reason', 'total_tokens', 'total_latency', 'timestamp'
-                ])
-                writer.writerow({
-                    'conversation_id': conversation_id,
-                    'scenario_id': conversation_data['scenario_id'],
-                    'agent_type': conversation_data['agent_type'],
-                    'model_name': conversation_data['model_name'],
-                    'customer_persona': conversation_data.get('customer_persona', ''),
-                    'customer_goal': conversation_data.get('customer_goal', ''),
-                    'total_turns': conversation_data['total_turns'],
-                    'success': conversation_data['success'],
-                    'end_reason': conversation_data['end_reason'],
-                    'total_tokens': conversation_data['total_tokens'],
-                    'total_latency': conversation_data['total_latency'],
-                    'timestamp': timestamp
-                })
+            self._enqueue(self.conversations_file, [{
+                'conversation_id': conversation_id,
+                'scenario_id': conversation_data['scenario_id'],
+                'agent_type': conversation_data['agent_type'],
+                'model_name': conversation_data['model_name'],
+                'customer_persona': conversation_data.get('customer_persona', ''),
+                'customer_goal': conversation_data.get('customer_goal', ''),
+                'total_turns': conversation_data['total_turns'],
+                'success': conversation_data['success'],
+                'end_reason': conversation_data['end_reason'],
+                'total_tokens': conversation_data['total_tokens'],
+                'total_latency': conversation_data['total_latency'],
+                'timestamp': timestamp
+            }])
             
             # Save conversation turns
-            with open(self.turns_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'conversation_id', 'turn_number', 'customer_message',
-                    'agent_message', 'customer_tokens', 'agent_tokens',
-                    'turn_latency', 'timestamp'
-                ])
-                for turn in conversation_data.get('turns', []):
-                    writer.writerow({
-                        'conversation_id': conversation_id,
-                        'turn_number': turn['turn'],
-                        'customer_message': turn['customer'],
-                        'agent_message': turn['agent'],
-                        'customer_tokens': turn.get('customer_tokens', 0),
-                        'agent_tokens': turn.get('agent_tokens', 0),
-                        'turn_latency': turn.get('latency', 0),
-                        'timestamp': timestamp
-                    })
+            self._enqueue(self.turns_file, [
+                {
+                    'conversation_id': conversation_id,
+                    'turn_number': turn['turn'],
+                    'customer_message': turn['customer'],
+                    'agent_message': turn['agent'],
+                    'customer_tokens': turn.get('customer_tokens', 0),
+                    'agent_tokens': turn.get('agent_tokens', 0),
+                    'turn_latency': turn.get('latency', 0),
+                    'timestamp': timestamp
+                }
+                for turn in conversation_data.get('turns', [])
+            ])
             
             print(f"✅ تم حفظ المحادثة في CSV: {conversation_id}")
             return True
@@ -294,27 +623,24 @@ class CSVStorage(ResultsStorage):
         """
         try:
             timestamp = datetime.now().isoformat()
+            conversation_id = evaluation_data.get('conversation_id', '')
+            with self._ids_lock:
+                rejudged = bool(conversation_id) and conversation_id in self._evaluation_ids
+                self._evaluation_ids.add(conversation_id)
             
-            with open(self.evaluations_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'conversation_id', 'scenario_id', 'model_name',
-                    'task_completion', 'empathy', 'clarity', 'cultural_fit',
-                    'problem_solving', 'overall_score', 'evaluator_notes',
-                    'timestamp'
-                ])
-                writer.writerow({
-                    'conversation_id': evaluation_data.get('conversation_id', ''),
-                    'scenario_id': evaluation_data['scenario_id'],
-                    'model_name': evaluation_data['model_name'],
-                    'task_completion': evaluation_data.get('task_completion', 0),
-                    'empathy': evaluation_data.get('empathy', 0),
-                    'clarity': evaluation_data.get('clarity', 0),
-                    'cultural_fit': evaluation_data.get('cultural_fit', 0),
-                    'problem_solving': evaluation_data.get('problem_solving', 0),
-                    'overall_score': evaluation_data.get('overall_score', 0),
-                    'evaluator_notes': evaluation_data.get('notes', ''),
-                    'timestamp': timestamp
-                })
+            self._enqueue(self.evaluations_file, [{
+                'conversation_id': conversation_id,
+                'scenario_id': evaluation_data['scenario_id'],
+                'model_name': evaluation_data['model_name'],
+                'task_completion': evaluation_data.get('task_completion', 0),
+                'empathy': evaluation_data.get('empathy', 0),
+                'clarity': evaluation_data.get('clarity', 0),
+                'cultural_fit': evaluation_data.get('cultural_fit', 0),
+                'problem_solving': evaluation_data.get('problem_solving', 0),
+                'overall_score': evaluation_data.get('overall_score', 0),
+                'evaluator_notes': evaluation_data.get('notes', ''),
+                'timestamp': timestamp
+            }], replace_id=conversation_id if rejudged else None)
             
             print(f"✅ تم حفظ التقييم في CSV")
             return True
@@ -326,12 +652,32 @@ class CSVStorage(ResultsStorage):
     def get_all_conversations(self) -> List[Dict]:
         """Get all conversations from CSV"""
         try:
+            self.flush()
             df = pd.read_csv(self.conversations_file)
             return df.to_dict('records')
         except Exception as e:
             print(f"❌ خطأ في قراءة المحادثات: {e}")
             return []
     
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """Stream conversations from the CSV in chunks of batch_size rows"""
+        self.flush()
+        conditions = normalize_filters(filters)
+        usecols = None
+        if columns:
+            # Filter columns are read too, then projected away
+            usecols = list(dict.fromkeys(list(columns) + [column for column, _, _ in conditions]))
+        
+        for chunk in pd.read_csv(self.conversations_file, chunksize=batch_size, usecols=usecols):
+            for record in chunk.to_dict('records'):
+                if matches_filters(record, conditions):
+                    yield project_record(record, columns)
+    
     def export_summary(self, output_file: str = None) -> bool:
         """
         Export summary statistics to Excel
@@ -347,6 +693,7 @@ class CSVStorage(ResultsStorage):
                 output_file = os.path.join(self.output_dir, f"summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
             
             # Read data
+            self.flush()
             conversations_df = pd.read_csv(self.conversations_file)
             evaluations_df = pd.read_csv(self.evaluations_file)
             
@@ -407,8 +754,7 @@ class SupabaseStorage(ResultsStorage):
             True if successful
         """
         try:
-            # Generate conversation ID
-            conversation_id = f"{conversation_data['scenario_id']}_{conversation_data['model_name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            conversation_id = ensure_conversation_id(conversation_data)
             
             # Save conversation metadata
             conversation_record = {
@@ -426,7 +772,8 @@ class SupabaseStorage(ResultsStorage):
                 'created_at': datetime.now().isoformat()
             }
             
-            self.client.table('conversations').insert(conversation_record).execute()
+            # Upserts keep retried and parallel writes from duplicating rows
+            self.client.table('conversations').upsert(conversation_record, on_conflict='conversation_id').execute()
             
             # Save conversation turns
             turns_records = [
@@ -444,7 +791,9 @@ class SupabaseStorage(ResultsStorage):
             ]
             
             if turns_records:
-                self.client.table('conversation_turns').insert(turns_records).execute()
+                self.client.table('conversation_turns').upsert(
+                    turns_records, on_conflict='conversation_id,turn_number'
+                ).execute()
             
             print(f"✅ تم حفظ المحادثة في Supabase: {conversation_id}")
             return True
@@ -478,7 +827,10 @@ class SupabaseStorage(ResultsStorage):
                 'created_at': datetime.now().isoformat()
             }
             
-            self.client.table('evaluations').insert(evaluation_record).execute()
+            if evaluation_record['conversation_id']:
+                self.client.table('evaluations').upsert(evaluation_record, on_conflict='conversation_id').execute()
+            else:
+                self.client.table('evaluations').insert(evaluation_record).execute()
             
             print(f"✅ تم حفظ التقييم في Supabase")
             return True
@@ -495,6 +847,39 @@ class SupabaseStorage(ResultsStorage):
         except Exception as e:
             print(f"❌ خطأ في قراءة المحادثات من Supabase: {e}")
             return []
+    
+    # Filter operator -> PostgREST query builder method
+    _QUERY_METHODS = {"==": "eq", "!=": "neq", "<": "lt", "<=": "lte", ">": "gt", ">=": "gte", "in": "in_"}
+    
+    def iter_conversations(
+        self,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """
+        Page through conversations with keyset pagination on conversation_id
+        
+        Each page is a "conversation_id > last seen" query, so deep pages
+        cost the same as the first one (no OFFSET scans).
+        """
+        conditions = normalize_filters(filters)
+        select = ",".join(dict.fromkeys(["conversation_id"] + list(columns))) if columns else "*"
+        last_id = None
+        
+        while True:
+            query = self.client.table('conversations').select(select)
+            for column, op, value in conditions:
+                query = getattr(query, self._QUERY_METHODS[op])(column, list(value) if op == "in" else value)
+            if last_id is not None:
+                query = query.gt('conversation_id', last_id)
+            rows = query.order('conversation_id').limit(batch_size).execute().data
+            
+            for row in rows:
+                yield project_record(row, columns)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['conversation_id']
 
 
 def get_storage(storage_mode: str = "json", **kwargs) -> ResultsStorage:
@@ -502,7 +887,8 @@ def get_storage(storage_mode: str = "json", **kwargs) -> ResultsStorage:
     Factory function to get appropriate storage instance
     
     Args:
-        storage_mode: 'json', 'csv', 'supabase', or 'both'
+        storage_mode: 'json', 'csv', 'supabase', 'parquet', 'zstd', 'both' (JSON + Supabase)
+            or a comma-separated list of backends written concurrently
         **kwargs: Additional arguments for storage initialization
         
     Returns:
@@ -512,35 +898,32 @@ def get_storage(storage_mode: str = "json", **kwargs) -> ResultsStorage:
         return JSONStorage(output_dir=kwargs.get('output_dir', 'results'))
     elif storage_mode == "csv":
         return CSVStorage(output_dir=kwargs.get('output_dir', 'results'))
+    elif storage_mode == "parquet":
+        from .parquet_store import ParquetStorage
+        return ParquetStorage(output_dir=kwargs.get('output_dir', 'results'))
+    elif storage_mode == "zstd":
+        from .compressed_store import CompressedJSONStorage
+        return CompressedJSONStorage(output_dir=kwargs.get('output_dir', 'results'))
     elif storage_mode == "supabase":
         return SupabaseStorage(
             url=kwargs.get('supabase_url'),
             key=kwargs.get('supabase_key')
         )
-    elif storage_mode == "both":
-        # Return a wrapper that saves to both JSON and Supabase
-        class DualStorage(ResultsStorage):
-            def __init__(self):
-                self.json = JSONStorage(output_dir=kwargs.get('output_dir', 'results'))
-                self.supabase = SupabaseStorage(
-                    url=kwargs.get('supabase_url'),
-                    key=kwargs.get('supabase_key')
-                )
-            
-            def save_conversation(self, conversation_data: Dict) -> bool:
-                json_success = self.json.save_conversation(conversation_data)
-                supabase_success = self.supabase.save_conversation(conversation_data)
-                return json_success and supabase_success
-            
-            def save_evaluation(self, evaluation_data: Dict) -> bool:
-                json_success = self.json.save_evaluation(evaluation_data)
-                supabase_success = self.supabase.save_evaluation(evaluation_data)
-                return json_success and supabase_success
-            
-            def get_all_conversations(self) -> List[Dict]:
-                return self.supabase.get_all_conversations()  # Prefer Supabase for reads
-        
-        return DualStorage()
+    elif storage_mode == "both" or "," in storage_mode:
+        # Fan writes out to several backends concurrently; "both" is JSON + Supabase
+        from .multi_sink import MultiSinkStorage
+        if storage_mode == "both":
+            modes, read_from = ["json", "supabase"], "supabase"  # Prefer Supabase for reads
+        else:
+            modes = [mode.strip() for mode in storage_mode.split(",") if mode.strip()]
+            read_from = None  # First listed backend serves reads
+        if len(set(modes)) != len(modes) or "both" in modes:
+            raise ValueError(f"Unsupported storage mode: {storage_mode}")
+        return MultiSinkStorage(
+            {mode: get_storage(mode, **kwargs) for mode in modes},
+            read_from=read_from,
+            spool_dir=os.path.join(kwargs.get('output_dir', 'results'), 'spool')
+        )
     else:
         raise ValueError(f"Unsupported storage mode: {storage_mode}")
 
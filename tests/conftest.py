@@ -0,0 +1,49 @@
+"""
+Shared pytest setup: make the repository root importable and provide
+scenario fixtures
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _scenario_record(scenario_id, title="تأخير الطلب"):
+    return {
+        "scenario_id": scenario_id,
+        "agent_type": "agent_a",
+        "title": title,
+        "description": "العميل بيسأل عن طلب متأخر",
+        "complexity": "simple",
+        "customer_persona": {
+            "name": "أحمد",
+            "age": 30,
+            "personality": "هادي",
+            "communication_style": "مباشر",
+            "patience_level": 6,
+            "tech_literacy": "medium",
+            "cultural_context": "مصري",
+            "language_style": "عامية مصرية",
+        },
+        "customer_goal": "يعرف الطلب هيوصل إمتى",
+        "initial_context": {"order_id": "123"},
+        "success_criteria": ["يدي ميعاد توصيل"],
+        "evaluation_dimensions": {"clarity": "وضوح الرد"},
+        "expected_actions": ["يتتبع الطلب"],
+    }
+
+
+@pytest.fixture
+def scenario_record():
+    """Factory for valid declarative scenario records"""
+    return _scenario_record
+
+
+@pytest.fixture
+def scenario():
+    """A validated Scenario built from a declarative record"""
+    from scenarios.scenario_files import scenario_from_dict
+    return scenario_from_dict(_scenario_record("a1"))
@@ -0,0 +1,95 @@
+"""
+Tests for dedup compaction of result files
+"""
+
+import csv
+import json
+
+from storage.compaction import compact_csv, compact_json, compact_results_dir, conversation_key
+
+
+def _conversation(conversation_id, customer, agent="تمام"):
+    return {
+        "conversation_id": conversation_id,
+        "scenario_id": "s1",
+        "model_name": "gpt",
+        "turns": [{"turn": 1, "customer": customer, "agent": agent}],
+    }
+
+
+def _write_json(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def test_colliding_legacy_ids_with_different_transcripts_are_kept(tmp_path):
+    path = tmp_path / "conversations.json"
+    _write_json(path, [
+        _conversation("s1_gpt_20250101_120000", "فين الأوردر؟"),
+        _conversation("s1_gpt_20250101_120000", "عايز أرجع المنتج"),
+    ])
+    
+    assert compact_json(str(path), conversation_key()) == (2, 2)
+    with open(path, encoding='utf-8') as f:
+        assert len(json.load(f)) == 2
+
+
+def test_retried_write_of_same_conversation_is_removed(tmp_path):
+    path = tmp_path / "conversations.json"
+    record = _conversation("s1_gpt_run_t0_abc", "فين الأوردر؟")
+    _write_json(path, [record, dict(record), _conversation("other", "سلام")])
+    
+    assert compact_json(str(path), conversation_key()) == (3, 2)
+    with open(path, encoding='utf-8') as f:
+        assert [r["conversation_id"] for r in json.load(f)] == ["s1_gpt_run_t0_abc", "other"]
+
+
+def test_by_content_merges_same_transcript_under_different_ids(tmp_path):
+    path = tmp_path / "conversations.json"
+    _write_json(path, [_conversation("a", "فين الأوردر؟"), _conversation("b", "فين الأوردر؟")])
+    
+    assert compact_json(str(path), conversation_key(by_content=True)) == (2, 1)
+
+
+def test_dry_run_leaves_file_untouched(tmp_path):
+    path = tmp_path / "conversations.json"
+    record = _conversation("a", "فين الأوردر؟")
+    _write_json(path, [record, record])
+    before = path.read_bytes()
+    
+    assert compact_json(str(path), conversation_key(), dry_run=True) == (2, 1)
+    assert path.read_bytes() == before
+
+
+def test_csv_turn_rows_are_only_merged_when_identical(tmp_path):
+    path = tmp_path / "conversation_turns.csv"
+    fields = ["conversation_id", "turn_number", "customer_message", "agent_message", "timestamp"]
+    rows = [
+        ["s1_gpt_20250101_120000", "1", "فين الأوردر؟", "في الطريق", "t1"],
+        ["s1_gpt_20250101_120000", "1", "عايز أرجع المنتج", "حاضر", "t1"],
+        ["s1_gpt_20250101_120000", "1", "عايز أرجع المنتج", "حاضر", "t1"],
+    ]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows(rows)
+    
+    assert compact_csv(str(path)) == (3, 2)
+    with open(path, newline='', encoding='utf-8') as f:
+        messages = [row["customer_message"] for row in csv.DictReader(f)]
+    assert messages == ["فين الأوردر؟", "عايز أرجع المنتج"]
+
+
+def test_compact_results_dir_reports_per_file(tmp_path):
+    record = _conversation("a", "فين الأوردر؟")
+    _write_json(tmp_path / "conversations.json", [record, record])
+    _write_json(tmp_path / "evaluations.json", [
+        {"conversation_id": "a", "overall_score": 3},
+        {"conversation_id": "a", "overall_score": 4},
+    ])
+    
+    report = compact_results_dir(str(tmp_path))
+    
+    assert report == {"conversations.json": (2, 1), "evaluations.json": (2, 1)}
+    with open(tmp_path / "evaluations.json", encoding='utf-8') as f:
+        assert json.load(f)[0]["overall_score"] == 4
@@ -0,0 +1,72 @@
+"""
+Tests for incremental evaluation over stored conversations
+"""
+
+import json
+
+from evaluator.evaluation_index import EvaluationIndex
+from storage.results_storage import JSONStorage
+
+
+def _conversation(conversation_id):
+    return {
+        "conversation_id": conversation_id,
+        "scenario_id": "s1",
+        "agent_type": "agent_a",
+        "model_name": "gpt",
+        "total_turns": 1,
+        "success": True,
+        "end_reason": "Customer ended conversation naturally",
+        "total_tokens": 10,
+        "total_latency": 1.0,
+        "turns": [{"turn": 1, "customer": "فين الأوردر؟", "agent": "في الطريق"}],
+    }
+
+
+def _new_ids(index, results_dir):
+    return [c["conversation_id"] for c in index.iter_new_conversations(str(results_dir))]
+
+
+def test_only_unjudged_conversations_are_returned(tmp_path):
+    storage = JSONStorage(str(tmp_path))
+    for conversation_id in ("a", "b", "c"):
+        storage.save_conversation(_conversation(conversation_id))
+    
+    index = EvaluationIndex(str(tmp_path / "evaluation_index.json"))
+    assert _new_ids(index, tmp_path) == ["a", "b", "c"]
+    index.mark_evaluated(["a", "b", "c"])
+    index.save()
+    
+    storage.save_conversation(_conversation("d"))
+    index = EvaluationIndex(str(tmp_path / "evaluation_index.json"))
+    assert _new_ids(index, tmp_path) == ["d"]
+
+
+def test_legacy_records_without_ids_are_scanned(tmp_path):
+    records = [dict(_conversation("a")), dict(_conversation("x"))]
+    del records[1]["conversation_id"]
+    with open(tmp_path / "conversations.json", 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    with open(tmp_path / "run_20250101_120000.json", 'w', encoding='utf-8') as f:
+        json.dump({"conversations": [_conversation("b")]}, f, ensure_ascii=False)
+    
+    index = EvaluationIndex(str(tmp_path / "evaluation_index.json"))
+    index.mark_evaluated(["a"])
+    new = list(index.iter_new_conversations(str(tmp_path)))
+    
+    assert [c.get("conversation_id") for c in new] == [None, "b"]
+
+
+def test_conversation_saved_during_a_run_is_not_skipped(tmp_path):
+    storage = JSONStorage(str(tmp_path))
+    storage.save_conversation(_conversation("a"))
+    
+    index = EvaluationIndex(str(tmp_path / "evaluation_index.json"))
+    assert _new_ids(index, tmp_path) == ["a"]
+    # Generation appends while the judge is still working on "a"
+    storage.save_conversation(_conversation("b"))
+    index.mark_evaluated(["a"])
+    index.save()
+    
+    index = EvaluationIndex(str(tmp_path / "evaluation_index.json"))
+    assert _new_ids(index, tmp_path) == ["b"]
@@ -0,0 +1,106 @@
+"""
+Tests for the persistent judge verdict cache
+"""
+
+import json
+
+from evaluator.judge_cache import JudgeCache, judge_cache_key
+from evaluator.judge_ensemble import EnsemblePolicy
+from evaluator.llm_judge import LLMJudge
+from models.base_model import BaseModel
+from storage.results_storage import JSONStorage
+
+VERDICT = {
+    "scores": {"task_completion": 8, "empathy": 7, "clarity": 9, "cultural_fit": 8, "problem_solving": 7},
+    "overall_score": 7.8,
+    "strengths": ["رد واضح"],
+    "weaknesses": [],
+    "recommendations": [],
+    "success_criteria_met": {},
+    "must_not_do_violations": [],
+}
+
+TURNS = [{"turn": 1, "customer": "فين الأوردر؟", "agent": "هيوصل بكرة إن شاء الله", "tokens": 40, "latency": 1.2}]
+
+
+class FakeJudgeModel(BaseModel):
+    """Judge model that always returns the same verdict"""
+    
+    def __init__(self, model_name="fake-judge"):
+        super().__init__(model_name)
+        self.calls = 0
+    
+    @property
+    def provider_name(self) -> str:
+        return "fake"
+    
+    def generate_response(self, system_prompt, conversation_history, user_message, temperature=0.7, max_tokens=1024):
+        self.calls += 1
+        return {"response": json.dumps(VERDICT, ensure_ascii=False), "tokens_used": 100, "latency": 0.1, "error": None}
+
+
+def _evaluate(judge, scenario, conversation_id, turns=TURNS):
+    return judge.evaluate_conversation(conversation_id, scenario, turns, {}, "gpt")
+
+
+def test_same_transcript_is_judged_once(tmp_path, scenario):
+    model = FakeJudgeModel()
+    judge = LLMJudge(model, cache=JudgeCache(str(tmp_path / "judge_cache.jsonl")))
+    
+    first = _evaluate(judge, scenario, "conv_1")
+    # Same turns from another result format: only the message text counts
+    second = _evaluate(judge, scenario, "conv_2", [{"customer_message": t["customer"], "agent_message": t["agent"]} for t in TURNS])
+    
+    assert model.calls == 1
+    assert second.conversation_id == "conv_2"
+    assert second.overall_score == first.overall_score == 7.8
+    assert judge.cached_conversation_ids == {"conv_2"}
+    assert (judge.cache.hits, judge.cache.misses) == (1, 1)
+
+
+def test_cache_survives_reload_and_force_rejudges(tmp_path, scenario):
+    path = str(tmp_path / "judge_cache.jsonl")
+    _evaluate(LLMJudge(FakeJudgeModel(), cache=JudgeCache(path)), scenario, "conv_1")
+    
+    model = FakeJudgeModel()
+    assert _evaluate(LLMJudge(model, cache=JudgeCache(path)), scenario, "conv_1").clarity == 9
+    assert model.calls == 0
+    
+    _evaluate(LLMJudge(model, cache=JudgeCache(path), force=True), scenario, "conv_1")
+    assert model.calls == 1
+
+
+def test_key_depends_on_language_and_judge(scenario):
+    key = judge_cache_key(scenario, TURNS, "arabic", "fake-judge", "v1")
+    
+    assert key == judge_cache_key(scenario, [dict(TURNS[0], tokens=999)], "arabic", "fake-judge", "v1")
+    assert key != judge_cache_key(scenario, TURNS, "english", "fake-judge", "v1")
+    assert key != judge_cache_key(scenario, TURNS, "arabic", "other-judge", "v1")
+
+
+def test_cached_verdict_is_saved_for_the_new_conversation(tmp_path, scenario):
+    judge = LLMJudge(FakeJudgeModel(), cache=JudgeCache(str(tmp_path / "judge_cache.jsonl")))
+    storage = JSONStorage(str(tmp_path))
+    for conversation_id in ("conv_1", "conv_2"):
+        assert storage.save_evaluation(_evaluate(judge, scenario, conversation_id).to_dict())
+    
+    with open(tmp_path / "evaluations.json", encoding='utf-8') as f:
+        assert [e["conversation_id"] for e in json.load(f)] == ["conv_1", "conv_2"]
+
+
+def test_cached_second_opinion_is_not_counted_as_a_judge_call(tmp_path, scenario):
+    cache = JudgeCache(str(tmp_path / "judge_cache.jsonl"))
+    second = FakeJudgeModel("second-judge")
+    _evaluate(LLMJudge(second, cache=cache), scenario, "conv_1")
+    
+    judge = LLMJudge(
+        FakeJudgeModel(),
+        cache=cache,
+        secondary_judges=[second],
+        ensemble_policy=EnsemblePolicy(audit_rate=1.0)
+    )
+    assert _evaluate(judge, scenario, "conv_1").ensemble
+    
+    assert second.calls == 1
+    stats = judge.ensemble_stats.to_dict()
+    assert (stats["conversations"], stats["judge_calls"], stats["escalations"]) == (1, 1, {"audit": 1})
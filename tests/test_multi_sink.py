@@ -0,0 +1,102 @@
+"""
+Tests for the concurrent multi-sink storage router
+"""
+
+import json
+import time
+
+from storage.multi_sink import MultiSinkStorage
+from storage.results_storage import ResultsStorage
+
+
+class RecordingStorage(ResultsStorage):
+    """Records evaluation writes; fails while `failing` is set"""
+    
+    def __init__(self, failing: bool = False):
+        self.failing = failing
+        self.evaluations = []
+    
+    def save_conversation(self, conversation_data):
+        return not self.failing
+    
+    def save_evaluation(self, evaluation_data):
+        if self.failing:
+            return False
+        self.evaluations.append(evaluation_data["overall_score"])
+        return True
+    
+    def get_all_conversations(self):
+        return []
+
+
+def _router(tmp_path, storage, retry_interval=0.05):
+    return MultiSinkStorage(
+        {"primary": storage},
+        spool_dir=str(tmp_path / "spool"),
+        retry_interval=retry_interval
+    )
+
+
+def test_spooled_writes_replay_before_newer_ones(tmp_path):
+    storage = RecordingStorage(failing=True)
+    router = _router(tmp_path, storage)
+    router.save_evaluation({"conversation_id": "a", "overall_score": 1})
+    router.flush()
+    assert storage.evaluations == []
+    
+    storage.failing = False
+    time.sleep(0.06)
+    router.save_evaluation({"conversation_id": "a", "overall_score": 2})
+    router.flush()
+    router.close()
+    
+    # The older verdict is written first, so the newer one wins an upsert
+    assert storage.evaluations == [1, 2]
+    assert not (tmp_path / "spool" / "primary.jsonl").exists()
+
+
+def test_new_writes_queue_behind_spool_until_retry(tmp_path):
+    storage = RecordingStorage(failing=True)
+    router = _router(tmp_path, storage, retry_interval=60)
+    router.save_evaluation({"conversation_id": "a", "overall_score": 1})
+    router.flush()
+    
+    storage.failing = False
+    router.save_evaluation({"conversation_id": "a", "overall_score": 2})
+    router.flush()
+    router.close()
+    
+    # Not written live ahead of the pending retry; both wait in the spool in order
+    assert storage.evaluations == []
+    with open(tmp_path / "spool" / "primary.jsonl", encoding='utf-8') as f:
+        scores = [json.loads(line)["record"]["overall_score"] for line in f]
+    assert scores == [1, 2]
+
+
+def test_replay_restores_dispatch_order(tmp_path):
+    storage = RecordingStorage()
+    router = _router(tmp_path, storage)
+    sink = router._sinks["primary"]
+    # Spooled under backpressure after a newer write was already spooled
+    sink.spool("evaluation", {"overall_score": 2}, queued_at=200)
+    sink.spool("evaluation", {"overall_score": 1}, queued_at=100)
+    
+    sink.replay_spool()
+    router.close()
+    
+    assert storage.evaluations == [1, 2]
+    assert router.stats()["primary"]["replayed"] == 2
+
+
+def test_replay_stops_at_first_failure_and_keeps_the_rest(tmp_path):
+    storage = RecordingStorage(failing=True)
+    router = _router(tmp_path, storage, retry_interval=60)
+    sink = router._sinks["primary"]
+    sink.spool("evaluation", {"overall_score": 1})
+    sink.spool("evaluation", {"overall_score": 2})
+    
+    sink.replay_spool()
+    router.close()
+    
+    with open(tmp_path / "spool" / "primary.jsonl", encoding='utf-8') as f:
+        assert [json.loads(line)["record"]["overall_score"] for line in f] == [1, 2]
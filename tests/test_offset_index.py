@@ -0,0 +1,112 @@
+"""
+Tests for JSON array appends and the sidecar offset index
+"""
+
+import json
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from storage.offset_index import OffsetIndex, IndexedResultsReader, append_to_json_array
+
+
+def _record(writer, i):
+    return {
+        "conversation_id": f"w{writer}_{i}",
+        "scenario_id": f"s{i % 3}",
+        "model_name": "gpt",
+        "turns": [{"customer": "السلام عليكم", "agent": "أهلاً بيك"}],
+    }
+
+
+def _append_many(path, writer, count=25):
+    index = OffsetIndex(path)
+    for i in range(count):
+        append_to_json_array(path, _record(writer, i), index)
+
+
+def _assert_consistent(path, expected):
+    with open(path, encoding='utf-8') as f:
+        records = json.load(f)
+    assert sorted(r["conversation_id"] for r in records) == sorted(expected)
+    
+    # Every index line (written by any writer) points at its own record
+    index = OffsetIndex(path)
+    assert not index.is_stale()
+    with IndexedResultsReader(path, index) as reader:
+        for conversation_id in expected:
+            assert reader.get(conversation_id)["conversation_id"] == conversation_id
+
+
+def test_append_keeps_offsets_of_earlier_records(tmp_path):
+    path = str(tmp_path / "conversations.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[]")
+    index = OffsetIndex(path)
+    first = append_to_json_array(path, _record(0, 0), index)
+    append_to_json_array(path, _record(0, 1), index)
+    
+    assert index.offsets["w0_0"] == first
+    _assert_consistent(path, ["w0_0", "w0_1"])
+
+
+def test_concurrent_thread_appends(tmp_path):
+    path = str(tmp_path / "conversations.json")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda writer: _append_many(path, writer), range(8)))
+    
+    _assert_consistent(path, [f"w{w}_{i}" for w in range(8) for i in range(25)])
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_process_appends(tmp_path):
+    path = str(tmp_path / "conversations.json")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_append_many, args=(path, writer)) for writer in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    
+    assert all(process.exitcode == 0 for process in processes)
+    _assert_consistent(path, [f"w{w}_{i}" for w in range(4) for i in range(25)])
+
+
+def test_ids_intersects_secondary_keys(tmp_path):
+    path = str(tmp_path / "conversations.json")
+    index = OffsetIndex(path)
+    for i in range(6):
+        record = dict(_record(0, i), model_name="gpt" if i % 2 else "gemini")
+        append_to_json_array(path, record, index)
+    
+    assert index.ids(scenario_id="s1", model_name="gpt") == ["w0_1"]
+    assert index.ids(scenario_id="s0", model_name="gpt") == ["w0_3"]
+    assert len(index.ids()) == 6
+    with pytest.raises(ValueError):
+        index.ids(agent_type="agent_a")
+
+
+def test_compressed_writers_sharing_a_file(tmp_path):
+    pytest.importorskip("zstandard")
+    from storage.compressed_store import CompressedRecordWriter
+    
+    path = str(tmp_path / "conversations.zst")
+    
+    def write(writer_id):
+        # Separate writers, as in separate processes: each one's file
+        # position goes stale as soon as another appends
+        index = OffsetIndex(path)
+        with CompressedRecordWriter(path) as writer:
+            for i in range(25):
+                writer.append(_record(writer_id, i), index)
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(write, range(4)))
+    
+    expected = [f"w{w}_{i}" for w in range(4) for i in range(25)]
+    index = OffsetIndex(path)
+    assert sorted(index.offsets) == sorted(expected)
+    with IndexedResultsReader(path, index) as reader:
+        for conversation_id in expected:
+            assert reader.get(conversation_id)["conversation_id"] == conversation_id
@@ -0,0 +1,73 @@
+"""
+Tests for judging conversations while generation continues
+"""
+
+import json
+import threading
+
+from evaluator.llm_judge import LLMJudge
+from evaluator.online_judge import OnlineJudge
+from models.base_model import BaseModel
+from storage.results_storage import JSONStorage, iter_json_records
+
+VERDICT = {
+    "scores": {"task_completion": 8, "empathy": 7, "clarity": 9, "cultural_fit": 8, "problem_solving": 7},
+    "overall_score": 7.8,
+    "strengths": [],
+    "weaknesses": [],
+    "recommendations": [],
+    "success_criteria_met": {},
+    "must_not_do_violations": [],
+}
+
+
+class GatedJudgeModel(BaseModel):
+    """Judge model that answers the first call, then waits for a gate"""
+    
+    def __init__(self):
+        super().__init__("fake-judge")
+        self.calls = 0
+        self.gate = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def provider_name(self) -> str:
+        return "fake"
+    
+    def generate_response(self, system_prompt, conversation_history, user_message, temperature=0.7, max_tokens=1024):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if not first:
+            self.gate.wait()
+        return {"response": json.dumps(VERDICT), "tokens_used": 100, "latency": 0.1, "error": None}
+
+
+def _conversation(conversation_id, message):
+    return {
+        "conversation_id": conversation_id,
+        "model_name": "gpt",
+        "turns": [{"turn": 1, "customer": message, "agent": "هيوصل بكرة"}],
+    }
+
+
+def test_verdicts_are_saved_as_they_are_produced(tmp_path, scenario):
+    storage = JSONStorage(str(tmp_path))
+    saved = threading.Event()
+    
+    def save(result):
+        storage.save_evaluation(result.to_dict())
+        saved.set()
+    
+    model = GatedJudgeModel()
+    online_judge = OnlineJudge(LLMJudge(model, structured_output=False), workers=1, on_result=save)
+    online_judge.submit(_conversation("c1", "فين الأوردر؟"), scenario)
+    online_judge.submit(_conversation("c2", "الأوردر اتأخر"), scenario)
+    
+    # The first verdict is in storage while the second is still being judged
+    assert saved.wait(5)
+    assert [e["conversation_id"] for e in iter_json_records(storage.evaluations_file)] == ["c1"]
+    
+    model.gate.set()
+    assert len(online_judge.close()) == 2
+    assert [e["conversation_id"] for e in iter_json_records(storage.evaluations_file)] == ["c1", "c2"]
@@ -0,0 +1,20 @@
+"""
+Tests for the customer prompt template cache
+"""
+
+import copy
+
+from simulator.prompt_templates import PromptTemplateCache
+
+
+def test_cache_follows_content_not_identity(scenario):
+    cache = PromptTemplateCache()
+    persona, goal, context = scenario.customer_persona, scenario.customer_goal, dict(scenario.initial_context)
+    
+    first = cache.get(persona, goal, context)
+    assert cache.get(copy.deepcopy(persona), goal, dict(context)) is first
+    
+    # Edited in place: same objects, new prompt
+    context["order_id"] = "456"
+    assert "456" in cache.get(persona, goal, context).static_prefix
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,83 @@
+"""
+Tests for hedged calls in the provider router
+"""
+
+import threading
+import time
+
+from models.base_model import BaseModel
+from models.routed_model import RoutedModel
+
+
+class FakeClient(BaseModel):
+    """Client whose calls take the next delay from a script"""
+    
+    def __init__(self, delays, tokens=100, model_name="fake-model"):
+        super().__init__(model_name)
+        self.delays = list(delays)
+        self.tokens = tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def provider_name(self) -> str:
+        return "fake"
+    
+    def generate_response(self, system_prompt, conversation_history, user_message, temperature=0.7, max_tokens=1024):
+        with self._lock:
+            delay = self.delays[self.calls] if self.calls < len(self.delays) else 0.01
+            self.calls += 1
+        time.sleep(delay)
+        return {"response": "تمام", "tokens_used": self.tokens, "latency": delay, "error": None}
+
+
+def _call(router):
+    return router.generate_response("system", [], "السلام عليكم")
+
+
+def test_losing_hedge_tokens_are_counted():
+    # Five fast calls to learn the latency, then a slow one that gets hedged
+    client = FakeClient([0.01] * 5 + [0.5])
+    router = RoutedModel([client], hedge_budget=1.0, hedge_min_samples=5)
+    for _ in range(6):
+        assert _call(router)["error"] is None
+    
+    assert router.hedges == 1 and router.hedge_wins == 1
+    time.sleep(0.6)  # Let the dropped attempt finish
+    
+    assert client.calls == 7
+    assert router.hedge_stats()["hedge_tokens"] == 100
+    assert router.get_stats()["total_tokens"] == 7 * 100
+    router.close()
+
+
+def test_close_stops_hedging():
+    client = FakeClient([0.01] * 5 + [0.2])
+    router = RoutedModel([client], hedge_budget=1.0, hedge_min_samples=5)
+    for _ in range(5):
+        _call(router)
+    router.close()
+    
+    assert _call(router)["error"] is None
+    assert router.hedges == 0
+    assert router._executor._shutdown
+
+
+def test_slow_primary_is_routed_around():
+    slow = FakeClient([0.5] * 5, tokens=100, model_name="slow")
+    backup = FakeClient([], tokens=10, model_name="backup")
+    router = RoutedModel([slow, backup], attempt_timeout=0.1)
+    
+    result = _call(router)
+    assert result["error"] is None
+    assert result["served_by"] == "fake/backup" and result["latency"] < 0.4
+    assert router.timeouts == 1 and router.failovers == 1
+    
+    # The timeout counts as a failure, so the primary is tried last from now on
+    assert router.route() == [1, 0]
+    assert _call(router)["served_by"] == "fake/backup"
+    assert slow.calls == 1 and backup.calls == 2
+    
+    time.sleep(0.5)  # The timed-out call still finishes and bills its tokens
+    assert router.get_stats()["total_tokens"] == 2 * 10 + 100
+    router.close()
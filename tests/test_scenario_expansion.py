@@ -0,0 +1,27 @@
+"""
+Tests for sampled scenario expansion
+"""
+
+import itertools
+
+import pytest
+
+from scenarios.scenario_expansion import SAMPLING_METHODS, ScenarioExpander, count_variants, expand_scenarios
+
+
+@pytest.mark.parametrize("method", SAMPLING_METHODS)
+def test_sample_size_matches_count_variants(method, scenario):
+    base = scenario
+    for levels, cities, n in itertools.product(range(1, 5), range(1, 5), range(1, 12)):
+        axes = {"patience_level": list(range(1, levels + 1)), "context.المدينة": [f"c{i}" for i in range(cities)]}
+        for seed in range(5):
+            variants = list(expand_scenarios([base], axes, sample=n, method=method, seed=seed))
+            assert len(variants) == count_variants(1, axes, n)
+            assert len({v.scenario_id for v in variants}) == len(variants)
+
+
+def test_sample_is_reproducible(scenario):
+    base = scenario
+    expander = ScenarioExpander(base, {"patience_level": [2, 5], "context.المدينة": ["القاهرة", "أسوان", "طنطا"]})
+    first = [v.scenario_id for v in expander.sample(5, method="stratified", seed=3)]
+    assert first == [v.scenario_id for v in expander.sample(5, method="stratified", seed=3)]
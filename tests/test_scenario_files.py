@@ -0,0 +1,49 @@
+"""
+Tests for declarative scenario files and their compiled caches
+"""
+
+import json
+
+import pytest
+
+from scenarios.scenario_files import compile_scenario_file, iter_scenario_file
+
+
+def _write(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def test_json_file_streams_list_and_single_object(tmp_path, scenario_record):
+    _write(tmp_path / "many.json", [scenario_record("a1"), scenario_record("a2")])
+    _write(tmp_path / "one.json", scenario_record("a3"))
+    
+    assert [s.scenario_id for s in iter_scenario_file(str(tmp_path / "many.json"))] == ["a1", "a2"]
+    assert [s.scenario_id for s in iter_scenario_file(str(tmp_path / "one.json"))] == ["a3"]
+
+
+def test_invalid_json_names_the_file(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[{"scenario_id": ', encoding='utf-8')
+    with pytest.raises(ValueError, match="broken.json"):
+        list(iter_scenario_file(str(path)))
+
+
+def test_recompiling_an_edited_file_removes_its_old_cache(tmp_path, scenario_record):
+    cache_dir = tmp_path / "cache"
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    _write(first, [scenario_record("a1")])
+    _write(second, [scenario_record("b1")])
+    compile_scenario_file(str(first), str(cache_dir)).close()
+    compile_scenario_file(str(second), str(cache_dir)).close()
+    # Left behind by the earlier cache naming
+    (cache_dir / f"compiled_{'0' * 24}.bin").write_bytes(b"")
+    
+    _write(first, [scenario_record("a1", title="طلب ناقص")])
+    compiled = compile_scenario_file(str(first), str(cache_dir))
+    
+    assert compiled.load(0).title == "طلب ناقص"
+    compiled.close()
+    assert len(list(cache_dir.glob("compiled_*.bin"))) == 2
+    # The untouched file's cache is still used
+    assert compile_scenario_file(str(second), str(cache_dir)).path in {str(p) for p in cache_dir.glob("compiled_*.bin")}
@@ -0,0 +1,68 @@
+"""
+Tests for the indexed scenario registry
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from scenarios.scenario_registry import ScenarioRegistry
+
+
+def _scenario(scenario_id, agent_type="agent_a", complexity="simple"):
+    # The registry only indexes these fields
+    return SimpleNamespace(scenario_id=scenario_id, agent_type=agent_type, complexity=complexity)
+
+
+def test_failed_load_is_retried():
+    calls = []
+    
+    def loader(agent_type):
+        calls.append(agent_type)
+        if len(calls) == 1:
+            raise RuntimeError("scenario module failed to import")
+        return [_scenario("a1")]
+    
+    registry = ScenarioRegistry(loader=loader)
+    with pytest.raises(RuntimeError):
+        registry.get_scenarios("agent_a")
+    
+    assert [s.scenario_id for s in registry.get_scenarios("agent_a")] == ["a1"]
+    registry.get_scenarios("agent_a")
+    assert calls == ["agent_a", "agent_a"]
+
+
+def test_register_replaces_across_indexes():
+    registry = ScenarioRegistry(loader=lambda agent_type: [])
+    registry.register(_scenario("a1", complexity="simple"))
+    registry.register(_scenario("a2", complexity="simple"))
+    registry.register(_scenario("a1", complexity="high"))
+    
+    assert [s.scenario_id for s in registry.filter("agent_a", "simple")] == ["a2"]
+    assert [s.scenario_id for s in registry.filter("agent_a", "high")] == ["a1"]
+    assert [s.scenario_id for s in registry.get_scenarios("agent_a")] == ["a2", "a1"]
+    assert registry.count_scenarios()["agent_a"] == 2
+    assert len(registry) == 2
+
+
+def test_file_scenario_overrides_builtin_and_close_releases_files(tmp_path, scenario_record, capsys):
+    (tmp_path / "files").mkdir()
+    with open(tmp_path / "files" / "orders.json", 'w', encoding='utf-8') as f:
+        json.dump([scenario_record("a1", title="من الملف")], f, ensure_ascii=False)
+    
+    registry = ScenarioRegistry(
+        cache_dir=str(tmp_path / "cache"),
+        loader=lambda agent_type: [_scenario("a1"), _scenario("a2")],
+        scenario_dirs=[str(tmp_path / "files")]
+    )
+    with registry:
+        assert [s.scenario_id for s in registry.get_scenarios("agent_a")] == ["a1", "a2"]
+        assert registry.get("a1").title == "من الملف"
+        assert "orders.json overrides the built-in scenario" in capsys.readouterr().out
+        compiled = registry._compiled
+    
+    assert compiled and all(c._mmap.closed for c in compiled)
+    assert len(registry) == 0
+    assert registry.get("a1").title == "من الملف"
+    registry.close()
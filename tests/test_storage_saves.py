@@ -0,0 +1,149 @@
+"""
+Tests for conversation and evaluation saves across storage backends
+"""
+
+import csv
+import json
+
+import pytest
+
+from storage.results_storage import CSVStorage, JSONStorage
+
+
+def _conversation(conversation_id="s1_gpt_run_t0_abc"):
+    return {
+        "conversation_id": conversation_id,
+        "scenario_id": "s1",
+        "agent_type": "agent_a",
+        "model_name": "gpt",
+        "total_turns": 1,
+        "success": True,
+        "end_reason": "Customer ended conversation naturally",
+        "total_tokens": 10,
+        "total_latency": 1.5,
+        "turns": [{"turn": 1, "customer": "فين الأوردر؟", "agent": "في الطريق", "tokens": 10, "latency": 1.5}],
+    }
+
+
+def _evaluation(conversation_id, overall_score):
+    return {"conversation_id": conversation_id, "scenario_id": "s1", "model_name": "gpt", "overall_score": overall_score}
+
+
+def test_json_retried_conversation_write_is_skipped(tmp_path):
+    storage = JSONStorage(str(tmp_path))
+    assert storage.save_conversation(_conversation())
+    assert storage.save_conversation(_conversation())
+    
+    with open(tmp_path / "conversations.json", encoding='utf-8') as f:
+        assert len(json.load(f)) == 1
+    assert storage.get_conversation("s1_gpt_run_t0_abc")["turns"][0]["agent"] == "في الطريق"
+
+
+def test_json_evaluation_upsert(tmp_path):
+    storage = JSONStorage(str(tmp_path))
+    storage.save_evaluation(_evaluation("a", 5))
+    storage.save_evaluation(_evaluation("b", 6))
+    storage.save_evaluation(_evaluation("a", 8))
+    
+    # A new storage sees the verdicts already on disk
+    JSONStorage(str(tmp_path)).save_evaluation(_evaluation("b", 9))
+    
+    with open(tmp_path / "evaluations.json", encoding='utf-8') as f:
+        scores = {e["conversation_id"]: e["overall_score"] for e in json.load(f)}
+    assert scores == {"a": 8, "b": 9}
+
+
+def test_csv_evaluation_upsert(tmp_path):
+    with CSVStorage(str(tmp_path)) as storage:
+        storage.save_evaluation(_evaluation("a", 5))
+        storage.save_evaluation(_evaluation("b", 6))
+        storage.flush()
+        storage.save_evaluation(_evaluation("a", 8))
+    with CSVStorage(str(tmp_path)) as storage:
+        storage.save_evaluation(_evaluation("b", 9))
+        storage.save_evaluation(_evaluation("c", 1))
+    
+    with open(tmp_path / "evaluations.csv", newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted((r["conversation_id"], r["overall_score"]) for r in rows) == [("a", "8"), ("b", "9"), ("c", "1")]
+
+
+def test_csv_retried_conversation_write_is_skipped(tmp_path):
+    with CSVStorage(str(tmp_path)) as storage:
+        storage.save_conversation(_conversation())
+        storage.save_conversation(_conversation())
+    
+    with open(tmp_path / "conversation_turns.csv", newline='', encoding='utf-8') as f:
+        assert len(list(csv.DictReader(f))) == 1
+
+
+def test_parquet_evaluation_upsert(tmp_path):
+    pytest.importorskip("pyarrow")
+    from storage.parquet_store import ParquetStorage
+    
+    storage = ParquetStorage(str(tmp_path), flush_every=1)
+    storage.save_conversation(_conversation("a"))
+    storage.save_evaluation(_evaluation("a", 5))
+    storage.save_evaluation(_evaluation("b", 6))
+    storage.save_evaluation(_evaluation("a", 8))
+    storage.close()
+    
+    storage = ParquetStorage(str(tmp_path), flush_every=1)
+    storage.save_evaluation(_evaluation("b", 9))
+    storage.close()
+    
+    rows = storage.reader.read("evaluations", ["conversation_id", "overall_score"]).to_pylist()
+    assert sorted((r["conversation_id"], r["overall_score"]) for r in rows) == [("a", 8.0), ("b", 9.0)]
+
+
+def test_parquet_evaluation_agent_type_from_earlier_run(tmp_path):
+    pytest.importorskip("pyarrow")
+    from storage.parquet_store import ParquetStorage
+    
+    storage = ParquetStorage(str(tmp_path), flush_every=1)
+    storage.save_conversation(_conversation("a"))
+    storage.close()
+    
+    # Judged by a separate process that never saw the conversation
+    storage = ParquetStorage(str(tmp_path), flush_every=1)
+    storage.save_evaluation(_evaluation("a", 7))
+    storage.save_evaluation(dict(_evaluation("b", 6), agent_type="agent_b"))
+    storage.close()
+    
+    rows = storage.reader.read("evaluations", ["conversation_id", "agent_type"]).to_pylist()
+    assert sorted((r["conversation_id"], r["agent_type"]) for r in rows) == [("a", "agent_a"), ("b", "agent_b")]
+
+
+def test_compressed_storage_reads_back(tmp_path):
+    pytest.importorskip("zstandard")
+    from storage.compressed_store import CompressedJSONStorage
+    
+    storage = CompressedJSONStorage(str(tmp_path))
+    storage.save_conversation(_conversation("a"))
+    storage.save_conversation(_conversation("b"))
+    storage.close()
+    
+    storage = CompressedJSONStorage(str(tmp_path))
+    assert [c["conversation_id"] for c in storage.get_all_conversations()] == ["a", "b"]
+    assert [c["conversation_id"] for c in storage.iter_conversations({"conversation_id": "b"})] == ["b"]
+    assert storage.get_conversation("a")["turns"][0]["customer"] == "فين الأوردر؟"
+    assert storage.get_conversation("missing") is None
+    storage.close()
+
+
+def test_convert_is_incremental_and_evaluation_reads_each_conversation_once(tmp_path, monkeypatch):
+    pytest.importorskip("zstandard")
+    from evaluator.evaluation_index import EvaluationIndex
+    from storage.compressed_store import CompressedRecordReader, main
+    
+    storage = JSONStorage(str(tmp_path))
+    storage.save_conversation(_conversation("a"))
+    monkeypatch.setattr("sys.argv", ["compressed_store", "convert", str(tmp_path)])
+    main()
+    storage.save_conversation(_conversation("b"))
+    main()
+    
+    assert [c["conversation_id"] for c in CompressedRecordReader(str(tmp_path / "conversations.zst"))] == ["a", "b"]
+    # Both files are still there; each conversation is judged once
+    index = EvaluationIndex(str(tmp_path / "evaluation_index.json"))
+    assert [c["conversation_id"] for c in index.iter_new_conversations(str(tmp_path))] == ["a", "b"]
@@ -0,0 +1,163 @@
+"""
+Tests for end-of-conversation detection and its training labels
+"""
+
+import json
+
+import pytest
+
+from agents.agent_a_ecommerce import AgentA_Ecommerce
+from models.base_model import BaseModel
+from orchestrator import ConversationOrchestrator
+from simulator.customer_simulator import CustomerSimulator
+from simulator.termination import (
+    NgramTerminationClassifier,
+    PhraseTerminationDetector,
+    build_termination_examples,
+    load_labelled_examples,
+    load_termination_detector,
+    main,
+)
+
+
+def _conversation(conversation_id, final_message, **fields):
+    return {
+        "conversation_id": conversation_id,
+        "turns": [{"customer": "عندي مشكلة في الطلب", "agent": "ممكن رقم الطلب؟"}],
+        "final_customer_message": final_message,
+        **fields,
+    }
+
+
+def test_final_message_labelled_from_detector_verdict():
+    examples = build_termination_examples([
+        # A natural closing on the last allowed turn is still a closing
+        _conversation("a", "تمام شكرا", customer_ended=True, end_reason="Max turns reached"),
+        _conversation("b", "طب والشحن؟", customer_ended=False, end_reason="Max turns reached"),
+    ])
+    
+    assert ("تمام شكرا", True) in examples
+    assert ("طب والشحن؟", False) in examples
+    assert examples.count(("عندي مشكلة في الطلب", False)) == 2
+
+
+def test_judge_label_wins_and_legacy_falls_back_to_end_reason():
+    examples = build_termination_examples(
+        [
+            _conversation("a", "شكرا", customer_ended=True),
+            _conversation("b", "مع السلامة", end_reason="Customer ended conversation naturally"),
+        ],
+        judge_labels={"a": False}
+    )
+    
+    assert ("شكرا", False) in examples
+    assert ("مع السلامة", True) in examples
+
+
+class ScriptedModel(BaseModel):
+    """Model returning scripted replies in order (then repeating the last)"""
+    
+    def __init__(self, replies):
+        super().__init__("scripted")
+        self.replies = list(replies)
+    
+    @property
+    def provider_name(self) -> str:
+        return "scripted"
+    
+    def generate_response(self, system_prompt, conversation_history, user_message, temperature=0.7, max_tokens=1024):
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        return {"response": reply, "tokens_used": 10, "latency": 0.0, "error": None}
+
+
+def _run(scenario, customer_replies, max_turns=2):
+    orchestrator = ConversationOrchestrator(
+        AgentA_Ecommerce(),
+        ScriptedModel(["الطلب هيوصل بكرة"]),
+        CustomerSimulator(ScriptedModel(customer_replies)),
+        verbose=False
+    )
+    return orchestrator.run_conversation(scenario, max_turns=max_turns)
+
+
+def test_turn_limit_is_not_a_natural_close(scenario):
+    # Initial message, then replies that never close the conversation
+    result = _run(scenario, ["فين الأوردر؟", "طب والشحن هيتأخر؟", "ممكن رقم التتبع؟"])
+    
+    assert result.end_reason == "Max turns reached"
+    assert result.customer_ended is False
+    assert result.final_customer_message == "ممكن رقم التتبع؟"
+    assert result.total_turns == 2
+
+
+def test_closing_on_the_last_turn_is_natural(scenario):
+    result = _run(scenario, ["فين الأوردر؟", "طب والشحن هيتأخر؟", "تمام شكرا جزيلا"])
+    
+    assert result.end_reason == "Customer ended conversation naturally"
+    assert result.customer_ended is True
+
+
+@pytest.mark.parametrize("message", [
+    "تمام، رقم الطلب 12345",
+    "اوك، الاسم احمد محمد",
+    "تمام استنى لما اشوف",
+    "ماشي، طب والشحن هيوصل امتى؟",
+    "شكراً بس عندي سؤال كمان",
+    "شكرا، رقم الحساب ٤٥٦٧",
+])
+def test_acknowledge_and_continue_keeps_going(message):
+    assert not PhraseTerminationDetector().should_end(message)
+
+
+@pytest.mark.parametrize("message", [
+    "تمام",
+    "اوك.",
+    "تمام شكرا",
+    "ماشي، متشكر جداً",
+    "خلاص كده، مع السلامة",
+])
+def test_closings_end_the_conversation(message):
+    assert PhraseTerminationDetector().should_end(message)
+
+
+def _write_results(results_dir):
+    conversations = [
+        _conversation("c1", "تمام شكرا", customer_ended=True),
+        _conversation("c2", "شكرا", customer_ended=True),
+    ]
+    (results_dir / "conversations.json").write_text(json.dumps(conversations), encoding="utf-8")
+    # The same conversation also kept in a run file
+    (results_dir / "claude_20250101_120000.json").write_text(json.dumps(conversations[:1]), encoding="utf-8")
+    (results_dir / "evaluations.json").write_text(
+        json.dumps([{"conversation_id": "c2", "task_completion": 3}]), encoding="utf-8"
+    )
+
+
+def test_labelled_examples_from_results_dir(tmp_path):
+    _write_results(tmp_path)
+    
+    examples = load_labelled_examples(str(tmp_path))
+    
+    assert examples == [
+        ("عندي مشكلة في الطلب", False),
+        ("تمام شكرا", True),
+        ("عندي مشكلة في الطلب", False),
+        ("شكرا", False),
+    ]
+
+
+def test_train_cli_saves_model_the_simulator_loads(tmp_path, monkeypatch, capsys):
+    _write_results(tmp_path)
+    output = tmp_path / "model.json"
+    
+    monkeypatch.setattr("sys.argv", ["termination", "train", str(tmp_path), "--output", str(output), "--holdout", "0"])
+    main()
+    report = capsys.readouterr().out
+    assert "phrases" in report and "classifier" in report
+    
+    monkeypatch.delenv("TERMINATION_MODEL", raising=False)
+    assert isinstance(load_termination_detector(), PhraseTerminationDetector)
+    monkeypatch.setenv("TERMINATION_MODEL", str(output))
+    detector = CustomerSimulator(ScriptedModel([])).termination_detector
+    assert isinstance(detector, NgramTerminationClassifier)
+    assert detector.should_end("تمام شكرا")
@@ -0,0 +1,64 @@
+"""
+Tests for judge-prompt transcript compression
+"""
+
+from evaluator.transcript_compression import TranscriptCompressor, normalize_message, truncate_message
+
+
+def _compact(*agent_messages, level=2):
+    pairs = [(f"q{i}", message) for i, message in enumerate(agent_messages)]
+    return [agent for _, agent in TranscriptCompressor(level).compact(pairs)]
+
+
+def test_words_starting_with_a_greeting_are_kept():
+    agents = _compact(
+        "Hello, your order is on the way.",
+        "His order shipped yesterday. Highlights: refund issued."
+    )
+    assert agents[1] == "His order shipped yesterday. Highlights: refund issued."
+
+
+def test_greeting_led_sentence_with_content_is_kept():
+    agents = _compact("x", "Hello, your refund was issued today.")
+    assert agents[1] == "Hello, your refund was issued today."
+
+
+def test_pure_boilerplate_sentences_are_dropped_after_first_turn():
+    agents = _compact("x", "Hello! Thank you for contacting us. Your order ships today.")
+    assert agents[1] == "Your order ships today. [2 repeated/greeting sentence(s) removed]"
+
+
+def test_first_turn_greeting_is_kept():
+    assert _compact("مرحبا! طلبك في الطريق.")[0] == "مرحبا! طلبك في الطريق."
+
+
+def test_arabic_greeting_chain_is_dropped():
+    agents = _compact("x", "أهلا وسهلا، شكرا لتواصلك معنا.\nالطلب هيوصل بكرة.")
+    assert agents[1] == "الطلب هيوصل بكرة. [1 repeated/greeting sentence(s) removed]"
+
+
+def test_newlines_survive_dropped_sentences():
+    agents = _compact(
+        "x",
+        "Your order ships today.\nGood morning!\nThe refund is done.\nTracking: ABC123."
+    )
+    assert agents[1].startswith("Your order ships today.\nThe refund is done.\nTracking: ABC123.")
+
+
+def test_repeated_sentence_from_earlier_turn_is_dropped():
+    repeated = "Your order number is 12345 and it ships today."
+    agents = _compact(repeated, "Sure. " + repeated)
+    assert agents[1] == "Sure. [1 repeated/greeting sentence(s) removed]"
+
+
+def test_level_one_only_normalizes():
+    assert _compact("x", "Hello!   Thanks.", level=1)[1] == "Hello! Thanks."
+
+
+def test_normalize_message_keeps_line_breaks():
+    assert normalize_message("سطر  أول\n\n\nسطر تاني ") == "سطر أول\nسطر تاني"
+
+
+def test_truncate_message_marks_removed_characters():
+    truncated = truncate_message("a" * 50 + "b" * 50, 20, " [{count}] ")
+    assert truncated == "a" * 14 + " [80] " + "b" * 6
@@ -3,9 +3,18 @@ Utility functions and helpers
 """
 
 from .weave_init import initialize_weave, weave_trace
+from .arabic_text import normalize_arabic, strip_diacritics
+from .token_estimate import estimate_tokens
+from .conversation_ids import make_conversation_id, ensure_conversation_id, new_run_id
 
 __all__ = [
     'initialize_weave',
     'weave_trace',
+    'normalize_arabic',
+    'strip_diacritics',
+    'estimate_tokens',
+    'make_conversation_id',
+    'ensure_conversation_id',
+    'new_run_id',
 ]
 
@@ -0,0 +1,61 @@
+"""
+Arabic text normalization helpers
+
+Used wherever we match phrases against free-form customer/agent text, so
+spelling variants (أ/إ/آ/ا, ى/ي, ة/ه) and diacritics don't cause misses.
+"""
+
+import re
+
+# Tashkeel, Quranic annotation marks, superscript alef and tatweel
+_DIACRITICS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+
+_CHAR_FOLDING = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+    "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    "؟": "?",
+    "،": ",",
+    "؛": ";",
+})
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def strip_diacritics(text: str) -> str:
+    """
+    Remove Arabic diacritics and tatweel
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Text without tashkeel marks
+    """
+    return _DIACRITICS_RE.sub("", text)
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Normalize Arabic text for matching
+    
+    Strips diacritics, folds alef/ya/ta-marbuta variants, maps Arabic
+    punctuation to ASCII, lowercases Latin text and collapses whitespace.
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Normalized text
+    """
+    if not text:
+        return ""
+    text = strip_diacritics(text)
+    text = text.translate(_CHAR_FOLDING)
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip().lower()
@@ -0,0 +1,91 @@
+"""
+Deterministic conversation IDs
+
+IDs are derived from the run, scenario, model, trial number and a hash of
+the transcript instead of the wall clock, so concurrent runs never collide
+and a retried write of the same conversation maps to the same ID.
+"""
+
+import hashlib
+import json
+import re
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Characters kept in the readable part of an ID
+_UNSAFE_RE = re.compile(r"[^\w.\-]+")
+
+
+def new_run_id() -> str:
+    """Run identifier: start time plus a random suffix (unique across parallel runs)"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def transcript_hash(turns: List[Dict], length: int = 12) -> str:
+    """
+    Hash of a conversation's messages
+    
+    Args:
+        turns: Conversation turns
+        length: Hex characters kept
+    
+    Returns:
+        Hex digest prefix
+    """
+    messages = [
+        [turn.get("customer") or turn.get("customer_message") or "",
+         turn.get("agent") or turn.get("agent_message") or ""]
+        for turn in turns
+    ]
+    canonical = json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:length]
+
+
+def make_conversation_id(
+    run_id: str,
+    scenario_id: str,
+    model_name: str,
+    trial: int,
+    turns: List[Dict]
+) -> str:
+    """
+    Build a deterministic conversation ID
+    
+    Args:
+        run_id: Evaluation run identifier (see new_run_id)
+        scenario_id: Scenario (or variant) identifier
+        model_name: Model under test
+        trial: Repetition of this scenario/model within the run
+        turns: Conversation turns
+    
+    Returns:
+        "<scenario>_<model>_<run>_t<trial>_<transcript hash>"
+    """
+    readable = _UNSAFE_RE.sub("-", f"{scenario_id}_{model_name}")
+    return f"{readable}_{run_id}_t{trial}_{transcript_hash(turns)}"
+
+
+def ensure_conversation_id(conversation_data: Dict, run_id: Optional[str] = None) -> str:
+    """
+    The record's own conversation_id, or a deterministic one derived from it
+    
+    Records without an ID fall back to their run_id (or the given one) and
+    trial, so saving the same record twice still yields one ID.
+    
+    Args:
+        conversation_data: Conversation dictionary
+        run_id: Run identifier used when the record has none
+    
+    Returns:
+        Conversation ID
+    """
+    if conversation_data.get("conversation_id"):
+        return conversation_data["conversation_id"]
+    return make_conversation_id(
+        conversation_data.get("run_id") or run_id or "adhoc",
+        conversation_data.get("scenario_id", "unknown"),
+        conversation_data.get("model_name", "unknown"),
+        conversation_data.get("trial", 0),
+        conversation_data.get("turns", [])
+    )
@@ -0,0 +1,31 @@
+"""
+Rough token estimates for prompt budgeting
+
+Provider tokenizers aren't available offline, so budgets use a character
+heuristic: Arabic script averages about 2.5 characters per token on the
+models we run, Latin text about 4.
+"""
+
+import re
+
+_ARABIC_RE = re.compile(r"[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]")
+
+ARABIC_CHARS_PER_TOKEN = 2.5
+LATIN_CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    arabic_chars = len(_ARABIC_RE.findall(text))
+    other_chars = len(text) - arabic_chars
+    return int(arabic_chars / ARABIC_CHARS_PER_TOKEN + other_chars / LATIN_CHARS_PER_TOKEN) + 1